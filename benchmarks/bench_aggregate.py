@@ -0,0 +1,42 @@
+"""
+Aggregate benchmarks.
+
+Run with ``python benchmarks/bench_aggregate.py [--size N]``.
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from jsonpath_ng.ext import parse
+
+
+def measured(label, fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    __, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print('%-40s %8.3fs  peak %8.1f MiB  -> %r' % (label, elapsed, peak / 2 ** 20, result))
+
+
+def bench_sum(data):
+    matches = parse('$.orders[*].total')
+    aggregate = parse('$.orders[*].total.`sum`')
+
+    measured('sum(m.value for m in find())', lambda: sum(m.value for m in matches.find(data)))
+    measured('$.orders[*].total.`sum`', lambda: aggregate.find(data)[0].value)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=10 ** 6)
+    args = parser.parse_args()
+
+    data = {'orders': [{'total': i % 100} for i in range(args.size)]}
+    bench_sum(data)
+
+
+if __name__ == '__main__':
+    main()
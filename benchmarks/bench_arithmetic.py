@@ -0,0 +1,43 @@
+"""
+Arithmetic benchmarks.
+
+Run with ``python benchmarks/bench_arithmetic.py [--size N]``.
+"""
+
+import argparse
+import time
+
+from jsonpath_ng.ext import parse
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print('%-40s %8.3fs  -> %d results' % (label, elapsed, len(result)))
+
+
+def bench_columns(data):
+    jsonpath = parse('$.items[*].price * $.items[*].qty')
+    left = [m.value for m in parse('$.items[*].price').find(data)]
+    right = [m.value for m in parse('$.items[*].qty').find(data)]
+
+    def zipped():
+        return [l * r for l, r in zip(left, right)]
+
+    timed('zip and multiply', zipped)
+    timed('Operation.apply', lambda: jsonpath.apply(left, right))
+    timed('$.items[*].price * $.items[*].qty', lambda: jsonpath.find(data))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=10 ** 6)
+    args = parser.parse_args()
+
+    data = {'items': [{'price': i % 100 + 0.5, 'qty': i % 7} for i in range(args.size)]}
+    bench_columns(data)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+Benchmarks of the operations applying many expressions at once.
+
+Run with ``python benchmarks/bench_bulk.py [--size N]``.
+"""
+
+import argparse
+import copy
+import time
+
+import jsonpath_ng
+from jsonpath_ng import QuerySet, bulk_update, project, redact
+from jsonpath_ng.ext import parse
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print('%-40s %8.3fs' % (label, elapsed))
+    return result
+
+
+def make_records(size):
+    return [{
+        'id': i,
+        'user': {'name': 'user%d' % i, 'email': 'user%d@example.com' % i,
+                 'address': {'city': 'c%d' % (i % 50), 'zip': i % 1000}},
+        'items': [{'sku': 's%d' % j, 'qty': j, 'attrs': {'a%d' % k: k for k in range(5)}}
+                  for j in range(5)],
+        'history': [{'at': j, 'event': 'e%d' % j} for j in range(20)],
+    } for i in range(size)]
+
+
+def bench_project(records):
+    paths = ['$.id', '$.user.name', '$.items[*].sku']
+    parsed = [parse(path) for path in paths]
+    query_set = QuerySet(parsed)
+
+    def by_hand():
+        result = []
+        for record in records:
+            projected = {'id': parsed[0].find(record)[0].value,
+                         'user': {'name': parsed[1].find(record)[0].value},
+                         'items': [{'sku': match.value}
+                                   for match in parsed[2].find(record)]}
+            result.append(projected)
+        return result
+
+    unwanted = [parse(path) for path in
+                ('$.user.email', '$.user.address', '$.items[*].qty',
+                 '$.items[*].attrs', '$.history')]
+
+    def deep_copy_and_filter():
+        result = []
+        for record in records:
+            record = copy.deepcopy(record)
+            for path in unwanted:
+                path.filter(lambda __: True, record)
+            result.append(record)
+        return result
+
+    expected = timed('project, find() per path', by_hand)
+    assert timed('project, deepcopy() and filter()', deep_copy_and_filter) == expected
+    result = timed('project()', lambda: [project(record, query_set)
+                                         for record in records])
+    assert result == expected
+
+
+def bench_redact(records):
+    paths = [parse(path) for path in
+             ('$..email', '$.user.name', '$.user.address.zip', '$.user.address.city',
+              '$.items[*].sku', '$.items[*].attrs', '$.history[*].event',
+              '$.history[*].at', '$.id')]
+
+    def sequential(copies, kwargs):
+        for record in copies:
+            for path in paths:
+                if kwargs:
+                    path.filter(lambda __: True, record)
+                else:
+                    path.update(record, '***')
+        return copies
+
+    def merged(copies, kwargs):
+        for record in copies:
+            redact(record, paths, **kwargs)
+        return copies
+
+    for label, kwargs in (('replace', {}), ('delete', {'delete': True})):
+        copies = copy.deepcopy(records)
+        expected = timed('redact %s, update()/filter() per path' % label,
+                         lambda: sequential(copies, kwargs))
+        copies = copy.deepcopy(records)
+        options = kwargs or {'replacement': '***'}
+        assert timed('redact %s, redact()' % label,
+                     lambda: merged(copies, options)) == expected
+
+
+def bench_bulk_update(size):
+    def make_config():
+        return {'section%d' % i: {'key%d' % j: j for j in range(20)}
+                for i in range(size // 100)}
+
+    overlay = {}
+    for i in range(size // 100):
+        for j in range(10):
+            overlay['section%d.key%d' % (i, j * 2)] = -j
+        overlay['section%d.extra.items[2]' % i] = i
+    rounds = 3
+
+    def sequential():
+        for __ in range(rounds):
+            config = make_config()
+            for path, value in overlay.items():
+                jsonpath_ng.parse(path).update_or_create(config, value)
+        return config
+
+    parsed = [(jsonpath_ng.parse(path), value) for path, value in overlay.items()]
+
+    def sequential_parsed():
+        for __ in range(rounds):
+            config = make_config()
+            for expression, value in parsed:
+                expression.update_or_create(config, value)
+        return config
+
+    def bulk():
+        for __ in range(rounds):
+            config, __ = bulk_update(make_config(), overlay, create=True)
+        return config
+
+    print('%d paths, %d rounds' % (len(overlay), rounds))
+    expected = timed('bulk_update, parse() and update_or_create()', sequential)
+    assert timed('bulk_update, update_or_create() on parsed', sequential_parsed) == expected
+    assert timed('bulk_update()', bulk) == expected
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=10 ** 4)
+    args = parser.parse_args()
+
+    records = make_records(args.size)
+    bench_project(records)
+    bench_redact(records)
+    bench_bulk_update(args.size)
+
+
+if __name__ == '__main__':
+    main()
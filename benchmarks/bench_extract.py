@@ -0,0 +1,67 @@
+"""
+Column extraction benchmarks.
+
+Run with ``python benchmarks/bench_extract.py [--size N]``.
+"""
+
+import argparse
+import time
+
+import jsonpath_ng
+from jsonpath_ng import parse
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print('%-40s %8.3fs' % (label, elapsed))
+    return result
+
+
+def make_records(size):
+    return [{
+        'id': i,
+        'user': {'name': 'user%d' % i, 'address': {'city': 'c%d' % (i % 50),
+                                                    'zip': i % 1000}},
+        'metrics': {'m%d' % m: i * m for m in range(20)},
+        'tags': ['t%d' % (i % 3), 't%d' % (i % 5)],
+    } for i in range(size)]
+
+
+COLUMNS = dict(
+    {'id': '$.id', 'name': '$.user.name', 'city': '$.user.address.city',
+     'zip': '$.user.address.zip', 'tag': '$.tags[0]'},
+    **{'m%d' % m: '$.metrics.m%d' % m for m in range(20)}
+)
+
+
+def bench_extract(records):
+    parsed = {name: parse(expression) for name, expression in COLUMNS.items()}
+
+    def per_column():
+        columns = {name: [] for name in parsed}
+        for record in records:
+            for name, expression in parsed.items():
+                matches = expression.find(record)
+                columns[name].append(matches[0].value if matches else None)
+        return columns
+
+    expected = timed('%d columns, find() per cell' % len(COLUMNS), per_column)
+    result = timed('%d columns, extract()' % len(COLUMNS),
+                   lambda: jsonpath_ng.extract(records, parsed))
+    assert result == expected
+    timed('%d columns, extract() to arrays' % len(COLUMNS),
+          lambda: jsonpath_ng.extract(records, parsed, output='array'))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=10 ** 5)
+    args = parser.parse_args()
+
+    bench_extract(make_records(args.size))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Filter benchmarks.
+
+Run with ``python benchmarks/bench_filter.py [--size N]``.
+"""
+
+import argparse
+import time
+
+from jsonpath_ng.ext import filter as ext_filter
+from jsonpath_ng.jsonpath import Index
+from jsonpath_ng.ext import parse
+from jsonpath_ng.ext.cache import IndexCache
+
+
+def timed(label, fn, repeat=3):
+    best = None
+    for __ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print('%-40s %8.3fs  (%d matches)' % (label, best, len(result)))
+    return result
+
+
+def make_records(size):
+    return [{'id': i, 'a': i % 2, 'b': 'x%dy' % i, 'c': {'d': {'e': i % 7}}}
+            for i in range(size)]
+
+
+def bench_conjunct_ordering(records):
+    # The regex and the deep path are the expensive conjuncts; the last
+    # one rejects 6 items out of 7 and is the one worth running first.
+    path = '$[?b =~ "x.*y" & c.d.e > 5 & a == 1]'
+    source_order = parse(path)
+    adaptive = parse(path)
+    adaptive.right.adaptive = True
+
+    timed('source order', lambda: source_order.find(records))
+    timed('adaptive order', lambda: adaptive.find(records))
+
+
+def bench_equality_index(records, lookups=20):
+    step = len(records) // lookups
+    paths = [parse('$[?id == %d]' % (i * step)) for i in range(lookups)]
+
+    def run():
+        return [match for path in paths for match in path.find(records)]
+
+    timed('%d id lookups, scan' % lookups, run, repeat=1)
+    ext_filter.index_cache = IndexCache()
+    try:
+        timed('%d id lookups, building the index' % lookups, run, repeat=1)
+        timed('%d id lookups, indexed' % lookups, run)
+    finally:
+        ext_filter.index_cache = None
+
+
+def bench_range_index(records, lookups=20):
+    step = len(records) // lookups
+    paths = [parse('$[?id >= %d & id < %d]' % (i * step, i * step + 100))
+             for i in range(lookups)]
+
+    def run():
+        return [match for path in paths for match in path.find(records)]
+
+    timed('%d id ranges, scan' % lookups, run, repeat=1)
+    ext_filter.index_cache = IndexCache()
+    try:
+        timed('%d id ranges, building the index' % lookups, run, repeat=1)
+        timed('%d id ranges, indexed' % lookups, run)
+    finally:
+        ext_filter.index_cache = None
+
+
+def bench_columnar(records):
+    path = parse('$[?a == 1 & c.d.e > 2 & id < %d]' % (len(records) // 2))
+
+    timed('scalar', lambda: path.find(records))
+    ext_filter.columnar_threshold = 0
+    try:
+        timed('columnar', lambda: path.find(records))
+    finally:
+        ext_filter.columnar_threshold = None
+
+
+def bench_removal(records):
+    # Half of the elements removed, each run from a fresh shallow copy
+    timed('filter() [*], 50% removed', lambda: parse('$[*]').filter(
+        lambda record: record['a'] == 1, list(records)))
+    timed('filter() [::2]', lambda: parse('$[::2]').filter(
+        lambda record: True, list(records)))
+    odd = Index(*range(1, len(records), 2))
+    timed('filter() [1,3,5,...]', lambda: odd.filter(
+        lambda record: True, list(records)))
+    timed('filter() [?a == 1]', lambda: parse('$[?a == 1]').filter(
+        lambda record: True, list(records)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=10 ** 6)
+    args = parser.parse_args()
+
+    records = make_records(args.size)
+    bench_conjunct_ordering(records)
+    bench_equality_index(records)
+    bench_range_index(records)
+    bench_columnar(records)
+    bench_removal(records)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Benchmark of interned expressions: memory held by many cached queries with
+common sub-expressions, and dict lookups keyed by them.
+
+Run with ``python benchmarks/bench_intern.py [--queries N]``.
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from jsonpath_ng import intern
+from jsonpath_ng.ext.parser import ExtendedJsonPathParser
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print('%-40s %8.3fs' % (label, elapsed))
+    return result
+
+
+def allocated(label, fn):
+    tracemalloc.start()
+    result = fn()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print('%-40s %8.1fMB' % (label, size / 2 ** 20))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--queries', type=int, default=10 ** 4)
+    args = parser.parse_args()
+
+    strings = ['$.orders[?status = "open" & total > %d].lines[*].sku' % (i % 100)
+               + '.field%d' % i for i in range(args.queries)]
+    jsonpath_parser = ExtendedJsonPathParser()
+    parsed = [jsonpath_parser.parse(string) for string in strings]
+
+    print('%d queries' % args.queries)
+    del parsed[:]
+    parsed = allocated('  parsed', lambda: [
+        jsonpath_parser.parse(string) for string in strings])
+    interned = allocated('  parsed and interned', lambda: [
+        intern(jsonpath_parser.parse(string)) for string in strings])
+
+    cache = {jsonpath: i for i, jsonpath in enumerate(interned)}
+    assert timed('  lookups, x10', lambda: [
+        cache[jsonpath] for __ in range(10) for jsonpath in parsed]) == list(
+            range(len(parsed))) * 10
+
+
+if __name__ == '__main__':
+    main()
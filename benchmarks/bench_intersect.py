@@ -0,0 +1,44 @@
+"""
+Benchmark of `&` against intersecting the matches of both sides by their
+full paths.
+
+Run with ``python benchmarks/bench_intersect.py [--size N]``.
+"""
+
+import argparse
+import time
+
+from jsonpath_ng.ext import parse
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print('%-40s %8.3fs' % (label, elapsed))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=10 ** 5)
+    args = parser.parse_args()
+
+    data = {'items': [{'id': i, 'qty': i % 7, 'price': i % 13}
+                      for i in range(args.size)]}
+    left, right = parse('items[?qty > 2]'), parse('items[?price < 6]')
+    intersect = parse('items[?qty > 2] & (items[?price < 6])')
+
+    def by_full_path():
+        found = {str(match.full_path) for match in right.find(data)}
+        return [match.value for match in left.find(data)
+                if str(match.full_path) in found]
+
+    print('%d elements' % args.size)
+    expected = timed('  full paths of both sides', by_full_path)
+    assert timed('  &', lambda: [
+        match.value for match in intersect.find(data)]) == expected
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Query set benchmarks.
+
+Run with ``python benchmarks/bench_queryset.py [--events N]``.
+"""
+
+import argparse
+import time
+
+from jsonpath_ng import QuerySet
+from jsonpath_ng.ext import parse
+
+
+def make_event(i):
+    return {
+        'payload': {
+            'items': [{'sku': 's%d' % j, 'qty': j, 'price': j * 1.5,
+                       'attrs': {'a%d' % k: k for k in range(25)}}
+                      for j in range(10)],
+            'meta': {'m%d' % k: k for k in range(250)},
+        },
+        'id': i,
+    }
+
+
+def make_queries(count):
+    # Distinct rules over a few shared prefixes, as alerting rules tend to be
+    templates = [
+        '$.payload.items[*].attrs.a%d',
+        '$.payload.meta.m%d',
+        '$.payload.items[?qty > %d].sku',
+        '$.payload.items[%d].price',
+    ]
+    return [parse(templates[i % len(templates)] % (i // len(templates)))
+            for i in range(count)]
+
+
+def bench(events, count):
+    queries = make_queries(count)
+    query_set = QuerySet(queries)
+
+    start = time.perf_counter()
+    for event in events:
+        for query in queries:
+            query.find(event)
+    separate = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for event in events:
+        query_set.find(event)
+    merged = time.perf_counter() - start
+
+    print('%4d queries: %8.0f events/s separately, %8.0f events/s merged'
+          % (count, len(events) / separate, len(events) / merged))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--events', type=int, default=200)
+    args = parser.parse_args()
+
+    events = [make_event(i) for i in range(args.events)]
+    for count in (10, 100, 1000):
+        bench(events, count)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Sort benchmarks.
+
+Run with ``python benchmarks/bench_sort.py [--size N]``.
+"""
+
+import argparse
+import random
+import time
+
+from jsonpath_ng.ext import parse
+
+
+def timed(label, fn, repeat=3):
+    best = None
+    for __ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print('%-40s %8.3fs' % (label, best))
+    return result
+
+
+def make_items(size):
+    rng = random.Random(42)
+    return {'items': [{'price': rng.randrange(1000), 'name': 'n%d' % rng.randrange(size)}
+                      for __ in range(size)]}
+
+
+def bench_sort(data):
+    items = data['items']
+    single = parse('$.items[/price]')
+    same_direction = parse('$.items[/price,/name]')
+    mixed = parse('$.items[/price,\\name]')
+
+    timed('python sorted(), key=price', lambda: sorted(items, key=lambda i: i['price']))
+    timed('$.items[/price]', lambda: single.find(data))
+    timed('$.items[/price,/name]', lambda: same_direction.find(data))
+    timed('$.items[/price,\\name]', lambda: mixed.find(data))
+
+
+def bench_top(data):
+    top = parse('$.items[\\price,/name][0:10]')
+    limit = parse('$.items[\\price,/name].`limit(10)`')
+
+    timed('$.items[\\price,/name][0:10]', lambda: top.find(data))
+    timed('$.items[\\price,/name].`limit(10)`', lambda: limit.find(data))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=10 ** 6)
+    args = parser.parse_args()
+
+    data = make_items(args.size)
+    bench_sort(data)
+    bench_top(data)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark of Transform against one find() per source and one
+update_or_create() per target value.
+
+Run with ``python benchmarks/bench_transform.py [--records N]``.
+"""
+
+import argparse
+import time
+
+from jsonpath_ng import Transform, parse
+
+SPEC = {
+    'customer.name': '$.user.full_name',
+    'customer.email': '$.user.contact.email',
+    'customer.city': '$.user.address.city',
+    'order.id': '$.id',
+    'order.total': '$.totals.amount',
+    'lines[*].sku': '$.items[*].product.sku',
+    'lines[*].qty': '$.items[*].qty',
+}
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print('%-40s %8.3fs' % (label, elapsed))
+    return result
+
+
+def make_records(count):
+    return [{
+        'id': i,
+        'user': {'full_name': 'user%d' % i,
+                 'contact': {'email': 'u%d@example.com' % i},
+                 'address': {'city': 'c%d' % (i % 50)}},
+        'totals': {'amount': i * 3},
+        'items': [{'product': {'sku': 'p%d' % j}, 'qty': j} for j in range(3)],
+    } for i in range(count)]
+
+
+def naive(records):
+    # Pre-parsed, and with the `[*]` of targets expanded up to the largest
+    # number of items, to time evaluation alone
+    sources = {target: parse(source) for target, source in SPEC.items()}
+    targets = {target: [parse(target.replace('[*]', '[%d]' % i)) for i in range(3)]
+               if '[*]' in target else [parse(target)] for target in SPEC}
+
+    def run():
+        documents = []
+        for record in records:
+            document = {}
+            for target, source in sources.items():
+                values = [match.value for match in source.find(record)]
+                for jsonpath, value in zip(targets[target], values):
+                    jsonpath.update_or_create(document, value)
+            documents.append(document)
+        return documents
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--records', type=int, default=10 ** 5)
+    args = parser.parse_args()
+
+    records = make_records(args.records)
+    print('%d records, %d targets' % (args.records, len(SPEC)))
+    expected = timed('  find() and update_or_create()', naive(records))
+    transform = Transform(SPEC)
+    assert timed('  Transform.apply()', lambda: [
+        transform.apply(record) for record in records]) == expected
+
+
+if __name__ == '__main__':
+    main()
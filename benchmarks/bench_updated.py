@@ -0,0 +1,77 @@
+"""
+Benchmarks of copy-on-write updates and of transactions against deep
+copies.
+
+Run with ``python benchmarks/bench_updated.py [--size N]``.
+"""
+
+import argparse
+import copy
+import time
+
+from jsonpath_ng import transaction
+from jsonpath_ng.ext import parse
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print('%-40s %8.3fs' % (label, elapsed))
+    return result
+
+
+def make_document(size):
+    return {
+        'meta': {'version': 1, 'owner': 'a'},
+        'records': [{
+            'id': i,
+            'user': {'name': 'user%d' % i, 'address': {'city': 'c%d' % (i % 50)}},
+            'metrics': {'m%d' % m: i * m for m in range(20)},
+        } for i in range(size)],
+    }
+
+
+def bench_transaction(document):
+    paths = [parse('meta.version'), parse('records[?id < 100].metrics.m1'),
+             parse('records[0].user.address.city')]
+
+    def edit(data):
+        for jsonpath in paths:
+            jsonpath.update(data, 0)
+
+    def with_deepcopy():
+        data = copy.deepcopy(document)
+        edit(data)
+        return data
+
+    def with_transaction():
+        with transaction(document) as tx:
+            edit(document)
+            return tx.rollback()
+
+    print('edits rolled back')
+    timed('  deepcopy() and update()', with_deepcopy)
+    timed('  transaction() and rollback()', with_transaction)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=10 ** 4)
+    args = parser.parse_args()
+
+    document = make_document(args.size)
+    edits = 10
+    for path in ('meta.version', 'records[%d].user.name' % (args.size // 2),
+                 'records[?id < 100].metrics.m1'):
+        jsonpath = parse(path)
+        print(path)
+        expected = timed('  deepcopy() and update(), x%d' % edits, lambda: [
+            jsonpath.update(copy.deepcopy(document), 0) for __ in range(edits)])[0]
+        assert timed('  updated(), x%d' % edits, lambda: [
+            jsonpath.updated(document, 0) for __ in range(edits)])[0] == expected
+    bench_transaction(document)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,10 @@
 from .jsonpath import *  # noqa
 from .parser import parse  # noqa
+from .columns import extract  # noqa
+from .queryset import QuerySet  # noqa
+from .bulk import bulk_update, project, redact  # noqa
+from .transactions import transaction  # noqa
+from .transform import Transform  # noqa
 
 
 # Current package version
@@ -0,0 +1,647 @@
+"""
+Operations applying many expressions to a document at once.
+"""
+
+import operator
+
+from . import jsonpath as _jsonpath
+from .jsonpath import Descendants, Fields, Index, NOT_SET, Root, Slice, This
+from .parser import JsonPathParser
+from .queryset import QuerySet
+from .transactions import Transaction
+from .trie import NO_FIELDS, PathTrie, _single_field, split, walk
+
+
+def _query_set(expressions):
+    if isinstance(expressions, QuerySet):
+        return expressions
+    return QuerySet(list(expressions))
+
+
+def _keys(match, data):
+    """Return the keys leading from `data` to `match`, or None if it is not
+    a part of `data`, like the result of a sort or of an aggregate."""
+    keys = []
+    datum = match
+    while True:
+        parent = _jsonpath._container(datum)
+        if parent is None:
+            return None
+        context, key = parent
+        if context is None:
+            break
+        keys.append(key)
+        datum = context
+    if datum.value is not data:
+        return None
+    keys.reverse()
+    return keys
+
+
+class _Branches:
+    """The branches of a document leading to a set of matches, as nested
+    `[value, children]` pairs, `value` being NOT_SET for the branches that
+    only lead to matches."""
+
+    def __init__(self, data):
+        self.data = data
+        self.root = [NOT_SET, {}]
+
+    def add(self, keys, value):
+        node = self.root
+        container = self.data
+        for key in keys:
+            if node[0] is not NOT_SET:
+                # Within a match already
+                return
+            if isinstance(container, (list, tuple)) and key < 0:
+                key += len(container)
+            container = container[key]
+            node = node[1].setdefault(key, [NOT_SET, {}])
+        node[0] = value
+        node[1] = {}
+
+    def build(self, node=None, original=NOT_SET):
+        """Return new containers for the branches, sharing the matches."""
+        if node is None:
+            node, original = self.root, self.data
+        value, children = node
+        if value is not NOT_SET:
+            return value
+        if isinstance(original, (list, tuple)):
+            return [self.build(children[i], original[i]) for i in sorted(children)]
+        if isinstance(original, dict):
+            # In document order
+            keys = [key for key in original if key in children] \
+                if len(children) > 1 else children
+            return {key: self.build(children[key], original[key]) for key in keys}
+        return None
+
+
+def project(data, expressions):
+    """
+    Return a new document made of the branches of `data` matched by any of
+    `expressions`, strings or parsed `JSONPath` objects, or a `QuerySet`.
+
+    Matched values are shared with `data`, not copied; only the containers
+    leading to them are new. Lists keep their matched elements only, in
+    order. Matches that are not part of `data`, such as the results of
+    sorts, aggregates or arithmetic, are left out.
+    """
+    branches = _Branches(data)
+    for matches in _query_set(expressions).find(data).values():
+        for match in matches:
+            keys = _keys(match, data)
+            if keys is not None:
+                branches.add(keys, match.value)
+    return branches.build()
+
+
+def _structural(jsonpath, leading=True):
+    """Whether the locations `jsonpath` matches depend only on the keys and
+    lengths of containers, and are those its `update()` and `filter()` act
+    upon, so that it can be applied from locations found beforehand."""
+    steps = split(jsonpath)
+    if leading and type(steps[0]) is Root:
+        steps = steps[1:]
+    if not steps:
+        return False
+    for i, step in enumerate(steps):
+        if type(step) in (Fields, Index, Slice):
+            continue
+        if type(step) is Descendants:
+            if type(step.left) is Root:
+                left = leading and i == 0
+            else:
+                left = type(step.left) is This or _structural(step.left, False)
+            if not (left and all(type(right) is Fields for right in split(step.right))):
+                return False
+        else:
+            return False
+    return True
+
+
+def _positional(jsonpath):
+    """Whether `jsonpath` selects list elements by position."""
+    for step in split(jsonpath):
+        if type(step) is Index:
+            return True
+        if type(step) is Slice and (step.start, step.end, step.step) != (None, None, None):
+            return True
+        if type(step) is Descendants and _positional(step.left):
+            return True
+    return False
+
+
+def _deletes_elements(jsonpath):
+    return type(split(jsonpath)[-1]) in (Index, Slice)
+
+
+def _batches(expressions, delete):
+    """Split `expressions` into runs that can be located together, as
+    lists, and expressions to apply on their own."""
+    batch = []
+    deletes_elements = False
+    for expression in expressions:
+        if not _structural(expression):
+            if batch:
+                yield batch
+            batch = []
+            deletes_elements = False
+            yield expression
+            continue
+        if delete and deletes_elements and _positional(expression):
+            # Positions changed since the batch's locations were found
+            yield batch
+            batch = []
+            deletes_elements = False
+        batch.append(expression)
+        deletes_elements = deletes_elements or (delete and _deletes_elements(expression))
+    if batch:
+        yield batch
+
+
+class _Unsupported(Exception):
+    """Raised while locating matches in values the expressions' own
+    `update()` or `filter()` treat in ways of their own."""
+
+
+# Locations are `(keys, container, key, value)` tuples, `keys` leading from
+# the document to `value`, which is `container[key]`. The document itself is
+# the only item of a list, so that it can be replaced like any other value.
+
+def _fields_step(step, create):
+    fields = step.fields
+
+    def locate(locations):
+        found = []
+        for keys, container, key, value in locations:
+            if create and container is not None:
+                # An index of another expression may have replaced it with
+                # a list since it was located
+                value = container[key]
+            if type(value) is dict:
+                for name in (tuple(value) if '*' in fields else fields):
+                    if name in value:
+                        found.append((keys + (name,), value, name, value[name]))
+                    elif create:
+                        # As find_or_create() does
+                        item = {}
+                        _jsonpath._set(value, name, item)
+                        found.append((keys + (name,), value, name, item))
+            elif type(value) not in NO_FIELDS:
+                raise _Unsupported
+        return found
+    return locate
+
+
+def _elements_step(step, create):
+    if type(step) is Index:
+        def positions(value):
+            length = len(value)
+            # Out of range indices match nothing, as in find()
+            return [index + length if index < 0 else index
+                    for index in step.indices if -length <= index < length]
+    else:
+        def positions(value):
+            return range(len(value))[step.start:step.end:step.step]
+    create = create and type(step) is Index
+    # Padding for negative indices is update_or_create()'s own
+    negative = create and min(step.indices) < 0
+
+    def locate(locations):
+        found = []
+        for keys, container, key, value in locations:
+            if negative:
+                raise _Unsupported
+            if create:
+                # As find_or_create() does, an empty dict becoming a list,
+                # without the placeholders cleaned up by update_or_create()
+                value = container[key]
+                if type(value) is dict and not value:
+                    value = []
+                    _jsonpath._set(container, key, value)
+                if type(value) is list and len(value) <= max(step.indices):
+                    _jsonpath._resize(value)
+                    value.extend({} for __ in range(max(step.indices) + 1 - len(value)))
+            if type(value) is list:
+                found.extend((keys + (i,), value, i, value[i])
+                             for i in positions(value))
+            elif value is not None or type(step) is Index:
+                # Index() fails on anything but lists, and Slice() wraps
+                # other values into one
+                raise _Unsupported
+        return found
+    return locate
+
+
+def _descendants_step(step):
+    # Descendants.update_or_create() creates nothing
+    left = _chain(split(step.left)) \
+        if type(step.left) not in (Root, This) else None
+    right = _chain(split(step.right))
+    name = _single_field(step.right)
+
+    def descend(keys, value, found):
+        # Depth-first, as Descendants.find() does
+        if type(value) is dict:
+            if name is not None:
+                if name in value:
+                    found.append((keys + (name,), value, name, value[name]))
+            else:
+                found.extend(right([(keys, None, None, value)]))
+            items = value.items()
+        elif type(value) is list:
+            items = enumerate(value)
+        elif type(value) in NO_FIELDS:
+            return
+        else:
+            raise _Unsupported
+        for key, item in items:
+            if type(item) is dict or type(item) is list:
+                descend(keys + (key,), item, found)
+            elif type(item) not in NO_FIELDS:
+                raise _Unsupported
+
+    def locate(locations):
+        if left is not None:
+            locations = left(locations)
+        found = []
+        for keys, __, __, value in locations:
+            descend(keys, value, found)
+        return found
+    return locate
+
+
+def _location_step(step, create=False):
+    if type(step) is Fields:
+        return _fields_step(step, create)
+    if type(step) is Descendants:
+        return _descendants_step(step)
+    return _elements_step(step, create)
+
+
+def _chain(steps):
+    compiled = [_location_step(step) for step in steps]
+
+    def locate(locations):
+        for step in compiled:
+            locations = step(locations)
+        return locations
+    return locate
+
+
+def _steps(jsonpath):
+    steps = split(jsonpath)
+    if type(steps[0]) is Root:
+        steps = steps[1:]
+    return steps
+
+
+def _compile(batch, create=False):
+    trie = PathTrie()
+    for key, expression in enumerate(batch):
+        trie.add(_steps(expression), key)
+    return trie.compile(lambda step: _location_step(step, create))
+
+
+def _locate(batch, compiled, document):
+    """Return the locations each expression of `batch` matches in the
+    document held by the `document` list, or None if they have to be
+    applied one after the other, what was created on the way being undone."""
+    if _jsonpath.auto_id_field is not None:
+        return None
+    found = {}
+    try:
+        with Transaction(document):
+            walk(compiled, [((), document, 0, document[0])], found)
+    except _Unsupported:
+        return None
+    return [found.get(i, []) for i in range(len(batch))]
+
+
+def _within(keys, done):
+    """Whether a strict ancestor of `keys` is in `done`."""
+    return any(keys[:i] in done for i in range(1, len(keys)))
+
+
+def _write(container, key, value):
+    """Write `value` at `container[key]` as `update()` does, and return
+    what is there afterwards."""
+    if callable(value):
+        # Only fields are assigned the result
+        result = value(container[key], container, key)
+        if type(container) is dict:
+            _jsonpath._set(container, key, result)
+    elif type(container) is list and isinstance(value, list):
+        # Spread over the indices
+        _jsonpath._set(container, key, value.pop(0))
+    else:
+        _jsonpath._set(container, key, value)
+    return container[key]
+
+
+def _replace(batch, located, data, replacement):
+    replaced = set()
+    for i, locations in enumerate(located):
+        containers = False
+        last = split(batch[i])[-1]
+        for keys, container, key, __ in locations:
+            if _within(keys, replaced):
+                continue
+            value = _write(container, key, replacement)
+            if callable(replacement) and isinstance(value, (dict, list)):
+                containers = True
+                if type(last) is Descendants:
+                    # Descendants.update() recurses into the new value
+                    Descendants(This(), last.right).update(value, replacement)
+            replaced.add(keys)
+        if containers:
+            # Later expressions may match within the new values
+            for expression in batch[i + 1:]:
+                data = expression.update(data, replacement)
+            break
+    return data
+
+
+def _delete(located):
+    deleted = set()
+    elements = {}
+    for locations in located:
+        for keys, container, key, __ in locations:
+            if _within(keys, deleted) or keys in deleted:
+                continue
+            if type(container) is dict:
+                _jsonpath._remove(container, key)
+            else:
+                # Deleted at the end, from the last, so that positions hold
+                elements.setdefault(id(container), (container, set()))[1].add(key)
+            deleted.add(keys)
+    for container, positions in elements.values():
+        _jsonpath._compact(lambda __: True, container, positions)
+
+
+def _duplicates(located):
+    """Whether an expression matches a list element twice, which filter()
+    would pop twice."""
+    for locations in located:
+        elements = [keys for keys, container, __, __ in locations
+                    if type(container) is list]
+        if len(set(elements)) < len(elements):
+            return True
+    return False
+
+
+# Plans of the last expression lists given to redact() and bulk_update(),
+# by the ids of the expressions, or by the strings
+_plans = {}
+MAX_PLANS = 64
+
+
+def _cached_plan(expressions, options, build):
+    key = (tuple(expression if isinstance(expression, str) else id(expression)
+                 for expression in expressions), options)
+    cached = _plans.get(key)
+    if cached is not None and all(map(operator.is_, cached[0], expressions)):
+        return cached[1]
+    plan = build()
+    if len(_plans) >= MAX_PLANS:
+        _plans.clear()
+    _plans[key] = (tuple(expressions), plan)
+    return plan
+
+
+def _parsed(expressions):
+    """Parse the strings among `expressions`, with a single parser rather
+    than one per string as parse() does."""
+    parser = None
+    parsed = []
+    for expression in expressions:
+        if isinstance(expression, str):
+            if parser is None:
+                parser = JsonPathParser()
+            expression = parser.parse(expression)
+        parsed.append(expression)
+    return parsed
+
+
+def _redact_plan(expressions, delete, sequential):
+    expressions = _parsed(expressions)
+    if sequential:
+        return expressions
+    return [(batch, _compile(batch)) if isinstance(batch, list) else batch
+            for batch in _batches(expressions, delete)]
+
+
+def redact(data, expressions, replacement=NOT_SET, delete=False):
+    """
+    Replace what `expressions`, strings or parsed `JSONPath` objects, match
+    in `data` with `replacement` (None by default), or remove it with
+    `delete`. Returns `data`, modified in place.
+
+    The result is that of applying the expressions one after the other,
+    with `expression.update(data, replacement)` or
+    `expression.filter(lambda __: True, data)`, but consecutive expressions
+    made of plain fields, indices, slices and descendants are located in a
+    single walk, steps they have in common being taken once. Like
+    `update()`, a callable `replacement` is called with each matched value,
+    its container and its key, and fields are assigned its result. Indices
+    out of range are left alone, where `update()` with a callable raises an
+    IndexError.
+    """
+    if delete and replacement is not NOT_SET:
+        raise ValueError("delete and replacement are exclusive")
+    if replacement is NOT_SET:
+        replacement = None
+    expressions = list(expressions)
+    # Later expressions may match within a container replacement, and
+    # update() spreads lists over indices
+    sequential = isinstance(replacement, (dict, list))
+    plan = _cached_plan(expressions, (delete, sequential),
+                        lambda: _redact_plan(expressions, delete, sequential))
+
+    for batch in plan:
+        located = None
+        if isinstance(batch, tuple):
+            batch, compiled = batch
+            located = _locate(batch, compiled, [data])
+            if delete and located is not None and _duplicates(located):
+                located = None
+        else:
+            batch = [batch]
+        if located is None:
+            for expression in batch:
+                if delete:
+                    data = expression.filter(lambda __: True, data)
+                else:
+                    data = expression.update(data, replacement)
+            continue
+
+        _jsonpath._mutated()
+        if delete:
+            _delete(located)
+        else:
+            data = _replace(batch, located, data, replacement)
+    return data
+
+
+def _plain(step):
+    """The step itself if it only ever matches what an equal step does."""
+    if type(step) is Fields and len(step.fields) == 1 and step.fields[0] != '*':
+        return step
+    if type(step) is Index and len(step.indices) == 1 and step.indices[0] >= 0:
+        return step
+    return None
+
+
+def _overlap(step, other):
+    """Whether `step` and `other` may match the same key."""
+    if type(step) is Fields:
+        return type(other) is Fields and (
+            '*' in step.fields or '*' in other.fields
+            or bool(set(step.fields) & set(other.fields)))
+    return type(other) in (Index, Slice)
+
+
+def _within_earlier(trie, steps, plain):
+    """Whether an expression of `trie` may match a strict ancestor of what
+    `steps` match. With `plain` steps only, in `trie` and in `steps`,
+    children are looked up rather than compared."""
+    nodes = [trie]
+    for step in steps[:-1]:
+        following = []
+        for node in nodes:
+            if plain:
+                following.extend(child for other, child in node.children.get(repr(step), ())
+                                 if other == step)
+            else:
+                following.extend(child for other, child in node.steps()
+                                 if _overlap(step, other))
+        if any(node.keys for node in following):
+            return True
+        nodes = following
+    return False
+
+
+def _sees_created(trie, steps):
+    """Whether a wildcard or slice step of `steps` may see keys or elements
+    that an expression of `trie` creates."""
+    nodes = [trie]
+    for step in steps:
+        if (type(step) is Slice or (type(step) is Fields and '*' in step.fields)) \
+                and any(node.children for node in nodes):
+            return True
+        nodes = [child for node in nodes for other, child in node.steps()
+                 if _overlap(step, other)]
+        if not nodes:
+            return False
+    return False
+
+
+def _update_plan(paths, create):
+    """Batches of `(expressions, positions, compiled)`, positions being
+    those of the expressions in `paths`, and positions of expressions to
+    apply on their own."""
+    plan = []
+    batch = positions = trie = None
+    plain = True
+    for position, expression in enumerate(_parsed(paths)):
+        if not _structural(expression):
+            plan.append((expression, position))
+            batch = None
+            continue
+        steps = _steps(expression)
+        descendants = any(type(step) is Descendants for step in steps)
+        expression_plain = all(_plain(step) for step in steps)
+        if batch is not None and (descendants or batch_descendants or _within_earlier(
+                trie, steps, plain and expression_plain)):
+            # It may match within what the batch assigns, which it has to
+            # be located after
+            batch = None
+        elif batch is not None and create and not expression_plain \
+                and _sees_created(trie, steps):
+            # Or see keys the batch creates, which the walk creates branch
+            # by branch rather than one expression after the other
+            batch = None
+        if batch is None:
+            batch, positions, trie = [], [], PathTrie()
+            plan.append((batch, positions, None))
+            plain = True
+            batch_descendants = False
+        batch.append(expression)
+        positions.append(position)
+        trie.add(steps, len(batch) - 1)
+        plain = plain and expression_plain
+        batch_descendants = batch_descendants or descendants
+    return [(item[0], item[1], _compile(item[0], create)) if len(item) == 3 else item
+            for item in plan]
+
+
+def _update_one(expression, data, value, create):
+    """Apply `expression` with its own `update()` or `update_or_create()`,
+    and return the result and whether it matched anything."""
+    matched = bool(expression.find(data))
+    if create:
+        data = expression.update_or_create(data, value)
+        matched = matched or bool(expression.find(data))
+    else:
+        data = expression.update(data, value)
+    return data, matched
+
+
+def bulk_update(data, assignments, create=False):
+    """
+    Assign values to many paths of `data` at once. `assignments` maps paths,
+    strings or parsed `JSONPath` objects, to their values, or is an iterable
+    of `(path, value)` pairs. With `create`, missing fields and elements are
+    created along the way, as `update_or_create()` does.
+
+    Returns a `(data, unmatched)` pair: `data`, modified in place (unless
+    the document itself was replaced, e.g. an empty dict by a list), and the
+    list of the paths that matched nothing.
+
+    The result is that of applying the assignments one after the other, in
+    order, but paths made of plain fields, indices, slices and descendants
+    are merged on their common leading steps and located together, taking
+    each shared step once. A path that may match within the value assigned
+    by an earlier one is located after that assignment, as is, with
+    `create`, a wildcard or slice that may see what an earlier one creates.
+    Parsed plans are cached for the last lists of paths seen.
+    """
+    if hasattr(assignments, 'items'):
+        assignments = assignments.items()
+    paths, values = [], []
+    for path, value in assignments:
+        paths.append(path)
+        values.append(value)
+    plan = _cached_plan(paths, ('update', create),
+                        lambda: _update_plan(paths, create))
+
+    unmatched = []
+    for item in plan:
+        if len(item) == 2:
+            expression, position = item
+            data, matched = _update_one(expression, data, values[position], create)
+            if not matched:
+                unmatched.append(paths[position])
+            continue
+
+        batch, positions, compiled = item
+        document = [data]
+        located = _locate(batch, compiled, document)
+        data = document[0]
+        if located is None:
+            for expression, position in zip(batch, positions):
+                data, matched = _update_one(expression, data, values[position], create)
+                if not matched:
+                    unmatched.append(paths[position])
+            continue
+
+        _jsonpath._mutated()
+        for locations, position in zip(located, positions):
+            if not locations:
+                unmatched.append(paths[position])
+            for __, container, key, __ in locations:
+                _write(container, key, values[position])
+        data = document[0]
+    return data, unmatched
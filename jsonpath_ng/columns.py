@@ -0,0 +1,126 @@
+"""
+Extraction of many expressions from many records into columns.
+"""
+
+from array import array
+
+from .exceptions import JSONPathError
+from .jsonpath import Root
+from .parser import parse
+from .trie import PathTrie, split, uses_context, value_step, walk
+
+MULTIPLE = ('first', 'last', 'list', 'error')
+OUTPUT = ('list', 'array', 'numpy')
+
+# Ints array.array('q') and NumPy's int64 hold, and up to which they convert
+# to float exactly
+INT64_MIN = -2 ** 63
+INT64_MAX = 2 ** 63 - 1
+FLOAT_EXACT_MAX = 2 ** 53
+
+
+class _Plan:
+    """Expressions compiled into a trie walked once per record."""
+
+    def __init__(self, expressions):
+        self.trie = PathTrie()
+        # Expressions reading outside of the value they apply to
+        self.separate = {}
+        for key, expression in expressions.items():
+            steps = split(expression)
+            if steps and isinstance(steps[0], Root):
+                steps = steps[1:]
+            if any(uses_context(step) for step in steps):
+                self.separate[key] = expression
+            else:
+                self.trie.add(steps, key)
+        self.compiled = self.trie.compile(value_step)
+
+    def run(self, record):
+        """Return a dict mapping each key to the values it matches."""
+        cells = {}
+        walk(self.compiled, [record], cells)
+        for key, expression in self.separate.items():
+            cells[key] = [match.value for match in expression.find(record)]
+        return cells
+
+
+def _typed(column, output):
+    """Return `column` as an array if its cells are all ints or all floats,
+    or as it is otherwise."""
+    types = set(map(type, column))
+    if types == {int} and (min(column) >= INT64_MIN
+                           and max(column) <= INT64_MAX):
+        typecode = 'q'
+    elif types == {float} or (types == {int, float} and all(
+            -FLOAT_EXACT_MAX <= value <= FLOAT_EXACT_MAX
+            for value in column if type(value) is int)):
+        typecode = 'd'
+    elif output == 'numpy':
+        import numpy
+        return numpy.array(column, dtype=object)
+    else:
+        return column
+
+    if output == 'numpy':
+        import numpy
+        return numpy.array(column, dtype='int64' if typecode == 'q' else 'float64')
+    return array(typecode, column)
+
+
+def extract(records, columns, missing=None, multiple='first', output='list'):
+    """
+    Extract columns of values from `records`, an iterable of documents.
+
+    `columns` maps column names to expressions, either strings or parsed
+    `JSONPath` objects (to use extensions, pass expressions parsed with
+    `jsonpath_ng.ext.parse`). All the expressions are applied to each record
+    in a single walk, steps they have in common being evaluated once.
+
+    Returns a dict mapping each column name to the list of its cells, one
+    per record:
+
+    - a cell whose expression matches nothing is `missing`;
+    - a cell whose expression matches several values is, depending on
+      `multiple`, the 'first' or the 'last' of them, or raises a
+      `JSONPathError` for 'error'. With 'list', every cell is the list of
+      the values matched, possibly empty.
+
+    With `output` set to 'array', columns of ints or floats are returned as
+    `array.array` instead of lists; with 'numpy', columns are NumPy arrays,
+    of int64 or float64 for those. Columns of lists, with `multiple` set to
+    'list', are always lists.
+    """
+    if multiple not in MULTIPLE:
+        raise ValueError("multiple must be one of %s" % ', '.join(MULTIPLE))
+    if output not in OUTPUT:
+        raise ValueError("output must be one of %s" % ', '.join(OUTPUT))
+
+    expressions = {
+        name: parse(expression) if isinstance(expression, str) else expression
+        for name, expression in columns.items()
+    }
+    plan = _Plan(expressions)
+    result = {name: [] for name in expressions}
+    appends = [(name, result[name].append) for name in expressions]
+
+    for record in records:
+        cells = plan.run(record)
+        for name, append in appends:
+            values = cells.get(name, ())
+            if multiple == 'list':
+                append(list(values))
+            elif not values:
+                append(missing)
+            elif len(values) == 1 or multiple == 'first':
+                append(values[0])
+            elif multiple == 'last':
+                append(values[-1])
+            else:
+                raise JSONPathError("%s matches %d values in record %d"
+                                    % (name, len(values), len(result[name])))
+
+    if output != 'list' and multiple != 'list':
+        result = {name: _typed(column, output)
+                  for name, column in result.items()}
+    return result
@@ -0,0 +1,236 @@
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import re
+
+from .. import JSONPath, DatumInContext, NOT_SET
+from .filter import compile_target
+from .string import DefintionInvalid
+
+
+KEYED = re.compile(r"(\w+)\(\s*(.+?)\s*\)")
+
+
+def _hash_key(value):
+    # true and 1 are different JSON values
+    return (type(value) is bool, value)
+
+
+class Aggregate(JSONPath):
+    """Base class of the named operators aggregating over all the matches of
+    the expression on their left, as in '$.orders[*].total.`sum`'.
+
+    Matches are consumed one at a time, so memory use does not grow with
+    their number. As with arithmetic, values of incompatible types produce
+    no result rather than an error.
+    """
+
+    aggregating = True
+    name = None
+
+    def reduce(self, values):
+        """Return the aggregate of an iterable of values, or NOT_SET if there
+        is none."""
+        raise NotImplementedError()
+
+    def aggregate(self, matches):
+        try:
+            value = self.reduce(match.value for match in matches)
+        except TypeError:
+            return []
+        if value is NOT_SET:
+            return []
+        return [DatumInContext(value, context=None, path=self)]
+
+    def find(self, datum):
+        return self.aggregate([DatumInContext.wrap(datum)])
+
+    def __eq__(self, other):
+        return type(other) is type(self)
+
+    def __hash__(self):
+        return hash(self.name)
+
+    def __str__(self):
+        return '`%s`' % self.name
+
+    def __repr__(self):
+        return '%s()' % self.__class__.__name__
+
+
+class Sum(Aggregate):
+    """Sum of the matched values. Concrete syntax is '`sum`'."""
+
+    name = 'sum'
+
+    def reduce(self, values):
+        return sum(values)
+
+
+class Min(Aggregate):
+    """Smallest matched value. Concrete syntax is '`min`'."""
+
+    name = 'min'
+
+    def reduce(self, values):
+        return min(values, default=NOT_SET)
+
+
+class Max(Aggregate):
+    """Largest matched value. Concrete syntax is '`max`'."""
+
+    name = 'max'
+
+    def reduce(self, values):
+        return max(values, default=NOT_SET)
+
+
+class Avg(Aggregate):
+    """Arithmetic mean of the matched values. Concrete syntax is '`avg`'."""
+
+    name = 'avg'
+
+    def reduce(self, values):
+        total = 0
+        count = 0
+        for value in values:
+            total += value
+            count += 1
+        return total / count if count else NOT_SET
+
+
+class Count(Aggregate):
+    """Number of matches. Concrete syntax is '`count`'."""
+
+    name = 'count'
+
+    def reduce(self, values):
+        return sum(1 for __ in values)
+
+
+class KeyedAggregate(Aggregate):
+    """Base class of the aggregates taking a key sub-expression, evaluated
+    against each match, as in '`groupby(status)`'.
+
+    Matches where the key is missing or matches more than once are left
+    out. Without a key sub-expression, the matched value itself is the key.
+    """
+
+    def __init__(self, method=None):
+        self.method = method
+        self.key = None
+        if method is not None:
+            m = KEYED.fullmatch(method)
+            if m is None or m.group(1) != self.name:
+                raise DefintionInvalid("%s is not valid" % method)
+            # The parser module imports this one
+            from .parser import parse
+            self.key = parse(m.group(2))
+
+    def keyed(self, matches):
+        """Yield a `(hash_key, key, match)` triple for each of `matches`."""
+        if self.key is None:
+            for match in matches:
+                yield _hash_key(match.value), match.value, match
+            return
+
+        extract = compile_target(self.key)
+        for match in matches:
+            found = extract(match.value)
+            if len(found) == 1:
+                yield _hash_key(found[0]), found[0], match
+
+    def __eq__(self, other):
+        return type(other) is type(self) and self.method == other.method
+
+    def __hash__(self):
+        return hash((self.name, self.method))
+
+    def __str__(self):
+        return '`%s`' % (self.method or self.name)
+
+    def __repr__(self):
+        if self.method is None:
+            return '%s()' % self.__class__.__name__
+        return '%s(%r)' % (self.__class__.__name__, self.method)
+
+
+class Distinct(KeyedAggregate):
+    """The matches with distinct values, first occurrences first.
+
+    Concrete syntax is '`distinct`', or '`distinct(key)`' to compare the
+    matches on a sub-expression. Unlike the other aggregates, the matches
+    themselves are returned, keeping their paths.
+    """
+
+    name = 'distinct'
+
+    def aggregate(self, matches):
+        seen = set()
+        unhashable = []
+        distinct = []
+        for hash_key, __, match in self.keyed(matches):
+            try:
+                if hash_key in seen:
+                    continue
+                seen.add(hash_key)
+            except TypeError:
+                if hash_key in unhashable:
+                    continue
+                unhashable.append(hash_key)
+            distinct.append(match)
+        return distinct
+
+
+class GroupBy(KeyedAggregate):
+    """The matched values grouped by key, in one hash pass.
+
+    Concrete syntax is '`groupby(key)`'. The result is a dict mapping each
+    key to the list of values having it, in order of first occurrence. As
+    in any dict, keys comparing equal, such as true and 1, share a group,
+    and an unhashable key produces no result.
+    """
+
+    name = 'groupby'
+
+    def reduce_keyed(self, keyed):
+        groups = {}
+        for __, key, match in keyed:
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = []
+            group.append(match.value)
+        return groups
+
+    def aggregate(self, matches):
+        try:
+            value = self.reduce_keyed(self.keyed(matches))
+        except TypeError:
+            return []
+        return [DatumInContext(value, context=None, path=self)]
+
+
+class CountBy(GroupBy):
+    """The number of matches for each key, in one hash pass.
+
+    Concrete syntax is '`countby(key)`'. The result is a dict mapping each
+    key to its count, in order of first occurrence.
+    """
+
+    name = 'countby'
+
+    def reduce_keyed(self, keyed):
+        counts = {}
+        for __, key, __ in keyed:
+            counts[key] = counts.get(key, 0) + 1
+        return counts
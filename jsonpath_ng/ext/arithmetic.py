@@ -13,6 +13,7 @@
 
 import operator
 from .. import JSONPath, DatumInContext
+from .. import jsonpath as _jsonpath
 
 
 OPERATOR_MAP = {
@@ -22,49 +23,81 @@ OPERATOR_MAP = {
     '/': operator.truediv,
 }
 
+# What to do with an element whose operation fails, for operations created
+# without an explicit `on_error`:
+#  - 'abort': the whole operation returns no result
+#  - 'skip': the element is left out of the results
+#  - 'null': the element's result is None
+on_error = 'abort'
+
+ON_ERROR = ('abort', 'skip', 'null')
+
+ELEMENT_ERRORS = (TypeError, ZeroDivisionError)
+
 
 class Operation(JSONPath):
-    def __init__(self, left, op, right):
+    """Arithmetic on two operands, each a JSONPath or a constant.
+
+    Operands matching several values are computed element-wise, in bulk
+    with `map`. `on_error` tells what to do with elements whose operation
+    fails; one of ON_ERROR, defaulting to the module's `on_error`.
+    """
+
+    settings = ('on_error',)
+
+    def __init__(self, left, op, right, on_error=None):
+        if on_error is not None and on_error not in ON_ERROR:
+            raise ValueError("on_error must be one of %s" % ', '.join(ON_ERROR))
         self.left = left
         self.op_symbol = op
         self.op = OPERATOR_MAP[op]
         self.right = right
+        self.on_error = on_error
+
+    def __setattr__(self, name, value):
+        _jsonpath._check_setting(self, name)
+        object.__setattr__(self, name, value)
 
     def find(self, datum):
-        result = []
         if (isinstance(self.left, JSONPath)
                 and isinstance(self.right, JSONPath)):
-            left = self.left.find(datum)
-            right = self.right.find(datum)
-            if left and right and len(left) == len(right):
-                for l, r in zip(left, right):
-                    try:
-                        result.append(self.op(l.value, r.value))
-                    except TypeError:
-                        return []
-            else:
+            left = [l.value for l in self.left.find(datum)]
+            right = [r.value for r in self.right.find(datum)]
+            if not left or len(left) != len(right):
                 return []
         elif isinstance(self.left, JSONPath):
-            left = self.left.find(datum)
-            for l in left:
-                try:
-                    result.append(self.op(l.value, self.right))
-                except TypeError:
-                    return []
+            left = [l.value for l in self.left.find(datum)]
+            right = [self.right] * len(left)
         elif isinstance(self.right, JSONPath):
-            right = self.right.find(datum)
-            for r in right:
-                try:
-                    result.append(self.op(self.left, r.value))
-                except TypeError:
-                    return []
+            right = [r.value for r in self.right.find(datum)]
+            left = [self.left] * len(right)
         else:
-            try:
-                result.append(self.op(self.left, self.right))
-            except TypeError:
-                return []
+            left = [self.left]
+            right = [self.right]
+        result = self.apply(left, right)
+        if result is None:
+            return []
         return [DatumInContext.wrap(r) for r in result]
 
+    def apply(self, left, right):
+        """Return the operation applied to each pair of values of two lists
+        of the same length, or None if it failed and errors abort."""
+        try:
+            return list(map(self.op, left, right))
+        except ELEMENT_ERRORS:
+            mode = self.on_error or on_error
+            if mode == 'abort':
+                return None
+
+        result = []
+        for l, r in zip(left, right):
+            try:
+                result.append(self.op(l, r))
+            except ELEMENT_ERRORS:
+                if mode == 'null':
+                    result.append(None)
+        return result
+
     def __repr__(self):
         return '%s(%r%s%r)' % (self.__class__.__name__, self.left, self.op_symbol,
                                self.right)
@@ -80,3 +113,6 @@ class Operation(JSONPath):
             and self.op_symbol == other.op_symbol
             and self.right == other.right
         )
+
+    def __hash__(self):
+        return hash((self.left, self.op_symbol, self.right))
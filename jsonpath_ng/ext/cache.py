@@ -0,0 +1,157 @@
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import bisect
+import collections
+
+from .. import jsonpath as _jsonpath
+
+# Marks a range index that cannot be built because some value cannot be
+# ordered against the filter literal.
+UNORDERED = object()
+
+
+class _Entry:
+    """The indexes built over one array."""
+
+    def __init__(self, array):
+        self.array = array
+        self.length = len(array)
+        self.mutations = _jsonpath._mutations
+        self.indexes = {}
+
+    def is_stale(self, array):
+        return (self.array is not array
+                or self.length != len(array)
+                or self.mutations != _jsonpath._mutations)
+
+
+class RangeIndex:
+    """Key values of an array in ascending order, with the position of the
+    element each comes from. Ties keep their array order."""
+
+    def __init__(self, pairs):
+        pairs.sort()
+        self.keys = [key for key, __ in pairs]
+        self.positions = [position for __, position in pairs]
+
+    def bounds(self, op, value, lo=0, hi=None):
+        """Narrow the `lo:hi` slice of `keys` to those satisfying
+        ``key <op> value``, for `op` one of '<', '<=', '>' and '>='."""
+        hi = len(self.keys) if hi is None else hi
+        if op == '>':
+            lo = max(lo, bisect.bisect_right(self.keys, value))
+        elif op == '>=':
+            lo = max(lo, bisect.bisect_left(self.keys, value))
+        elif op == '<':
+            hi = min(hi, bisect.bisect_left(self.keys, value))
+        elif op == '<=':
+            hi = min(hi, bisect.bisect_right(self.keys, value))
+        return lo, max(lo, hi)
+
+    def between(self, lo, hi):
+        """Return the positions of the `lo:hi` slice in array order."""
+        return sorted(self.positions[lo:hi])
+
+
+class IndexCache:
+    """Lookup structures over arrays, reused across filter evaluations.
+
+    Indexes are built on first use for a given array and key path, then
+    reused as long as the array is the same object, has the same length and
+    no write was made through the jsonpath_ng update, filter or create APIs
+    in the meantime. Writes made directly to the data are not tracked beyond
+    the length check: call `clear()` after those.
+
+    The cache keeps references to the arrays it indexes, up to `maxsize`
+    arrays, dropping the least recently used first.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+
+    def _entry(self, array):
+        key = id(array)
+        entry = self._entries.get(key)
+        if entry is None or entry.is_stale(array):
+            entry = self._entries[key] = _Entry(array)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        self._entries.move_to_end(key)
+        return entry
+
+    def hash_index(self, array, names, extract, coerce=None):
+        """Return a dict mapping each key value to the ascending positions of
+        the elements of `array` holding it.
+
+        `names` identifies the key path, `extract` returns the values it
+        matches in an element and `coerce`, if given, converts them first,
+        values it maps to NOT_SET being left out. Unhashable values are left
+        out as well: they cannot equal a filter literal.
+        """
+        entry = self._entry(array)
+        key = ('hash', names, coerce)
+        index = entry.indexes.get(key)
+        if index is None:
+            index = entry.indexes[key] = {}
+            for position, item in enumerate(array):
+                for value in extract(item):
+                    if coerce is not None:
+                        value = coerce(value)
+                        if value is _jsonpath.NOT_SET:
+                            continue
+                    try:
+                        positions = index.setdefault(value, [])
+                    except TypeError:
+                        continue
+                    if not positions or positions[-1] != position:
+                        positions.append(position)
+        return index
+
+    def range_index(self, array, names, extract, coerce=None, types=None):
+        """Return a `RangeIndex` over the key values of `array`, or None if
+        they cannot all be ordered.
+
+        `names`, `extract` and `coerce` are as for `hash_index`. Without
+        `coerce`, every value must be an instance of `types`, otherwise the
+        comparisons a scan would make are not well defined and None is
+        returned. NaNs never compare true and are left out.
+        """
+        entry = self._entry(array)
+        key = ('range', names, coerce, types)
+        index = entry.indexes.get(key)
+        if index is None:
+            pairs = []
+            for position, item in enumerate(array):
+                for value in extract(item):
+                    if coerce is not None:
+                        value = coerce(value)
+                        if value is _jsonpath.NOT_SET:
+                            continue
+                    elif not isinstance(value, types):
+                        pairs = None
+                        break
+                    if value == value:
+                        pairs.append((value, position))
+                if pairs is None:
+                    break
+            index = UNORDERED if pairs is None else RangeIndex(pairs)
+            entry.indexes[key] = index
+        return None if index is UNORDERED else index
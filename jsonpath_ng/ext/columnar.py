@@ -0,0 +1,261 @@
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Columnar evaluation of filters over arrays of records, with NumPy.
+
+The fields a filter compares are projected once into typed columns, along
+with masks of the records where they are present and of the expected type.
+Comparisons are then evaluated over whole columns as boolean masks. Matches
+are exactly those of the scalar path: expressions whose outcome could differ,
+such as comparisons that would raise on a mistyped value, regular
+expressions or paths other than plain fields, are left to it. These only run
+on the records matching the others, so where the scalar path raises a
+TypeError for a record the others rule out, no error is raised.
+"""
+
+import operator
+from itertools import repeat
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+from .. import NOT_SET
+from .filter import (Expression, Or, Not, compile_all, compile_target,
+                     _field_chain, _to_int)
+
+
+ORDERING = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+# Column kinds, by type of the literal compared against
+KINDS = {
+    int: 'int',
+    float: 'number',
+    bool: 'number',
+    str: 'str',
+}
+
+# Types a 'number' or 'str' column holds, and the other JSON types, which
+# never compare equal to them
+KIND_TYPES = {
+    'number': {int, float, bool},
+    'str': {str},
+}
+JSON_TYPES = {int, float, bool, str, type(None), dict, list}
+
+NOT_SET_TYPE = type(NOT_SET)
+
+# Ints up to this magnitude convert to float exactly
+FLOAT_EXACT_MAX = 2 ** 53
+
+
+def _flags(iterable):
+    return numpy.fromiter(iterable, dtype=bool)
+
+
+class Columns:
+    """The columns of a list of records, projected on first use."""
+
+    def __init__(self, values):
+        self.values = values
+        self._raw = {}
+        self._typed = {}
+
+    def raw(self, target, names):
+        """Return the value of `target` for each record, NOT_SET where it
+        is missing, or None if it matches several values somewhere."""
+        if names not in self._raw:
+            self._raw[names] = self._project(target, names)
+        return self._raw[names]
+
+    def _project(self, target, names):
+        column = self.values
+        for i, name in enumerate(names):
+            if not set(map(type, column)) <= {dict}:
+                break
+            # Records missing an intermediate field get an empty dict in
+            # its place, and NOT_SET at the end
+            missing = NOT_SET if i == len(names) - 1 else {}
+            column = list(map(dict.get, column, repeat(name), repeat(missing)))
+        else:
+            return column
+
+        # Paths through other containers go through compile_target()
+        extract = compile_target(target)
+        column = []
+        for value in self.values:
+            found = extract(value)
+            if len(found) > 1:
+                return None
+            column.append(found[0] if found else NOT_SET)
+        return column
+
+    def typed(self, target, names, kind, literal):
+        """Return a `(data, valid, present)` triple of arrays for comparing
+        `target` to literals of `kind`, or None if it can't be done exactly.
+
+        `data` holds the values, `literal` where they are not `valid`.
+        """
+        key = (names, kind)
+        if key not in self._typed:
+            self._typed[key] = self._convert(self.raw(target, names), kind)
+        converted = self._typed[key]
+        if converted is None:
+            return None
+        data, valid, present = converted
+        if not valid.all():
+            data = numpy.where(valid, data, literal)
+        return data, valid, present
+
+    def _convert(self, column, kind):
+        if column is None:
+            return None
+        types = set(map(type, column))
+        missing = NOT_SET_TYPE in types
+        types.discard(NOT_SET_TYPE)
+        present = _flags(value is not NOT_SET for value in column) \
+            if missing else numpy.ones(len(column), dtype=bool)
+        if missing:
+            # None is never valid either
+            column = [None if value is NOT_SET else value for value in column]
+
+        if kind == 'int':
+            # Values are coerced like int() would, as the scalar path does
+            if types <= {int}:
+                valid = present
+                if missing:
+                    column = [0 if value is None else value for value in column]
+            else:
+                column = [_to_int(value) for value in column]
+                valid = _flags(value is not NOT_SET for value in column)
+                column = [0 if value is NOT_SET else value for value in column]
+            data = numpy.array(column)
+            if len(column) and data.dtype.kind != 'i':
+                # ints beyond int64
+                return None
+            return data, valid, present
+
+        if not types <= JSON_TYPES:
+            return None
+        kind_types = KIND_TYPES[kind]
+        homogeneous = types <= kind_types
+        valid = present if homogeneous else \
+            _flags(type(value) in kind_types for value in column)
+        if kind == 'str':
+            return numpy.array(column, dtype=object), valid, present
+
+        if int in types and any(type(value) is int
+                                and abs(value) > FLOAT_EXACT_MAX
+                                for value in column):
+            return None
+        if not homogeneous or missing:
+            column = [value if type(value) in kind_types else 0
+                      for value in column]
+        return numpy.array(column, dtype=float), valid, present
+
+    def mask(self, expression):
+        """Return the boolean mask of the records matching `expression`, or
+        None if it can't be evaluated over columns."""
+        if isinstance(expression, Or):
+            left = self.conjunction(expression.left)
+            right = self.conjunction(expression.right)
+            if left is None or right is None:
+                return None
+            return left | right
+        if isinstance(expression, Not):
+            mask = self.conjunction(expression.expressions)
+            return None if mask is None else ~mask
+        if type(expression) is not Expression:
+            return None
+
+        names = _field_chain(expression.target)
+        if names is None:
+            return None
+        names = tuple(names)
+        if self.raw(expression.target, names) is None:
+            return None
+
+        op = expression.op
+        literal = expression.value
+        if op is None:
+            return numpy.fromiter(
+                (value is not NOT_SET
+                 for value in self.raw(expression.target, names)),
+                dtype=bool, count=len(self.values))
+        kind = KINDS.get(type(literal))
+        if kind is None or (op not in ('==', '=', '!=') and op not in ORDERING):
+            return None
+        if kind == 'int' and not -2 ** 63 <= literal < 2 ** 63:
+            return None
+        typed = self.typed(expression.target, names, kind, literal)
+        if typed is None:
+            return None
+        data, valid, present = typed
+
+        if op in ('==', '='):
+            return valid & (data == literal)
+        if op == '!=':
+            mask = valid & (data != literal)
+            if kind != 'int':
+                # Values of other types are never equal to the literal
+                mask |= present & ~valid
+            return mask
+        if kind != 'int' and (present & ~valid).any():
+            # Ordering them against the literal raises in the scalar path
+            return None
+        return valid & ORDERING[op](data, literal)
+
+    def conjunction(self, expressions):
+        masks = [self.mask(expression) for expression in expressions]
+        if any(mask is None for mask in masks):
+            return None
+        mask = numpy.ones(len(self.values), dtype=bool)
+        for other in masks:
+            mask &= other
+        return mask
+
+
+def select(expressions, values):
+    """Return the positions of the records in `values` matching all the
+    `expressions`, or None if NumPy is not installed or none of them can be
+    evaluated over columns.
+
+    Expressions that can't are evaluated per record, on the records
+    matching the others only.
+    """
+    if numpy is None:
+        return None
+
+    columns = Columns(values)
+    mask = None
+    residual = []
+    for expression in expressions:
+        other = columns.mask(expression)
+        if other is None:
+            residual.append(expression)
+        else:
+            mask = other if mask is None else mask & other
+    if mask is None:
+        return None
+
+    positions = numpy.flatnonzero(mask).tolist()
+    if residual:
+        predicate = compile_all(residual)
+        positions = [i for i in positions if predicate(values[i])]
+    return positions
@@ -11,10 +11,12 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import math
 import operator
 import re
 
-from .. import JSONPath, DatumInContext, Index
+from .. import JSONPath, DatumInContext, Index, This, Fields, Child, NOT_SET
+from .. import jsonpath as _jsonpath
 
 
 OPERATOR_MAP = {
@@ -28,50 +30,348 @@ OPERATOR_MAP = {
     '=~': lambda a, b: True if isinstance(a, str) and re.search(b, a) else False,
 }
 
+# When true, filters created without an explicit `adaptive` argument order
+# their conjuncts by estimated cost and observed pass rate, see
+# `AdaptiveConjunction`.
+adaptive_ordering = False
 
-class Filter(JSONPath):
-    """The JSONQuery filter"""
+# Set to a `jsonpath_ng.ext.cache.IndexCache` to answer equality and
+# comparison filters over arrays from per-array indexes instead of scanning
+# every element.
+index_cache = None
+
+# Set to an array length from which filters are evaluated over NumPy columns
+# instead of element by element, see `jsonpath_ng.ext.columnar`. Ignored when
+# NumPy is not installed.
+columnar_threshold = None
+
+# Filter operators that `index_cache` can answer, and the types values must
+# have to be ordered against a literal of a given type.
+INDEXED_OPS = ('==', '=', '<', '<=', '>', '>=')
+ORDERED_TYPES = {
+    float: (int, float),
+    bool: (int, float),
+    str: (str,),
+}
+
+# Strings accepted by ``int()``, checked up front so that coercing
+# non-numeric strings does not raise inside the filter loop.
+INT_STRING = re.compile(r'\s*[+-]?\d+(?:_\d+)*\s*\Z')
+
+
+def _float_to_int(value):
+    return int(value) if math.isfinite(value) else NOT_SET
+
+
+def _str_to_int(value):
+    return int(value) if INT_STRING.match(value) else NOT_SET
+
+
+INT_COERCIONS = {
+    int: lambda value: value,
+    bool: int,
+    float: _float_to_int,
+    str: _str_to_int,
+}
+
+
+def _to_int(value):
+    """Coerce `value` like ``int()`` would, returning NOT_SET on failure."""
+    coerce = INT_COERCIONS.get(type(value))
+    if coerce is not None:
+        return coerce(value)
+    try:
+        return int(value)
+    except (TypeError, ValueError, OverflowError):
+        return NOT_SET
+
+
+def _field_chain(target):
+    """Return the field names of a `This`/`Fields`/`Child` chain made of
+    single, non-wildcard fields, or None if `target` is anything else."""
+    if type(target) is This:
+        return []
+    if (isinstance(target, Fields) and len(target.fields) == 1
+            and target.fields[0] != '*'):
+        return [target.fields[0]]
+    if isinstance(target, Child):
+        left = _field_chain(target.left)
+        right = _field_chain(target.right)
+        if left is not None and right is not None:
+            return left + right
+    return None
+
+
+def compile_target(target):
+    """Compile `target` into a function returning the values it matches.
+
+    Plain field lookups on dicts are resolved directly; anything else goes
+    through `target.find()`.
+    """
+    def generic(item):
+        return [d.value for d in target.find(DatumInContext.wrap(item))]
+
+    names = _field_chain(target)
+    if names is None:
+        return generic
+
+    def fields(item):
+        if _jsonpath.auto_id_field is not None:
+            return generic(item)
+        value = item
+        for name in names:
+            if type(value) is not dict:
+                return generic(item)
+            value = value.get(name, NOT_SET)
+            if value is NOT_SET:
+                return ()
+        return (value,)
+
+    return fields
+
+
+def _target_cost(target):
+    names = _field_chain(target)
+    return max(len(names), 1) if names is not None else 10
+
+
+def compile_all(expressions):
+    """Compile a conjunction of expressions into a short-circuiting
+    predicate."""
+    predicates = [expression.compile() for expression in expressions]
+    if len(predicates) == 1:
+        return predicates[0]
+
+    def conjunction(item):
+        for predicate in predicates:
+            if not predicate(item):
+                return False
+        return True
+
+    return conjunction
+
+
+class AdaptiveConjunction:
+    """A conjunction predicate that reorders its conjuncts as it runs.
+
+    Conjuncts are ranked by ``cost / (1 - pass_rate)``, so cheap expressions
+    that reject most items are evaluated first. Costs are static estimates
+    from `cost()`; pass rates are counted while evaluating and the ranking is
+    refreshed every `interval` calls, halving the counters each time so that
+    the order follows changes in the data.
+
+    Reordering assumes conjuncts are free of side effects, which holds for
+    every filter expression the parser produces.
+    """
+
+    interval = 1024
 
     def __init__(self, expressions):
+        self.expressions = list(expressions)
+        self.predicates = [expression.compile() for expression in self.expressions]
+        self.costs = [expression.cost() for expression in self.expressions]
+        self.calls = [0] * len(self.expressions)
+        self.passes = [0] * len(self.expressions)
+        self.order = sorted(range(len(self.expressions)), key=self.costs.__getitem__)
+        self._countdown = self.interval
+
+    def rank(self, i):
+        # Laplace smoothing keeps unseen conjuncts at a 50% pass rate. The
+        # counters aren't locked, so racing threads may leave more passes
+        # than calls
+        calls = self.calls[i]
+        pass_rate = (min(self.passes[i], calls) + 1) / (calls + 2)
+        return self.costs[i] / (1 - pass_rate)
+
+    def rerank(self):
+        # A new list, as other threads may be going through the current one
+        self.order = sorted(self.order, key=self.rank)
+        self.calls = [calls // 2 for calls in self.calls]
+        self.passes = [passes // 2 for passes in self.passes]
+        self._countdown = self.interval
+
+    @property
+    def ordered_expressions(self):
+        """The expressions in their current evaluation order."""
+        return [self.expressions[i] for i in self.order]
+
+    def __call__(self, item):
+        self._countdown -= 1
+        if self._countdown <= 0:
+            self.rerank()
+        order = self.order
+        predicates, calls, passes = self.predicates, self.calls, self.passes
+        for i in order:
+            calls[i] += 1
+            if not predicates[i](item):
+                return False
+            passes[i] += 1
+        return True
+
+
+class Filter(JSONPath):
+    """The JSONQuery filter
+
+    With `adaptive` set (or, when it is None, the module-level
+    `adaptive_ordering`), conjuncts are evaluated through an
+    `AdaptiveConjunction` whose statistics are kept on this instance.
+    """
+
+    settings = ('adaptive',)
+
+    def __init__(self, expressions, adaptive=None):
         self.expressions = expressions
+        self.adaptive = adaptive
+        self._predicates = {}
+
+    def __setattr__(self, name, value):
+        _jsonpath._check_setting(self, name)
+        object.__setattr__(self, name, value)
+
+    @property
+    def predicate(self):
+        """The compiled conjunction of `expressions`, built on first use."""
+        adaptive = adaptive_ordering if self.adaptive is None else self.adaptive
+        adaptive = bool(adaptive and len(self.expressions) > 1)
+        predicate = self._predicates.get(adaptive)
+        if predicate is None:
+            if adaptive:
+                predicate = AdaptiveConjunction(self.expressions)
+            else:
+                predicate = compile_all(self.expressions)
+            self._predicates[adaptive] = predicate
+        return predicate
 
     def find(self, datum):
         if not self.expressions:
             return datum
+        return _jsonpath.Matches(self.find_iter(datum))
+
+    def find_iter(self, datum):
+        if not self.expressions:
+            return iter([datum])
 
         datum = DatumInContext.wrap(datum)
+        predicate = self.predicate
 
+        # Mappings are filtered over their values, read in place; matches
+        # are addressed by key so the source document is never rewritten.
         if isinstance(datum.value, dict):
-            datum.value = list(datum.value.values())
+            return (DatumInContext(value, path=Fields(key), context=datum)
+                    for key, value in datum.value.items()
+                    if predicate(value))
 
         if not isinstance(datum.value, list):
-            return []
+            return iter(())
+
+        values = datum.value
+        positions = self._indexed_positions(values)
+        if positions is not None:
+            return (DatumInContext(values[i], path=Index(i), context=datum)
+                    for i in positions
+                    if predicate(values[i]))
+
+        if (columnar_threshold is not None
+                and len(values) >= columnar_threshold
+                and _jsonpath.auto_id_field is None):
+            # The columnar module imports this one
+            from .columnar import select
+            positions = select(self.expressions, values)
+            if positions is not None:
+                return (DatumInContext(values[i], path=Index(i), context=datum)
+                        for i in positions)
+
+        return (DatumInContext(value, path=Index(i), context=datum)
+                for i, value in enumerate(values)
+                if predicate(value))
+
+    def _indexed_positions(self, values):
+        """Return the positions of `values` that may match, looked up in
+        `index_cache`, or None when every element has to be tested.
+
+        Equality conjuncts over plain field paths are answered from hash
+        indexes and comparisons from range indexes, comparisons on the same
+        path being combined into one range. The narrowest candidate set is
+        used; candidates still go through the full predicate, which the
+        elements ruled out never reach.
+        """
+        if index_cache is None or _jsonpath.auto_id_field is not None:
+            return None
+
+        candidates = []
+        ranges = {}
+        for expression in self.expressions:
+            if not (isinstance(expression, Expression)
+                    and expression.op in INDEXED_OPS):
+                continue
+            names = _field_chain(expression.target)
+            if names is None:
+                continue
+            names = tuple(names)
+            __, coerce = expression.comparator
+            extract = compile_target(expression.target)
 
-        return [DatumInContext(datum.value[i], path=Index(i), context=datum)
-                for i in range(0, len(datum.value))
-                if (len(self.expressions) ==
-                    len(list(filter(lambda x: x.find(datum.value[i]),
-                                    self.expressions))))]
+            if expression.op in ('==', '='):
+                index = index_cache.hash_index(values, names, extract, coerce)
+                positions = index.get(expression.value, ())
+                candidates.append((len(positions), lambda p=positions: p))
+                continue
+
+            types = None
+            if coerce is None:
+                types = ORDERED_TYPES.get(type(expression.value))
+                if types is None:
+                    continue
+            index = index_cache.range_index(values, names, extract, coerce, types)
+            if index is None:
+                continue
+            key = (names, coerce, types)
+            __, lo, hi = ranges.get(key, (index, 0, None))
+            ranges[key] = (index,) + index.bounds(expression.op, expression.value, lo, hi)
+
+        for index, lo, hi in ranges.values():
+            candidates.append((hi - lo, lambda lo=lo, hi=hi, index=index: index.between(lo, hi)))
+
+        if not candidates:
+            return None
+        __, positions = min(candidates, key=lambda candidate: candidate[0])
+        return positions()
 
     def filter(self, fn, data):
+        if self.expressions and type(data) is list:
+            _jsonpath._mutated()
+            return _jsonpath._compact(fn, data, [datum.path.indices[0]
+                                                 for datum in self.find_iter(data)])
         # NOTE: We reverse the order just to make sure the indexes are preserved upon
         #  removal.
         for datum in reversed(self.find(data)):
-            index_obj = datum.path
-            if isinstance(data, dict):
-                index_obj.index = list(data)[index_obj.index]
-            index_obj.filter(fn, data)
+            datum.path.filter(fn, data)
+        return data
+
+    def updated(self, data, val):
+        if type(data) is not list:
+            return data
+        predicate = self.predicate
+        positions = [index for index, item in enumerate(data) if predicate(item)]
+        if positions:
+            data = list(data)
+            for index in positions:
+                if hasattr(val, '__call__'):
+                    val.__call__(data[index], data, index)
+                else:
+                    data[index] = val
         return data
 
     def update(self, data, val):
         if type(data) is list:
+            _jsonpath._mutated()
+            predicate = self.predicate
             for index, item in enumerate(data):
-                shouldUpdate = len(self.expressions) == len(list(filter(lambda x: x.find(item), self.expressions)))
-                if shouldUpdate:
+                if predicate(item):
                     if hasattr(val, '__call__'):
                         val.__call__(data[index], data, index)
                     else:
-                        data[index] = val
+                        _jsonpath._set(data, index, val)
         return data
     
     def __repr__(self):
@@ -84,6 +384,9 @@ class Filter(JSONPath):
         return (isinstance(other, Filter)
                 and self.expressions == other.expressions)
 
+    def __hash__(self):
+        return hash(tuple(self.expressions))
+
 
 class Expression(JSONPath):
     """The JSONQuery expression"""
@@ -92,6 +395,24 @@ class Expression(JSONPath):
         self.target = target
         self.op = op
         self.value = value
+        self._comparator = None
+
+    @property
+    def comparator(self):
+        """A `(compare, coerce)` pair for this expression's operator.
+
+        `compare` is called as ``compare(value, self.value)``; `coerce`, when
+        not None, is applied to each matched value first and returns
+        NOT_SET for values that cannot be compared.
+        """
+        if self._comparator is None:
+            compare = OPERATOR_MAP[self.op]
+            if self.op == '=~' and isinstance(self.value, str):
+                search = re.compile(self.value).search
+                compare = lambda a, b: isinstance(a, str) and search(a) is not None  # noqa
+            coerce = _to_int if type(self.value) is int else None
+            self._comparator = (compare, coerce)
+        return self._comparator
 
     def find(self, datum):
         datum = self.target.find(DatumInContext.wrap(datum))
@@ -101,26 +422,62 @@ class Expression(JSONPath):
         if self.op is None:
             return datum
 
+        compare, coerce = self.comparator
         found = []
         for data in datum:
             value = data.value
-            if type(self.value) is int:
-                try:
-                    value = int(value)
-                except ValueError:
+            if coerce is not None:
+                value = coerce(value)
+                if value is NOT_SET:
                     continue
 
-            if OPERATOR_MAP[self.op](value, self.value):
+            if compare(value, self.value):
                 found.append(data)
 
         return found
 
+    def compile(self):
+        """Return a predicate telling whether a value matches this
+        expression."""
+        extract = compile_target(self.target)
+        if self.op is None:
+            return lambda item: bool(extract(item))
+
+        compare, coerce = self.comparator
+        literal = self.value
+
+        def predicate(item):
+            for value in extract(item):
+                if coerce is not None:
+                    value = coerce(value)
+                    if value is NOT_SET:
+                        continue
+                if compare(value, literal):
+                    return True
+            return False
+
+        return predicate
+
+    def cost(self):
+        """Estimated relative cost of evaluating this expression once."""
+        if self.op is None:
+            return _target_cost(self.target)
+        cost = _target_cost(self.target) + 1
+        if self.op == '=~':
+            cost += 5
+        if type(self.value) is int:
+            cost += 1
+        return cost
+
     def __eq__(self, other):
         return (isinstance(other, Expression) and
                 self.target == other.target and
                 self.op == other.op and
                 self.value == other.value)
 
+    def __hash__(self):
+        return hash((self.target, self.op, self.value))
+
     def __repr__(self):
         if self.op is None:
             return '%s(%r)' % (self.__class__.__name__, self.target)
@@ -133,3 +490,80 @@ class Expression(JSONPath):
             return '%s' % self.target
         else:
             return '%s %s %s' % (self.target, self.op, self.value)
+
+
+class Or(JSONPath):
+    """Either of two lists of expressions, each list being a conjunction.
+
+    Concrete syntax is '<expressions> | <expressions>'.
+    """
+
+    def __init__(self, left, right):
+        self.left = left
+        self.right = right
+
+    def find(self, datum):
+        datum = DatumInContext.wrap(datum)
+        for expressions in (self.left, self.right):
+            if all(expression.find(datum) for expression in expressions):
+                return [datum]
+        return []
+
+    def compile(self):
+        left = compile_all(self.left)
+        right = compile_all(self.right)
+        return lambda item: left(item) or right(item)
+
+    def cost(self):
+        return (sum(expression.cost() for expression in self.left) +
+                sum(expression.cost() for expression in self.right))
+
+    def __eq__(self, other):
+        return (isinstance(other, Or) and
+                self.left == other.left and
+                self.right == other.right)
+
+    def __hash__(self):
+        return hash((tuple(self.left), tuple(self.right)))
+
+    def __repr__(self):
+        return '%s(%r, %r)' % (self.__class__.__name__, self.left, self.right)
+
+    def __str__(self):
+        return '(%s | %s)' % (' & '.join(map(str, self.left)),
+                              ' & '.join(map(str, self.right)))
+
+
+class Not(JSONPath):
+    """Negation of a list of expressions taken as a conjunction.
+
+    Concrete syntax is '!<expression>' or '!(<expressions>)'.
+    """
+
+    def __init__(self, expressions):
+        self.expressions = expressions
+
+    def find(self, datum):
+        datum = DatumInContext.wrap(datum)
+        if all(expression.find(datum) for expression in self.expressions):
+            return []
+        return [datum]
+
+    def compile(self):
+        predicate = compile_all(self.expressions)
+        return lambda item: not predicate(item)
+
+    def cost(self):
+        return sum(expression.cost() for expression in self.expressions)
+
+    def __eq__(self, other):
+        return isinstance(other, Not) and self.expressions == other.expressions
+
+    def __hash__(self):
+        return hash(tuple(self.expressions))
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.expressions)
+
+    def __str__(self):
+        return '!(%s)' % ' & '.join(map(str, self.expressions))
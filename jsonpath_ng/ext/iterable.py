@@ -11,48 +11,100 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
-import functools
-from .. import This, DatumInContext, JSONPath
+import heapq
+import re
+
+from .. import This, DatumInContext, JSONPath, NOT_SET
+from .filter import compile_target
+from .string import DefintionInvalid
+
+
+LIMIT = re.compile(r"(?:limit|top)\(\s*(\d+)\s*\)")
 
 
 class SortedThis(This):
     """The JSONPath referring to the sorted version of the current object.
 
     Concrete syntax is '`sorted`' or [\\field,/field].
+
+    Each sort field is evaluated once per element. Elements where a field
+    is missing or matches more than once sort after all others for that
+    field, whatever its direction.
     """
     def __init__(self, expressions=None):
         self.expressions = expressions
 
-    def _compare(self, left, right):
-        left = DatumInContext.wrap(left)
-        right = DatumInContext.wrap(right)
-
-        for expr in self.expressions:
-            field, reverse = expr
-            l_datum = field.find(left)
-            r_datum = field.find(right)
-            if (not l_datum or not r_datum or
-                    len(l_datum) > 1 or len(r_datum) > 1 or
-                    l_datum[0].value == r_datum[0].value):
-                # NOTE(sileht): should we do something if the expression
-                # match multiple fields, for now ignore them
-                continue
-            elif l_datum[0].value < r_datum[0].value:
-                return 1 if reverse else -1
-            else:
-                return -1 if reverse else 1
-        return 0
+    @staticmethod
+    def _column(field, values):
+        """Return the sort key of `field` for each of `values`, NOT_SET
+        where it is missing or ambiguous."""
+        extract = compile_target(field)
+        column = []
+        for value in values:
+            found = extract(value)
+            column.append(found[0] if len(found) == 1 else NOT_SET)
+        return column
+
+    def sorted(self, values):
+        """Return `values` sorted according to `expressions`."""
+        values = list(values)
+        if not self.expressions:
+            return sorted(values)
+
+        # One stable pass per field, last field first, so that earlier
+        # fields take precedence. Each pass sorts on plain values, with the
+        # elements missing the field kept after the others.
+        order = list(range(len(values)))
+        for field, reverse in reversed(self.expressions):
+            column = self._column(field, values)
+            present = [i for i in order if column[i] is not NOT_SET]
+            missing = [i for i in order if column[i] is NOT_SET]
+            present.sort(key=column.__getitem__, reverse=reverse)
+            order = present + missing
+        return [values[i] for i in order]
+
+    def top(self, values, length):
+        """Return the first `length` elements of ``self.sorted(values)``.
+
+        A bounded heap finds the `length`-th key of the first sort field in
+        O(n log length); only the elements up to it, ties included, are then
+        fully sorted, so ties are ordered exactly as a full sort would.
+        """
+        if length <= 0:
+            return []
+        values = list(values)
+        if length >= len(values):
+            return self.sorted(values)
+        if not self.expressions:
+            return heapq.nsmallest(length, values)
+
+        field, reverse = self.expressions[0]
+        column = self._column(field, values)
+        present = [i for i, key in enumerate(column) if key is not NOT_SET]
+        if len(present) <= length:
+            return self.sorted(values)[:length]
+
+        select = heapq.nlargest if reverse else heapq.nsmallest
+        threshold = select(length, [column[i] for i in present])[-1]
+        if reverse:
+            candidates = [i for i in present if not column[i] < threshold]
+        else:
+            candidates = [i for i in present if not threshold < column[i]]
+        return self.sorted([values[i] for i in candidates])[:length]
 
     def find(self, datum):
         """Return sorted value of This if list or dict."""
+        return self.find_prefix(datum, None)
+
+    def find_prefix(self, datum, length):
         if isinstance(datum.value, dict) and self.expressions:
             return datum
 
         if isinstance(datum.value, dict) or isinstance(datum.value, list):
-            key = (functools.cmp_to_key(self._compare)
-                   if self.expressions else None)
-            return [DatumInContext.wrap(
-                [value for value in sorted(datum.value, key=key)])]
+            # New lists, with no context: they aren't part of the document
+            if length is None:
+                return [DatumInContext(self.sorted(datum.value), path=self)]
+            return [DatumInContext(self.top(datum.value, length), path=self)]
         return datum
 
     def __eq__(self, other):
@@ -61,10 +113,15 @@ class SortedThis(This):
             and self.expressions == other.expressions
         )
 
+    def __hash__(self):
+        return hash(tuple(self.expressions or ()))
+
     def __repr__(self):
         return '%s(%r)' % (self.__class__.__name__, self.expressions)
 
     def __str__(self):
+        if not self.expressions:
+            return '`sorted`'
         expressions: list[str] = []
         for (field, reverse) in self.expressions:
             prefix = "\\" if reverse else "/"
@@ -72,6 +129,43 @@ class SortedThis(This):
         return f"[{', '.join(expressions)}]"
 
 
+class Limit(This):
+    """The JSONPath referring to the first elements of the current list.
+
+    Concrete syntax is '`limit(n)`' or '`top(n)`'. Following a sort, as in
+    '$.objects[\\score].`limit(10)`', only the leading elements are
+    ordered.
+    """
+
+    def __init__(self, method=None):
+        m = LIMIT.fullmatch(method)
+        if m is None:
+            raise DefintionInvalid("%s is not valid" % method)
+        self.length = int(m.group(1))
+        self.method = method
+
+    def find(self, datum):
+        datum = DatumInContext.wrap(datum)
+        if not isinstance(datum.value, list):
+            return []
+        return [DatumInContext(datum.value[:self.length], path=self)]
+
+    def prefix_length(self):
+        return self.length
+
+    def __eq__(self, other):
+        return isinstance(other, Limit) and self.method == other.method
+
+    def __hash__(self):
+        return hash(self.method)
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.method)
+
+    def __str__(self):
+        return '`%s`' % self.method
+
+
 class Len(JSONPath):
     """The JSONPath referring to the len of the current object.
 
@@ -92,6 +186,9 @@ class Len(JSONPath):
     def __eq__(self, other):
         return isinstance(other, Len)
 
+    def __hash__(self):
+        return hash('len')
+
     def __str__(self):
         return '`len`'
 
@@ -118,6 +215,9 @@ class Keys(JSONPath):
     def __eq__(self, other):
         return isinstance(other, Keys)
 
+    def __hash__(self):
+        return hash('keys')
+
     def __str__(self):
         return '`keys`'
 
@@ -143,6 +243,9 @@ class Path(JSONPath):
     def __eq__(self, other):
         return isinstance(other, Path)
 
+    def __hash__(self):
+        return hash('path')
+
     def __str__(self):
         return '`path`'
 
@@ -15,15 +15,27 @@ from .. import lexer
 from .. import parser
 from .. import Fields, This, Child
 
+from . import aggregate as _aggregate
 from . import arithmetic as _arithmetic
 from . import filter as _filter
 from . import iterable as _iterable
 from . import string as _string
 
 
+AGGREGATES = {
+    cls.name: cls
+    for cls in (_aggregate.Sum, _aggregate.Min, _aggregate.Max,
+                _aggregate.Avg, _aggregate.Count, _aggregate.Distinct)
+}
+KEYED_AGGREGATES = {
+    cls.name: cls
+    for cls in (_aggregate.Distinct, _aggregate.GroupBy, _aggregate.CountBy)
+}
+
+
 class ExtendedJsonPathLexer(lexer.JsonPathLexer):
     """Custom LALR-lexer for JsonPath"""
-    literals = lexer.JsonPathLexer.literals + ['?', '@', '+', '*', '/', '-']
+    literals = lexer.JsonPathLexer.literals + ['?', '@', '+', '*', '/', '-', '!']
     tokens = (['BOOL'] +
               parser.JsonPathLexer.tokens +
               ['FILTER_OP', 'SORT_DIRECTION', 'FLOAT'])
@@ -100,6 +112,12 @@ class ExtendedJsonPathParser(parser.JsonPathParser):
             p[0] = _iterable.Path()
         elif p[1] == 'sorted':
             p[0] = _iterable.SortedThis()
+        elif p[1] in AGGREGATES:
+            p[0] = AGGREGATES[p[1]]()
+        elif p[1].split("(")[0] in KEYED_AGGREGATES:
+            p[0] = KEYED_AGGREGATES[p[1].split("(")[0]](p[1])
+        elif p[1].startswith("limit(") or p[1].startswith("top("):
+            p[0] = _iterable.Limit(p[1])
         elif p[1].startswith("split("):
             p[0] = _string.Split(p[1])
         elif p[1].startswith("sub("):
@@ -128,9 +146,16 @@ class ExtendedJsonPathParser(parser.JsonPathParser):
 
     def p_expressions_and(self, p):
         "expressions : expressions '&' expressions"
-        # TODO(sileht): implements '|'
         p[0] = p[1] + p[3]
 
+    def p_expressions_or(self, p):
+        "expressions : expressions '|' expressions"
+        p[0] = [_filter.Or(p[1], p[3])]
+
+    def p_expressions_not(self, p):
+        "expressions : '!' expressions"
+        p[0] = [_filter.Not(p[2])]
+
     def p_expressions_parens(self, p):
         "expressions : '(' expressions ')'"
         p[0] = p[2]
@@ -168,6 +193,7 @@ class ExtendedJsonPathParser(parser.JsonPathParser):
         ('left', '+', '-'),
         ('left', '*', '/'),
     ] + parser.JsonPathParser.precedence + [
+        ('right', '!'),
         ('nonassoc', 'ID'),
     ]
 
@@ -56,6 +56,9 @@ class Sub(This):
     def __eq__(self, other):
         return (isinstance(other, Sub) and self.method == other.method)
 
+    def __hash__(self):
+        return hash(self.method)
+
     def __repr__(self):
         return '%s(%r)' % (self.__class__.__name__, self.method)
 
@@ -95,6 +98,9 @@ class Split(This):
     def __eq__(self, other):
         return (isinstance(other, Split) and self.method == other.method)
 
+    def __hash__(self):
+        return hash(self.method)
+
     def __repr__(self):
         return '%s(%r)' % (self.__class__.__name__, self.method)
 
@@ -122,6 +128,9 @@ class Str(This):
     def __eq__(self, other):
         return (isinstance(other, Str) and self.method == other.method)
 
+    def __hash__(self):
+        return hash(self.method)
+
     def __repr__(self):
         return '%s(%r)' % (self.__class__.__name__, self.method)
 
@@ -1,8 +1,13 @@
 from __future__ import annotations
-from typing import List, Optional
+from typing import Iterator, List, Optional
+import contextvars
+import copy
 import logging
 from itertools import *  # noqa
 import re
+import weakref
+
+from .exceptions import JSONPathError
 
 # Get logger name
 logger = logging.getLogger(__name__)
@@ -14,6 +19,55 @@ auto_id_field = None
 NOT_SET = object()
 LIST_KEY = object()
 
+# Number of writes made through the update, filter and create APIs. Caches
+# derived from the data (see `jsonpath_ng.ext.cache`) compare it with the
+# value seen when they were built to tell whether they may be stale.
+_mutations = 0
+
+
+def _mutated():
+    global _mutations
+    _mutations += 1
+
+
+# The innermost `jsonpath_ng.transaction()` of the current thread or task,
+# if any, which the writes made through this package are recorded by, see
+# `_set()`, `_remove()`, `_insert()` and `_resize()`
+_undo = contextvars.ContextVar('jsonpath_ng.transaction', default=None)
+
+
+def _set(container, key, value):
+    """`container[key] = value`, recorded by the current transaction."""
+    undo = _undo.get()
+    if undo is not None:
+        undo.slot(container, key)
+    container[key] = value
+
+
+def _remove(container, key):
+    """`container.pop(key)`, recorded by the current transaction."""
+    undo = _undo.get()
+    if undo is not None:
+        undo.removed(container, key)
+    return container.pop(key)
+
+
+def _insert(container, index, value):
+    """`container.insert(index, value)`, recorded by the current
+    transaction."""
+    undo = _undo.get()
+    if undo is not None:
+        undo.inserted(container, index)
+    container.insert(index, value)
+
+
+def _resize(container):
+    """Have the current transaction record the elements of the list
+    `container`, before its length changes."""
+    undo = _undo.get()
+    if undo is not None:
+        undo.elements(container)
+
 
 class JSONPath:
     """
@@ -22,6 +76,41 @@ class JSONPath:
     JSONPath semantics.
     """
 
+    # Aggregating expressions (such as the `sum` extension) apply to the whole
+    # stream of matches of the expression on their left rather than to each
+    # match separately; they implement `aggregate()`. See `Child.find`.
+    aggregating = False
+
+    # Attributes changing what a node does that may be set after it is
+    # built, such as `Filter.adaptive`. They are not part of its structure,
+    # which its equality and hash are about, and `intern()` doesn't share
+    # nodes differing in them.
+    settings = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Structural hashes are computed once per node, nodes being treated
+        # as immutable once built, but for their `settings`
+        structural = cls.__dict__.get('__hash__')
+        if structural is not None:
+            cls.__hash__ = _cached_hash(structural)
+
+    def __getstate__(self):
+        # String hashes differ from one process to another, and copies are
+        # not interned
+        state = self.__dict__.copy()
+        state.pop('_hash', None)
+        state.pop('_interned', None)
+        return state
+
+    @classmethod
+    def interned(cls, *args, **kwargs):
+        """
+        Like the constructor, but returns the canonical node equal to the
+        new one, see `intern()`.
+        """
+        return intern(cls(*args, **kwargs))
+
     def find(self, data) -> List[DatumInContext]:
         """
         All `JSONPath` types support `find()`, which returns an iterable of `DatumInContext`s.
@@ -30,9 +119,37 @@ class JSONPath:
         """
         raise NotImplementedError()
 
-    def find_or_create(self, data):
+    def find_or_create(self, data, unplaced=None):
+        """
+        Like `find()`, creating what is missing along the way. Placeholders
+        of lists that couldn't be put in place (see `_place_list_key()`)
+        are appended to `unplaced`, if given.
+        """
+        return self.find(data)
+
+    def find_iter(self, data) -> Iterator[DatumInContext]:
+        """
+        Like `find()`, but returns an iterator over the matches. Expressions
+        that can produce them lazily override this, so that consumers such
+        as aggregates run in constant memory.
+        """
+        return iter(self.find(data))
+
+    def find_prefix(self, data, length):
+        """
+        Like `find()`, for callers that only use the first `length` elements
+        of the lists it matches. Expressions that can produce just those
+        (such as sorts) override this; the others find everything.
+        """
         return self.find(data)
 
+    def prefix_length(self):
+        """
+        The number of leading elements of a list this expression selects
+        from, or None if it may select from anywhere in the list.
+        """
+        return None
+
     def update(self, data, val):
         """
         Returns `data` with the specified path replaced by `val`. Only updates
@@ -44,6 +161,40 @@ class JSONPath:
     def update_or_create(self, data, val):
         return self.update(data, val)
 
+    def updated(self, data, val):
+        """
+        Like `update()`, but returns a new document and leaves `data` as it
+        is. Only the containers along the updated paths are copied, the rest
+        being shared with `data`; callables are passed the new containers,
+        and must not modify the values they are given in place.
+
+        Expressions that don't implement it copy `data` entirely.
+        """
+        return self.update(copy.deepcopy(data), val)
+
+    def patch_for_update(self, data, val, in_place=False):
+        """
+        Returns the RFC 6902 JSON Patch operations, as dicts, that
+        `update(data, val)` amounts to, leaving `data` as it is unless
+        `in_place` is set. See `jsonpath_ng.patch`.
+        """
+        from .patch import patch_for
+        return patch_for(self, 'update', data, val, in_place)
+
+    def patch_for_update_or_create(self, data, val, in_place=False):
+        """
+        Like `patch_for_update()`, for `update_or_create(data, val)`.
+        """
+        from .patch import patch_for
+        return patch_for(self, 'update_or_create', data, val, in_place)
+
+    def patch_for_filter(self, fn, data, in_place=False):
+        """
+        Like `patch_for_update()`, for `filter(fn, data)`.
+        """
+        from .patch import patch_for
+        return patch_for(self, 'filter', data, fn, in_place)
+
     def filter(self, fn, data):
         """
         Returns `data` with the specified path filtering nodes according
@@ -77,6 +228,105 @@ class JSONPath:
             return DatumInContext(value, path=Root(), context=None)
 
 
+def _check_setting(jsonpath, name):
+    """Raise an AttributeError if `name` is one of the `settings` of the
+    interned `jsonpath`, which would change for every expression sharing
+    it."""
+    if name in jsonpath.settings and '_interned' in jsonpath.__dict__:
+        raise AttributeError("%r is interned, and shared: its %s can't be "
+                             "changed" % (jsonpath, name))
+
+
+def _cached_hash(structural):
+    """Wrap the `__hash__` method `structural` to compute it once."""
+    def __hash__(self):
+        try:
+            return self.__dict__['_hash']
+        except KeyError:
+            value = self.__dict__['_hash'] = structural(self)
+            return value
+    __hash__.__doc__ = structural.__doc__
+    return __hash__
+
+
+# A weak reference to the canonical node equal to each key, or a list of
+# them for nodes differing in their settings, see `intern()`
+_interned = weakref.WeakKeyDictionary()
+
+
+def intern(jsonpath):
+    """
+    Return the canonical node equal to `jsonpath`: the first such node
+    interned and still alive, or `jsonpath` itself with its sub-expressions
+    interned. Expressions interned separately, such as the queries of a
+    cache, then share their common sub-expressions (and whatever these
+    compile and memoize) rather than holding copies of them, and compare by
+    identity.
+
+    `jsonpath` is left as it is: a node whose sub-expressions are replaced
+    is copied first. Interned nodes must not be modified, as this would
+    affect every expression sharing them: their `settings`, such as
+    `Filter.adaptive`, can't be changed, and are to be made before
+    interning. Nodes differing in them, or in those of their
+    sub-expressions, are told apart.
+    """
+    # Sub-expressions first, so that candidates are told apart by theirs
+    operands = {}
+    for name, value in vars(jsonpath).items():
+        if name.startswith('_'):
+            continue
+        interned = _intern_operand(value)
+        if interned is not value:
+            operands[name] = interned
+    if operands:
+        jsonpath = copy.copy(jsonpath)
+        jsonpath.__dict__.update(operands)
+
+    variants = _interned.get(jsonpath)
+    if variants is None:
+        _interned[jsonpath] = weakref.ref(jsonpath)
+    else:
+        if type(variants) is not list:
+            variants = [variants]
+        for variant in variants:
+            canonical = variant()
+            if canonical is not None and _same_operands(canonical, jsonpath) and all(
+                    getattr(canonical, name) == getattr(jsonpath, name)
+                    for name in jsonpath.settings):
+                return canonical
+        # Equal to the others but for settings
+        variants = [variant for variant in variants if variant() is not None]
+        _interned[jsonpath] = variants + [weakref.ref(jsonpath)]
+    if jsonpath.settings:
+        # See `_check_setting()`
+        jsonpath.__dict__['_interned'] = True
+    return jsonpath
+
+
+def _intern_operand(value):
+    if isinstance(value, JSONPath):
+        return intern(value)
+    if type(value) in (list, tuple):
+        items = [_intern_operand(item) for item in value]
+        if any(new is not old for new, old in zip(items, value)):
+            return type(value)(items)
+    return value
+
+
+def _same_operands(jsonpath, other):
+    """Whether the interned sub-expressions of the equal nodes `jsonpath`
+    and `other` are the same objects, and so have the same settings."""
+    def same(value, other_value):
+        if isinstance(value, JSONPath):
+            return value is other_value
+        if type(value) in (list, tuple):
+            return all(map(same, value, other_value))
+        return True
+    return all(same(value, other.__dict__[name])
+               for name, value in vars(jsonpath).items()
+               if not name.startswith('_'))
+
+
 class DatumInContext:
     """
     Represents a datum along a path from a context.
@@ -199,6 +449,228 @@ class AutoIdForDatum(DatumInContext):
         return isinstance(other, AutoIdForDatum) and other.datum == self.datum and self.id_field == other.id_field
 
 
+def _path_key(path):
+    """The key that the step `path` of a match addresses in its container:
+    that of a single field or index, or NOT_SET."""
+    if isinstance(path, Fields) and len(path.fields) == 1:
+        return path.fields[0]
+    if isinstance(path, Index) and len(path.indices) == 1:
+        return path.indices[0]
+    return NOT_SET
+
+
+def _container(datum):
+    """Return the datum of the container of `datum` and its key there,
+    skipping `This` steps, `(None, None)` for the document itself, or None
+    if `datum` is not a location of the document."""
+    while True:
+        context = datum.context
+        path = datum.path
+        if context is None:
+            if type(path) in (This, Root):
+                return None, None
+            return None
+        key = _path_key(path)
+        if key is not NOT_SET:
+            pass
+        elif type(path) in (This, Root) and context.value is datum.value:
+            datum = context
+            continue
+        else:
+            return None
+        try:
+            if context.value[key] is datum.value:
+                return context, key
+        except (LookupError, TypeError):
+            pass
+        return None
+
+
+def _identity(datum):
+    """
+    A hashable identity of the location of `datum`, equal for the matches
+    of different expressions at the same place of the document: the id of
+    its container and its key there. Matches with no location, such as
+    computed values, fall back to their full path.
+
+    Ids are only meaningful while the containers are alive, so callers keep
+    the matches they compare.
+    """
+    if not isinstance(datum, AutoIdForDatum):
+        parent = _container(datum)
+        if parent is not None:
+            context, key = parent
+            if context is None:
+                return (id(datum.value),)
+            return id(context.value), key
+    return str(datum.full_path)
+
+
+class Matches(list):
+    """
+    The list of `DatumInContext` returned by `find()`, for expressions
+    locating values of the document rather than computing new ones like
+    sorts or aggregates. Each match records the container it was found in
+    and its key there, through which the whole set can be written to the
+    document again without evaluating the expression a second time:
+
+    >>> data = {'foo': [{'baz': 1}, {'baz': 2}, {'baz': 3}]}
+    >>> matches = Child(Fields('foo'), Slice()).find(data)
+    >>> matches.set_all(lambda value, container, key: value['baz'] * 10)
+    >>> data
+    {'foo': [10, 20, 30]}
+    >>> Child(Fields('foo'), Index(0, 2)).find(data).delete_all()
+    >>> data
+    {'foo': [20]}
+
+    Matches that are no longer where they were found, or that have no such
+    location, like the document as a whole or the results of a sort, raise
+    a `JSONPathError` before anything is written.
+    """
+
+    __slots__ = ()
+
+    @staticmethod
+    def _parent(datum):
+        """Return the datum of the container of `datum` and its key there,
+        skipping `This` steps, or `(None, None)` for the document itself."""
+        parent = _container(datum)
+        if parent is None:
+            raise JSONPathError("%r is not a location of the document" % (datum,))
+        return parent
+
+    def _locations(self):
+        """Return `(datum, container, key)` for each match, checking that
+        the containers lead back to the document."""
+        locations = []
+        # Ids of the datums known to lead back to it
+        located = set()
+        for datum in self:
+            if isinstance(datum, AutoIdForDatum):
+                continue
+            parent, key = self._parent(datum)
+            if parent is None:
+                raise JSONPathError("%r has no container to write to" % (datum,))
+            locations.append((datum, parent.value, key))
+            while parent is not None and id(parent) not in located:
+                located.add(id(parent))
+                parent, __ = self._parent(parent)
+        return locations
+
+    def set_all(self, val):
+        """
+        Replace the value of each match with `val`, or with the result of
+        `val(value, container, key)` if it is callable. The matches take
+        their new values.
+        """
+        _mutated()
+        call = hasattr(val, '__call__')
+        for datum, container, key in self._locations():
+            new = val(container[key], container, key) if call else val
+            _set(container, key, new)
+            # Not through the setter, which would write it again
+            datum.__value__ = new
+
+    def delete_all(self):
+        """
+        Remove each match from its container. The elements of a list are
+        removed in one pass, their positions being those they had when
+        found. The matches are stale afterwards.
+        """
+        _mutated()
+        elements = {}
+        for __, container, key in self._locations():
+            if isinstance(container, list):
+                position = key % len(container)
+                elements.setdefault(id(container), (container, set()))[1].add(position)
+            elif key in container:
+                _remove(container, key)
+        for container, positions in elements.values():
+            _compact(lambda __: True, container, positions)
+
+
+class _Unaddressable(Exception):
+    """Raised for matches that can't be traced back to a location of the
+    document, such as the results of sorts."""
+
+
+class _CopyOnWrite:
+    """
+    Copies of the containers of a document along the paths written to, for
+    `JSONPath.updated()`; everything else is shared with the original.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.root = data
+        # Copies by id of the original container
+        self.copies = {}
+
+    def current(self, value):
+        """The copy of `value` made so far, or `value` itself."""
+        if isinstance(value, (dict, list)):
+            return self.copies.get(id(value), value)
+        return value
+
+    def replace(self, datum, new):
+        """Put `new` in place of the current value of `datum`, copying the
+        containers leading to it as needed."""
+        previous = self.current(datum.value)
+        while True:
+            if isinstance(datum.value, (dict, list)):
+                self.copies[id(datum.value)] = new
+            context = datum.context
+            path = datum.path
+            if context is None:
+                if datum.value is not self.data:
+                    raise _Unaddressable()
+                self.root = new
+                return
+            key = _path_key(path)
+            if key is not NOT_SET:
+                pass
+            elif isinstance(path, (This, Root)) and context.value is datum.value:
+                datum = context
+                continue
+            else:
+                raise _Unaddressable()
+
+            original = context.value
+            parent = self.copies.get(id(original))
+            if parent is not None:
+                # Left alone if it was replaced as a whole already, as
+                # update() leaves it detached
+                if parent[key] is previous:
+                    parent[key] = new
+                return
+            try:
+                if original[key] is not datum.value:
+                    raise _Unaddressable()
+            except (LookupError, TypeError):
+                raise _Unaddressable()
+            parent = copy.copy(original)
+            parent[key] = new
+            previous, new, datum = original, parent, context
+
+    @classmethod
+    def apply(cls, jsonpath, data, val, matches, updated):
+        """Return `data` with the current value of each of `matches`
+        replaced with `updated(value)`, or `jsonpath.update()` applied to a
+        deep copy if some of them can't be traced back to `data`."""
+        state = cls(data)
+        try:
+            for datum in matches:
+                if isinstance(datum, AutoIdForDatum):
+                    continue
+                value = state.current(datum.value)
+                new = updated(value)
+                if new is not value:
+                    state.replace(datum, new)
+        except _Unaddressable:
+            return JSONPath.updated(jsonpath, data, val)
+        return state.root
+
+
 class Root(JSONPath):
     """
     The JSONPath referring to the "root" object. Concrete syntax is '$'.
@@ -207,16 +679,19 @@ class Root(JSONPath):
 
     def find(self, data) -> List[DatumInContext]:
         if not isinstance(data, DatumInContext):
-            return [DatumInContext(data, path=Root(), context=None)]
+            return Matches([DatumInContext(data, path=Root(), context=None)])
         else:
             if data.context is None:
-                return [DatumInContext(data.value, context=None, path=Root())]
+                return Matches([DatumInContext(data.value, context=None, path=Root())])
             else:
                 return Root().find(data.context)
 
     def update(self, data, val):
         return val
 
+    def updated(self, data, val):
+        return val
+
     def filter(self, fn, data):
         return data if fn(data) else None
 
@@ -239,11 +714,14 @@ class This(JSONPath):
     """
 
     def find(self, datum):
-        return [DatumInContext.wrap(datum)]
+        return Matches([DatumInContext.wrap(datum)])
 
     def update(self, data, val):
         return val
 
+    def updated(self, data, val):
+        return val
+
     def filter(self, fn, data):
         return data if fn(data) else None
 
@@ -276,32 +754,77 @@ class Child(JSONPath):
         so cut it off right now rather than auto id the auto id
         """
 
+        if self.right.aggregating:
+            return self.right.aggregate(self.left.find_iter(datum))
+
+        # When the right only looks at the start of lists, as in
+        # `foo[/bar][0:10]`, the left needs to produce only that much.
+        length = self.right.prefix_length()
+        if length is None:
+            left_matches = self.left.find(datum)
+        else:
+            left_matches = self.left.find_prefix(datum, length)
+
+        return Matches([submatch
+                        for subdata in left_matches
+                        if not isinstance(subdata, AutoIdForDatum)
+                        for submatch in self.right.find(subdata)])
+
+    def find_iter(self, datum):
+        if self.right.aggregating:
+            yield from self.right.aggregate(self.left.find_iter(datum))
+            return
+
+        length = self.right.prefix_length()
+        if length is None:
+            left_matches = self.left.find_iter(datum)
+        else:
+            left_matches = self.left.find_prefix(datum, length)
+
+        for subdata in left_matches:
+            if not isinstance(subdata, AutoIdForDatum):
+                yield from self.right.find_iter(subdata)
+
+    def find_prefix(self, datum, length):
         return [submatch
                 for subdata in self.left.find(datum)
                 if not isinstance(subdata, AutoIdForDatum)
-                for submatch in self.right.find(subdata)]
+                for submatch in self.right.find_prefix(subdata, length)]
 
     def update(self, data, val):
         for datum in self.left.find(data):
             self.right.update(datum.value, val)
         return data
 
-    def find_or_create(self, datum):
+    def updated(self, data, val):
+        if isinstance(self.right, (This, Root)):
+            # update() can't replace the values it is applied to in place
+            return data
+        return _CopyOnWrite.apply(self, data, val, self.left.find(data),
+                                  lambda value: self.right.updated(value, val))
+
+    def find_or_create(self, datum, unplaced=None):
         datum = DatumInContext.wrap(datum)
         submatches = []
-        for subdata in self.left.find_or_create(datum):
+        for subdata in self.left.find_or_create(datum, unplaced):
             if isinstance(subdata, AutoIdForDatum):
                 # Extra special case: auto ids do not have children,
                 # so cut it off right now rather than auto id the auto id
                 continue
-            for submatch in self.right.find_or_create(subdata):
+            for submatch in self.right.find_or_create(subdata, unplaced):
                 submatches.append(submatch)
         return submatches
 
     def update_or_create(self, data, val):
-        for datum in self.left.find_or_create(data):
+        unplaced = []
+        for datum in self.left.find_or_create(data, unplaced):
             self.right.update_or_create(datum.value, val)
-        return _clean_list_keys(data)
+            if isinstance(datum.value, dict) and LIST_KEY in datum.value:
+                # An empty dict the right side turned into a list
+                _place_list_key(datum, unplaced)
+        if unplaced:
+            return _clean_list_keys(data)
+        return data
 
     def filter(self, fn, data):
         for datum in self.left.find(data):
@@ -312,12 +835,12 @@ class Child(JSONPath):
         return isinstance(other, Child) and self.left == other.left and self.right == other.right
 
     def __str__(self):
-        # Special case: If the right side is a `SortedThis` instance,
-        # do not inject a period between the left and right sides.
-        # Adding a period would corrupt the syntax and prevent re-parsing.
+        # Special case: If the right side is a `SortedThis` instance with
+        # sort fields, do not inject a period between the left and right
+        # sides. Adding a period would corrupt the syntax and prevent re-parsing.
         # Current module design creates circular imports, so imports happen here.
         from .ext.iterable import SortedThis
-        if isinstance(self.right, SortedThis):
+        if isinstance(self.right, SortedThis) and self.right.expressions:
             return f"{self.left}{self.right}"
 
         # Parentheses are required to ensure precedence.
@@ -339,7 +862,7 @@ class Parent(JSONPath):
 
     def find(self, datum):
         datum = DatumInContext.wrap(datum)
-        return [datum.context]
+        return Matches([datum.context])
 
     def __eq__(self, other):
         return isinstance(other, Parent)
@@ -369,13 +892,18 @@ class Where(JSONPath):
         self.right = right
 
     def find(self, data):
-        return [subdata for subdata in self.left.find(data) if self.right.find(subdata)]
+        return Matches([subdata for subdata in self.left.find(data) if self.right.find(subdata)])
 
     def update(self, data, val):
         for datum in self.find(data):
             datum.path.update(data, val)
         return data
 
+    def updated(self, data, val):
+        for datum in self.find(data):
+            data = datum.path.updated(data, val)
+        return data
+
     def filter(self, fn, data):
         for datum in self.find(data):
             datum.path.filter(fn, datum.value)
@@ -405,8 +933,8 @@ class WhereNot(Where):
 
     """
     def find(self, data):
-        return [subdata for subdata in self.left.find(data)
-                if not self.right.find(subdata)]
+        return Matches([subdata for subdata in self.left.find(data)
+                        if not self.right.find(subdata)])
 
     def __str__(self):
         return '%s wherenot %s' % (self.left, self.right)
@@ -420,6 +948,31 @@ class WhereNot(Where):
         return hash((self.left, self.right))
 
 
+def _split_aggregate(jsonpath):
+    """Split the `Child` chain of `jsonpath` at its first aggregating step,
+    into `(steps before, aggregate, steps after)`, or return None if it has
+    none. The steps before are `This()` and the steps after None when there
+    are none."""
+    if jsonpath.aggregating:
+        return This(), jsonpath, None
+    if not isinstance(jsonpath, Child):
+        return None
+    aggregated = _split_aggregate(jsonpath.left)
+    if aggregated is not None:
+        before, aggregate, after = aggregated
+        after = jsonpath.right if after is None else Child(after, jsonpath.right)
+        return before, aggregate, after
+    aggregated = _split_aggregate(jsonpath.right)
+    if aggregated is not None:
+        before, aggregate, after = aggregated
+        if not isinstance(before, This):
+            before = Child(jsonpath.left, before)
+        else:
+            before = jsonpath.left
+        return before, aggregate, after
+    return None
+
+
 class Descendants(JSONPath):
     """
     JSONPath that matches first the left expression then any descendant
@@ -437,6 +990,17 @@ class Descendants(JSONPath):
         # we cannot just delegate to that equivalence or we'll hit an
         # infinite loop. So right here we implement the coercion-free version.
 
+        # An aggregate on the right, as in `$..total.`sum``, applies to the
+        # matches of the steps before it under all the descendants at once
+        aggregated = _split_aggregate(self.right)
+        if aggregated is not None:
+            before, aggregate, after = aggregated
+            matches = Descendants(self.left, before).find(datum)
+            matches = aggregate.aggregate(matches)
+            if after is not None:
+                matches = [submatch for match in matches for submatch in after.find(match)]
+            return Matches(matches)
+
         # Get all left matches into a list
         left_matches = self.left.find(datum)
         if not isinstance(left_matches, list):
@@ -462,9 +1026,9 @@ class Descendants(JSONPath):
             return right_matches + list(recursive_matches)
 
         # TODO: repeatable iterator instead of list?
-        return [submatch
-                for left_match in left_matches
-                for submatch in match_recursively(left_match)]
+        return Matches([submatch
+                        for left_match in left_matches
+                        for submatch in match_recursively(left_match)])
 
     def is_singular(self):
         return False
@@ -496,6 +1060,33 @@ class Descendants(JSONPath):
 
         return data
 
+    def updated(self, data, val):
+        if isinstance(self.right, (This, Root)):
+            # update() can't replace the values it is applied to in place
+            return data
+
+        def updated_recursively(data):
+            if not (isinstance(data, list) or isinstance(data, dict)):
+                return data
+
+            new = self.right.updated(data, val)
+            if not (isinstance(new, list) or isinstance(new, dict)):
+                return new
+            copied = new is not data
+            keys = range(0, len(new)) if isinstance(new, list) else list(new.keys())
+            for key in keys:
+                value = new[key]
+                new_value = updated_recursively(value)
+                if new_value is not value:
+                    if not copied:
+                        new = copy.copy(new)
+                        copied = True
+                    new[key] = new_value
+            return new
+
+        return _CopyOnWrite.apply(self, data, val, self.left.find(data),
+                                  updated_recursively)
+
     def filter(self, fn, data):
         # Get all left matches into a list
         left_matches = self.left.find(data)
@@ -546,23 +1137,48 @@ class Union(JSONPath):
     WARNING: Any appearance of this being the _concatenation_ is
     coincidence. It may even be a bug! (or laziness)
     """
-    def __init__(self, left, right):
+    def __init__(self, left, right, distinct=False):
         self.left = left
         self.right = right
+        # Whether a location matched by both sides is returned once
+        self.distinct = distinct
 
     def is_singular(self):
         return False
 
     def find(self, data):
-        return self.left.find(data) + self.right.find(data)
+        if self.distinct:
+            return Matches(self.find_iter(data))
+        return Matches(self.left.find(data) + self.right.find(data))
+
+    def find_iter(self, data):
+        matches = chain(self.left.find_iter(data), self.right.find_iter(data))
+        if not self.distinct:
+            return matches
+        return self._distinct(matches)
+
+    @staticmethod
+    def _distinct(matches):
+        seen = set()
+        # Kept alive so that the ids in `seen` aren't reused
+        kept = []
+        for match in matches:
+            identity = _identity(match)
+            if identity not in seen:
+                seen.add(identity)
+                kept.append(match)
+                yield match
 
     def __eq__(self, other):
-        return isinstance(other, Union) and self.left == other.left and self.right == other.right
+        return (isinstance(other, Union) and self.left == other.left
+                and self.right == other.right and self.distinct == other.distinct)
 
     def __hash__(self):
-        return hash((self.left, self.right))
+        return hash((self.left, self.right, self.distinct))
 
     def __repr__(self) -> str:
+        if self.distinct:
+            return f"Union({self.left} | {self.right}, distinct=True)"
         return f"Union({self.left} | {self.right})"
 
     def __str__(self) -> str:
@@ -572,12 +1188,10 @@ class Intersect(JSONPath):
     """
     JSONPath for bits that match *both* patterns.
 
-    This can be accomplished a couple of ways. The most
-    efficient is to actually build the intersected
-    AST as in building a state machine for matching the
-    intersection of regular languages. The next
-    idea is to build a filtered data and match against
-    that.
+    The right side is found first and the locations of its matches hashed;
+    the matches of the left side are then produced lazily, in order, and
+    kept if the right side matched the same location, in O(n + m). A
+    location matched more than once on the left is returned once.
     """
     def __init__(self, left, right):
         self.left = left
@@ -587,7 +1201,14 @@ class Intersect(JSONPath):
         return False
 
     def find(self, data):
-        raise NotImplementedError()
+        return Matches(self.find_iter(data))
+
+    def find_iter(self, data):
+        # Kept alive, in this frame, with their ids
+        right = self.right.find(data)
+        found = {_identity(match) for match in right}
+        yield from Union._distinct(match for match in self.left.find_iter(data)
+                                   if _identity(match) in found)
 
     def __eq__(self, other):
         return isinstance(other, Intersect) and self.left == other.left and self.right == other.right
@@ -622,7 +1243,9 @@ class Fields(JSONPath):
             field_value = datum.value.get(field, NOT_SET)
             if field_value is NOT_SET:
                 if create:
-                    datum.value[field] = field_value = {}
+                    field_value = {}
+                    _set(datum.value, field, field_value)
+                    _mutated()
                 else:
                     return None
             return DatumInContext(field_value, path=Fields(field), context=datum)
@@ -642,14 +1265,14 @@ class Fields(JSONPath):
     def find(self, datum):
         return self._find_base(datum, create=False)
 
-    def find_or_create(self, datum):
+    def find_or_create(self, datum, unplaced=None):
         return self._find_base(datum, create=True)
 
     def _find_base(self, datum, create):
         datum = DatumInContext.wrap(datum)
         field_data = [self.get_field_datum(datum, field, create)
                       for field in self.reified_fields(datum)]
-        return [fd for fd in field_data if fd is not None]
+        return Matches([fd for fd in field_data if fd is not None])
 
     def update(self, data, val):
         return self._update_base(data, val, create=False)
@@ -657,24 +1280,32 @@ class Fields(JSONPath):
     def update_or_create(self, data, val):
         return self._update_base(data, val, create=True)
 
+    def updated(self, data, val):
+        if data is not None and type(data) is not bool and any(
+                field in data for field in self.reified_fields(DatumInContext.wrap(data))):
+            return self.update(copy.copy(data), val)
+        return data
+
     def _update_base(self, data, val, create):
         if data is not None:
+            _mutated()
             for field in self.reified_fields(DatumInContext.wrap(data)):
                 if create and field not in data:
-                    data[field] = {}
+                    _set(data, field, {})
                 if type(data) is not bool and field in data:
                     if hasattr(val, '__call__'):
-                        data[field] = val(data[field], data, field)
+                        _set(data, field, val(data[field], data, field))
                     else:
-                        data[field] = val
+                        _set(data, field, val)
         return data
 
     def filter(self, fn, data):
         if data is not None and isinstance(data, dict):
+            _mutated()
             for field in self.reified_fields(DatumInContext.wrap(data)):
                 if field in data:
                     if fn(data[field]):
-                        data.pop(field)
+                        _remove(data, field)
         return data
 
     def __str__(self):
@@ -714,16 +1345,18 @@ class Index(JSONPath):
     def find(self, datum):
         return self._find_base(datum, create=False)
 
-    def find_or_create(self, datum):
-        return self._find_base(datum, create=True)
+    def find_or_create(self, datum, unplaced=None):
+        return self._find_base(datum, create=True, unplaced=unplaced)
 
-    def _find_base(self, datum, create):
+    def _find_base(self, datum, create, unplaced=None):
         datum = DatumInContext.wrap(datum)
         if create:
             if datum.value == {}:
-                datum.value = _create_list_key(datum.value)
+                _create_list_key(datum.value)
+                _place_list_key(datum, unplaced)
             self._pad_value(datum.value)
-        rv = []
+            _mutated()
+        rv = Matches()
         for index in self.indices:
             # invalid indices do not crash, return [] instead
             if datum.value and len(datum.value) > index:
@@ -736,7 +1369,13 @@ class Index(JSONPath):
     def update_or_create(self, data, val):
         return self._update_base(data, val, create=True)
 
+    def updated(self, data, val):
+        if hasattr(val, '__call__') or any(len(data) > index for index in self.indices):
+            return self.update(copy.copy(data), val)
+        return data
+
     def _update_base(self, data, val, create):
+        _mutated()
         if create:
             if data == {}:
                 data = _create_list_key(data)
@@ -750,24 +1389,37 @@ class Index(JSONPath):
                     try:
                         if isinstance(val, list):
                             # allows somelist[5,1,2] = [some_value, another_value, third_value]
-                            data[index] = val.pop(0)
+                            _set(data, index, val.pop(0))
                         else:
-                            data[index] = val
+                            _set(data, index, val)
                     except Exception as e:
                         raise e
         return data
 
     def filter(self, fn, data):
+        _mutated()
+        if isinstance(data, list):
+            # Indices refer to the list as it is, out of range ones matching
+            # nothing as with find()
+            length = len(data)
+            return _compact(fn, data, (index % length for index in self.indices
+                                       if -length <= index < length))
         for index in self.indices:
             if fn(data[index]):
-                data.pop(index)  # relies on mutation :(
+                _remove(data, index)
         return data
 
+    def prefix_length(self):
+        if not self.indices or min(self.indices) < 0:
+            return None
+        return max(self.indices) + 1
+
     def __eq__(self, other):
-        return isinstance(other, Index) and sorted(self.indices) == sorted(other.indices)
+        # Order matters: it is that of the matches
+        return isinstance(other, Index) and self.indices == other.indices
 
     def __str__(self):
-        return '[%i]' % self.indices
+        return '[%s]' % ','.join(map(str, self.indices))
 
     def __repr__(self):
         return '%s(indices=%r)' % (self.__class__.__name__, self.indices)
@@ -776,10 +1428,11 @@ class Index(JSONPath):
         _max = max(self.indices)
         if len(value) <= _max:
             pad = _max - len(value) + 1
+            _resize(value)
             value += [{} for __ in range(pad)]
 
     def __hash__(self):
-        return hash(self.index)
+        return hash(self.indices)
 
 
 class Slice(JSONPath):
@@ -816,7 +1469,7 @@ class Slice(JSONPath):
 
         # Used for catching null value instead of empty list in path
         if datum.value is None:
-            return []
+            return Matches()
         # Here's the hack. If it is a dictionary or some kind of constant,
         # put it in a single-element list
         if (isinstance(datum.value, dict) or isinstance(datum.value, (int, float, str, bool))):
@@ -825,16 +1478,52 @@ class Slice(JSONPath):
         # Some iterators do not support slicing but we can still
         # at least work for '*'
         if self.start is None and self.end is None and self.step is None:
-            return [DatumInContext(datum.value[i], path=Index(i), context=datum) for i in range(0, len(datum.value))]
+            return Matches([DatumInContext(datum.value[i], path=Index(i), context=datum) for i in range(0, len(datum.value))])
         else:
-            return [DatumInContext(datum.value[i], path=Index(i), context=datum) for i in range(0, len(datum.value))[self.start:self.end:self.step]]
+            return Matches([DatumInContext(datum.value[i], path=Index(i), context=datum) for i in range(0, len(datum.value))[self.start:self.end:self.step]])
+
+    def find_iter(self, datum):
+        datum = DatumInContext.wrap(datum)
+        if datum.value is None:
+            return iter(())
+        if (isinstance(datum.value, dict) or isinstance(datum.value, (int, float, str, bool))):
+            return self.find_iter(DatumInContext([datum.value], path=datum.path, context=datum.context))
+        return (DatumInContext(datum.value[i], path=Index(i), context=datum)
+                for i in range(0, len(datum.value))[self.start:self.end:self.step])
+
+    def prefix_length(self):
+        if ((self.start or 0) < 0 or self.end is None or self.end < 0
+                or (self.step or 1) < 0):
+            return None
+        return self.end
 
     def update(self, data, val):
         for datum in self.find(data):
             datum.path.update(data, val)
         return data
 
+    def updated(self, data, val):
+        matches = self.find(data)
+        if isinstance(data, list):
+            if matches:
+                data = copy.copy(data)
+                for datum in matches:
+                    datum.path.update(data, val)
+            return data
+        for datum in matches:
+            data = datum.path.updated(data, val)
+        return data
+
     def filter(self, fn, data):
+        if isinstance(data, list):
+            _mutated()
+            if self.start is None and self.end is None and self.step is None:
+                kept = [value for value in data if not fn(value)]
+                if len(kept) < len(data):
+                    _resize(data)
+                    data[:] = kept
+                return data
+            return _compact(fn, data, range(len(data))[self.start:self.end:self.step])
         while True:
             length = len(data)
             for datum in self.find(data):
@@ -868,12 +1557,69 @@ def _create_list_key(dict_):
     """
     Adds a list to a dictionary by reference and returns the list.
 
-    See `_clean_list_keys()`
+    See `_place_list_key()` and `_clean_list_keys()`
     """
-    dict_[LIST_KEY] = new_list = [{}]
+    new_list = [{}]
+    _set(dict_, LIST_KEY, new_list)
     return new_list
 
 
+def _in_document(datum):
+    """Whether the containers of `datum` can be traced back, one by one, to
+    the document."""
+    while True:
+        parent = _container(datum)
+        if parent is None:
+            return False
+        datum = parent[0]
+        if datum is None:
+            return True
+
+
+def _place_list_key(datum, unplaced=None):
+    """
+    Replace the placeholder `datum.value`, {LIST_KEY: [...]}, with its list
+    in the container it was found in, so that `update_or_create()` only
+    fixes up the containers it created lists in rather than the whole
+    document. `datum` is given the list as its value either way.
+
+    Placeholders of the root, or of values that can't be traced back to
+    the document, such as those found through the single-element list a
+    `Slice` wraps a dict in, are appended to `unplaced`, if given, for
+    `Child.update_or_create()` to clean up.
+    """
+    placeholder = datum.value
+    new_list = placeholder[LIST_KEY]
+    parent = _container(datum)
+    # Not through the setter, which would update the container by the path
+    datum.__value__ = new_list
+    if parent is None or parent[0] is None or not _in_document(parent[0]):
+        if unplaced is not None:
+            unplaced.append(placeholder)
+        return
+    context, key = parent
+    _set(context.value, key, new_list)
+    _remove(placeholder, LIST_KEY)
+
+
+def _compact(fn, data, positions):
+    """
+    Remove the elements of the list `data` at `positions` for which `fn` is
+    true, in a single pass building the list of those kept, and return
+    `data`.
+
+    >>> _compact(lambda value: value > 1, [1, 2, 3, 4], [0, 1, 3])
+    [1, 3]
+
+    """
+    removed = {position for position in positions if fn(data[position])}
+    if removed:
+        _resize(data)
+        data[:] = [value for position, value in enumerate(data)
+                   if position not in removed]
+    return data
+
+
 def _clean_list_keys(struct_):
     """
     Replace {LIST_KEY: ['foo', 'bar']} with ['foo', 'bar'].
@@ -884,11 +1630,15 @@ def _clean_list_keys(struct_):
     """
     if(isinstance(struct_, list)):
         for ind, value in enumerate(struct_):
-            struct_[ind] = _clean_list_keys(value)
+            cleaned = _clean_list_keys(value)
+            if cleaned is not value:
+                _set(struct_, ind, cleaned)
     elif(isinstance(struct_, dict)):
         if(LIST_KEY in struct_):
             return _clean_list_keys(struct_[LIST_KEY])
         else:
             for key, value in struct_.items():
-                struct_[key] = _clean_list_keys(value)
+                cleaned = _clean_list_keys(value)
+                if cleaned is not value:
+                    _set(struct_, key, cleaned)
     return struct_
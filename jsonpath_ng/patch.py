@@ -0,0 +1,227 @@
+"""
+RFC 6902 JSON Patch operations for the changes made by `update()`,
+`filter()` and `update_or_create()`, see `JSONPath.patch_for_update()`.
+"""
+
+import copy
+from functools import reduce
+
+from . import jsonpath as _jsonpath
+from .bulk import _keys
+from .jsonpath import AutoIdForDatum, Child
+from .trie import split
+
+
+def pointer(keys):
+    """The RFC 6901 JSON Pointer to the location reached by `keys`."""
+    return ''.join('/' + str(key).replace('~', '~0').replace('/', '~1')
+                   for key in keys)
+
+
+def _tokens(path):
+    return [token.replace('~1', '/').replace('~0', '~')
+            for token in path.split('/')[1:]]
+
+
+class _Copies:
+    """Shallow copies of the containers of a document along some paths,
+    sharing everything else, and the originals of the copies."""
+
+    def __init__(self, data):
+        self.data = data
+        self.root = self._copy(data)
+        # Originals by id of the copy, along with the copy to keep it alive
+        self.originals = {id(self.root): (self.root, data)}
+        self.copies = {id(data): self.root}
+
+    @staticmethod
+    def _copy(value):
+        return copy.copy(value) if isinstance(value, (dict, list)) else value
+
+    def along(self, keys):
+        """Copy the containers along `keys`, down to the value it reaches."""
+        original, current = self.data, self.root
+        for key in keys:
+            child = original[key]
+            if not isinstance(child, (dict, list)):
+                return
+            copied = self.copies.get(id(child))
+            if copied is None:
+                copied = self._copy(child)
+                self.copies[id(child)] = copied
+                self.originals[id(copied)] = (copied, child)
+            current[key] = copied
+            original, current = child, copied
+
+    @classmethod
+    def deep(cls, data):
+        """Copies of all the containers of `data`."""
+        copies = cls.__new__(cls)
+        copies.data = data
+        copies.root = copy.deepcopy(data)
+        copies.originals = {}
+        copies.copies = {}
+
+        def pair(original, copied):
+            if isinstance(original, (dict, list)):
+                copies.originals[id(copied)] = (copied, original)
+                copies.copies[id(original)] = copied
+                keys = original if isinstance(original, dict) else range(len(original))
+                for key in keys:
+                    pair(original[key], copied[key])
+        pair(data, copies.root)
+        return copies
+
+    def original(self, value):
+        """The value `value` is a copy of, or `value` itself."""
+        entry = self.originals.get(id(value))
+        return value if entry is None else entry[1]
+
+
+def _prepare(data, matches):
+    """Return `_Copies` of `data` along `matches`, or of all of it if some of
+    them can't be traced back to it."""
+    paths = []
+    for match in matches:
+        if isinstance(match, AutoIdForDatum):
+            continue
+        keys = _keys(match, data)
+        if keys is None:
+            return _Copies.deep(data)
+        paths.append(keys)
+    copies = _Copies(data)
+    for keys in paths:
+        copies.along(keys)
+    return copies
+
+
+def _prefixes(jsonpath):
+    """`jsonpath` and the expressions made of its leading steps."""
+    steps = split(jsonpath)
+    return [reduce(Child, steps[:i]) for i in range(1, len(steps))] + [jsonpath]
+
+
+class _Diff:
+    """The operations turning a document into another made from `_Copies`
+    of it, shared values being skipped rather than compared."""
+
+    def __init__(self, copies):
+        self.copies = copies
+        self.ops = []
+
+    def same(self, old, new):
+        if new is old or self.copies.original(new) is old:
+            return True
+        return (not isinstance(new, (dict, list)) and type(old) is type(new)
+                and old == new)
+
+    def diff(self, old, new, keys):
+        if new is old:
+            return
+        if self.copies.original(new) is old:
+            if isinstance(new, dict):
+                self.diff_dict(old, new, keys)
+            else:
+                self.diff_list(old, new, keys)
+        elif not self.same(old, new):
+            self.ops.append({'op': 'replace', 'path': pointer(keys), 'value': new})
+
+    def diff_dict(self, old, new, keys):
+        for key in old:
+            if key not in new:
+                self.ops.append({'op': 'remove', 'path': pointer(keys + [key])})
+        for key, value in new.items():
+            if key in old:
+                self.diff(old[key], value, keys + [key])
+            else:
+                self.ops.append({'op': 'add', 'path': pointer(keys + [key]),
+                                 'value': value})
+
+    def diff_list(self, old, new, keys):
+        if len(new) < len(old):
+            # Elements removed, as by filter(): the others are matched in
+            # order, falling back to comparing positions
+            kept = []
+            i = 0
+            for j, value in enumerate(new):
+                while i < len(old) and not self.same(old[i], value):
+                    i += 1
+                if i == len(old):
+                    kept = list(range(len(new)))
+                    break
+                kept.append(i)
+                i += 1
+            removed = set(range(len(old))).difference(kept)
+            for i in sorted(removed, reverse=True):
+                self.ops.append({'op': 'remove', 'path': pointer(keys + [i])})
+            for j, i in enumerate(kept):
+                self.diff(old[i], new[j], keys + [j])
+            return
+
+        for i in range(len(old)):
+            self.diff(old[i], new[i], keys + [i])
+        # Elements added at the end, as by update_or_create()
+        for j in range(len(old), len(new)):
+            self.ops.append({'op': 'add', 'path': pointer(keys + [j]),
+                             'value': new[j]})
+
+
+def apply_patch(data, ops):
+    """Apply the `ops` made by `patch_for()` to `data` in place and return
+    it, or the new document for an operation replacing it as a whole."""
+    for op in ops:
+        tokens = _tokens(op['path'])
+        if not tokens:
+            data = op['value']
+            continue
+        container = data
+        for token in tokens[:-1]:
+            container = container[int(token) if isinstance(container, list) else token]
+        key = tokens[-1]
+        if isinstance(container, list):
+            key = int(key)
+            if op['op'] == 'add':
+                _jsonpath._insert(container, key, op['value'])
+                continue
+        elif key not in container:
+            # Dict keys that aren't strings
+            for other in container:
+                if str(other) == key:
+                    key = other
+                    break
+        if op['op'] == 'remove':
+            _jsonpath._remove(container, key)
+        else:
+            _jsonpath._set(container, key, op['value'])
+    return data
+
+
+def patch_for(jsonpath, operation, data, argument, in_place=False):
+    """
+    Return the JSON Patch operations (as dicts with 'op', 'path' and
+    'value') of applying `operation`, one of 'update', 'filter' or
+    'update_or_create', of `jsonpath` to `data` with `argument`.
+
+    The operation is applied to copies of the containers it may write to,
+    the rest being shared with `data` and left out of the comparison.
+    `data` is left as it is unless `in_place` is set.
+    """
+    if operation == 'update_or_create':
+        matches = [match for prefix in _prefixes(jsonpath)
+                   for match in prefix.find(data)]
+    else:
+        matches = jsonpath.find(data)
+    copies = _prepare(data, matches)
+
+    if operation == 'filter':
+        result = jsonpath.filter(argument, copies.root)
+    else:
+        result = getattr(jsonpath, operation)(copies.root, argument)
+
+    differences = _Diff(copies)
+    differences.diff(data, result, [])
+    ops = differences.ops
+    if in_place:
+        apply_patch(data, [op for op in ops if op['path']])
+    return ops
+
@@ -0,0 +1,58 @@
+"""
+Many expressions evaluated together, in one pass per document.
+"""
+
+from .jsonpath import DatumInContext
+from .parser import parse
+from .trie import PathTrie, split, datum_step, walk
+
+
+class QuerySet:
+    """
+    A set of expressions merged on their common leading steps, so that
+    finding all of them in a document evaluates each shared step once.
+
+    `queries` maps keys to expressions, either strings or parsed `JSONPath`
+    objects (to use extensions, pass expressions parsed with
+    `jsonpath_ng.ext.parse`), or is a list of expressions keyed by their
+    position in it.
+    """
+
+    def __init__(self, queries=()):
+        self.trie = PathTrie()
+        self.queries = {}
+        self._compiled = None
+        if not hasattr(queries, 'items'):
+            queries = dict(enumerate(queries))
+        for key, expression in queries.items():
+            self.add(key, expression)
+
+    def add(self, key, expression):
+        """Add `expression` under `key`, which must not be in use."""
+        if key in self.queries:
+            raise KeyError('%r is already in the query set' % (key,))
+        if isinstance(expression, str):
+            expression = parse(expression)
+        self.queries[key] = expression
+        self.trie.add(split(expression), key)
+        self._compiled = None
+
+    def find(self, data):
+        """
+        Return a dict mapping each key to the matches of its expression in
+        `data`, as `expression.find(data)` would return them.
+        """
+        if self._compiled is None:
+            self._compiled = self.trie.compile(datum_step)
+        found = {}
+        walk(self._compiled, [DatumInContext.wrap(data)], found)
+        return {key: list(found.get(key, ())) for key in self.queries}
+
+    def __len__(self):
+        return len(self.queries)
+
+    def __contains__(self, key):
+        return key in self.queries
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.queries)
@@ -0,0 +1,129 @@
+"""
+Transactions recording the writes made to documents through this package,
+so that they can be undone without copying the documents beforehand.
+"""
+
+from . import jsonpath as _jsonpath
+from .jsonpath import NOT_SET
+
+# Log entries, as `(kind, container, key, previous value)`
+SET, REMOVED, INSERTED, ELEMENTS = range(4)
+
+
+class Transaction:
+    """
+    The undo log of the writes made through this package while it is
+    active, see `transaction()`.
+
+    Each entry is the previous value of a slot of a container that was set
+    or removed, the position of an element inserted into a list, or the
+    previous elements of a list whose length changed as a whole (padding,
+    or the removal of several elements in one pass).
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.log = []
+        self.outer = None
+        self._token = None
+
+    def slot(self, container, key):
+        """Record the value at `container[key]`, about to be set."""
+        if type(container) is list:
+            if not -len(container) <= key < len(container):
+                # The write fails
+                return
+            if key < 0:
+                key += len(container)
+        self.log.append((SET, container, key, container.get(key, NOT_SET)
+                         if type(container) is dict else container[key]))
+
+    def removed(self, container, key):
+        """Record the value at `container[key]`, about to be removed."""
+        if type(container) is list and key < 0:
+            key += len(container)
+        self.log.append((REMOVED, container, key, container[key]))
+
+    def inserted(self, container, index):
+        """Record the insertion of an element into the list `container`
+        at `index`."""
+        length = len(container)
+        if index < 0:
+            index = max(index + length, 0)
+        self.log.append((INSERTED, container, min(index, length), None))
+
+    def elements(self, container):
+        """Record the elements of the list `container`, about to change."""
+        self.log.append((ELEMENTS, container, None, list(container)))
+
+    def __len__(self):
+        return len(self.log)
+
+    def rollback(self):
+        """
+        Undo the writes recorded so far, the last first, and return `data`.
+        The cost is that of the writes rather than of the document, but for
+        lists recorded as a whole. Keys restored to dicts come last in them.
+        """
+        log, self.log = self.log, []
+        for kind, container, key, previous in reversed(log):
+            if kind == ELEMENTS:
+                container[:] = previous
+            elif kind == INSERTED:
+                del container[key]
+            elif kind == REMOVED and type(container) is list:
+                container.insert(key, previous)
+            elif previous is NOT_SET:
+                del container[key]
+            else:
+                container[key] = previous
+        _jsonpath._mutated()
+        return self.data
+
+    def commit(self):
+        """Keep the writes recorded so far, forgetting them or, within
+        another transaction, handing them over to it."""
+        if self.outer is not None:
+            self.outer.log.extend(self.log)
+        self.log = []
+
+    def __enter__(self):
+        self.outer = _jsonpath._undo.get()
+        self._token = _jsonpath._undo.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _jsonpath._undo.reset(self._token)
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+
+def transaction(data):
+    """
+    Return a context manager recording the writes that the update, filter
+    and create methods of expressions, `Matches`, `redact()`,
+    `bulk_update()` and `apply_patch()` make while it is active, so that
+    they can be undone with `rollback()` instead of working on a deep copy
+    of `data`:
+
+    >>> from jsonpath_ng import parse, transaction
+    >>> data = {'foo': [{'baz': 1}, {'baz': 2}]}
+    >>> with transaction(data) as tx:
+    ...     parse('foo[*].baz').update(data, 3)
+    ...     parse('foo[0]').filter(lambda d: True, data)
+    ...     tx.rollback()
+    {'foo': [{'baz': 3}, {'baz': 3}]}
+    {'foo': [{'baz': 3}]}
+    {'foo': [{'baz': 1}, {'baz': 2}]}
+
+    The writes are rolled back as well if the block raises, and kept
+    otherwise. The writes the same thread (or asyncio task) makes to any
+    document are recorded, not only to `data`, but those of the callables
+    given to the methods, or replacing the document as a whole, are not.
+    Transactions may be nested, and the writes of the inner ones are rolled
+    back with the outer ones.
+    """
+    return Transaction(data)
@@ -0,0 +1,117 @@
+"""
+Documents built from others by a declarative mapping of target paths to
+source expressions.
+"""
+
+from .bulk import _parsed
+from .columns import _Plan
+from .jsonpath import Fields, Index, Root, Slice
+from .trie import split
+
+# The step of a target path receiving each of the values of its source
+EACH = object()
+
+
+def _target(jsonpath):
+    """Compile the target path `jsonpath` into the tuple of the keys it
+    leads through: names, positions, and at most one `EACH`."""
+    steps = split(jsonpath)
+    if type(steps[0]) is Root:
+        steps = steps[1:]
+    keys = []
+    for step in steps:
+        if (type(step) is Fields and len(step.fields) == 1
+                and step.fields[0] != '*'):
+            keys.append(step.fields[0])
+        elif (type(step) is Index and len(step.indices) == 1
+                and step.indices[0] >= 0):
+            keys.append(step.indices[0])
+        elif (type(step) is Slice and EACH not in keys
+                and (step.start, step.end, step.step) == (None, None, None)):
+            keys.append(EACH)
+        else:
+            raise ValueError(
+                "%s is not a target: targets are made of fields, positive "
+                "indices and at most one [*]" % jsonpath)
+    if not keys:
+        raise ValueError("%s is not a target: the document itself can't be "
+                         "assigned" % jsonpath)
+    return tuple(keys)
+
+
+def _assign(document, keys, value):
+    """Set `value` at the location `keys` leads to from the dict
+    `document`, creating dicts and lists along the way as
+    `update_or_create()` does."""
+    container = document
+    last = len(keys) - 1
+    for i, key in enumerate(keys):
+        if type(container) is list and len(container) <= key:
+            container.extend({} for __ in range(key + 1 - len(container)))
+        if i == last:
+            container[key] = value
+            return
+        indexed = type(keys[i + 1]) is int
+        if type(container) is list or key in container:
+            child = container[key]
+            # An empty dict becomes a list, as with find_or_create()
+            if isinstance(child, (dict, list)) and not (indexed and child == {}):
+                container = child
+                continue
+        child = [] if indexed else {}
+        container[key] = child
+        container = child
+
+
+class Transform:
+    """
+    A mapping of target paths to source expressions, building new documents
+    from others.
+
+    `spec` maps each target path, made of fields, positive indices and at
+    most one `[*]`, to the expression its values come from; both may be
+    strings or parsed `JSONPath` objects (to use extensions in sources, pass
+    expressions parsed with `jsonpath_ng.ext.parse`). All of them are parsed
+    once, and the sources are evaluated together in one walk of the
+    document, steps they have in common being evaluated once.
+
+    A target with a `[*]` receives every value its source matches, the
+    i-th at position i of the list; other targets receive the first one.
+    Targets whose source matches nothing are left out.
+
+    >>> transform = Transform({'customer.name': '$.user.full_name',
+    ...                        'lines[*].sku': '$.items[*].product.sku'})
+    >>> transform.apply({'user': {'full_name': 'Ann'},
+    ...                  'items': [{'product': {'sku': 'a'}},
+    ...                            {'product': {'sku': 'b'}}]})
+    {'customer': {'name': 'Ann'}, 'lines': [{'sku': 'a'}, {'sku': 'b'}]}
+    """
+
+    def __init__(self, spec):
+        spec = list(spec.items())
+        targets = _parsed([target for target, __ in spec])
+        sources = _parsed([source for __, source in spec])
+        # Pairs rather than a dict, parsed paths being possibly unhashable
+        self.spec = list(zip(targets, sources))
+        self.targets = [_target(target) for target in targets]
+        # Sources are keyed by position, as targets may repeat them
+        self.plan = _Plan(dict(enumerate(sources)))
+
+    def apply(self, data):
+        """Return the document built from `data`."""
+        values = self.plan.run(data)
+        document = {}
+        for position, keys in enumerate(self.targets):
+            found = values.get(position)
+            if not found:
+                continue
+            if EACH not in keys:
+                _assign(document, keys, found[0])
+                continue
+            each = keys.index(EACH)
+            for i, value in enumerate(found):
+                _assign(document, keys[:each] + (i,) + keys[each + 1:], value)
+        return document
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.spec)
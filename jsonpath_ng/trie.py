@@ -0,0 +1,174 @@
+"""
+Many expressions merged on their common leading steps, so that operations
+applying all of them to a document evaluate each shared step once.
+"""
+
+from . import jsonpath as _jsonpath
+from .jsonpath import JSONPath, Child, Root, Parent, Fields, DatumInContext, NOT_SET
+
+# Types of the values a field never matches in
+NO_FIELDS = {list, str, int, float, bool, type(None)}
+
+
+def split(jsonpath):
+    """Return the steps of `jsonpath`: the operands of its `Child` chain,
+    outermost last. Anything else, such as a `Union`, is a single step, as
+    is a grouped right-hand side with an aggregate, as in
+    `a[*].(b[*].`sum`)`, which aggregates per match of its left."""
+    if isinstance(jsonpath, Child):
+        if _aggregates(jsonpath.right):
+            return split(jsonpath.left) + [jsonpath.right]
+        return split(jsonpath.left) + split(jsonpath.right)
+    return [jsonpath]
+
+
+def _aggregates(jsonpath):
+    """Whether the `Child` chain of `jsonpath` has an aggregating step."""
+    if isinstance(jsonpath, Child):
+        return _aggregates(jsonpath.left) or _aggregates(jsonpath.right)
+    return jsonpath.aggregating
+
+
+def uses_context(jsonpath):
+    """Whether `jsonpath` reads anything outside of the value it is applied
+    to, through a `Root` or a `Parent` anywhere in it."""
+    if isinstance(jsonpath, (Root, Parent)):
+        return True
+    for value in vars(jsonpath).values():
+        operands = value if isinstance(value, (list, tuple)) else (value,)
+        for operand in operands:
+            if isinstance(operand, JSONPath) and uses_context(operand):
+                return True
+    return False
+
+
+class PathTrie:
+    """A node of a trie of expressions split into steps.
+
+    `keys` lists the keys of the expressions ending here and `children`
+    maps the repr of each next step to `(step, PathTrie)` pairs, steps with
+    the same repr being told apart by equality.
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.children = {}
+
+    def add(self, steps, key):
+        """Add the expression made of `steps` under `key`."""
+        node = self
+        for step in steps:
+            node = node.child(step)
+        node.keys.append(key)
+
+    def child(self, step):
+        """Return the node following `step`, creating it if needed."""
+        pairs = self.children.setdefault(repr(step), [])
+        for other, node in pairs:
+            if other == step:
+                return node
+        node = PathTrie()
+        pairs.append((step, node))
+        return node
+
+    def steps(self):
+        """Iterate over `(step, PathTrie)` pairs for the next steps."""
+        for pairs in self.children.values():
+            yield from pairs
+
+    def __len__(self):
+        """The number of nodes below this one."""
+        return sum(1 + len(node) for __, node in self.steps())
+
+    def compile(self, compile_step):
+        """Compile this trie for `walk()`, each step being turned into a
+        function mapping a list of matches to the list of their matches by
+        `compile_step(step)`."""
+        children = [(compile_step(step), node.compile(compile_step),
+                     step.aggregating)
+                    for step, node in self.steps()]
+        # Aggregating steps produce results even from no matches, so their
+        # branch has to be walked regardless
+        aggregating = any(step_aggregating or node[2]
+                          for __, node, step_aggregating in children)
+        return (self.keys, [(step, node) for step, node, __ in children],
+                aggregating)
+
+
+def walk(compiled, matches, results):
+    """Walk a compiled trie from `matches`, setting `results[key]` to the
+    matches of each expression that has any."""
+    keys, children, __ = compiled
+    for key in keys:
+        results[key] = matches
+    for step, node in children:
+        found = step(matches)
+        if found or node[2]:
+            walk(node, found, results)
+
+
+def _single_field(jsonpath):
+    """The name `jsonpath` looks up, if it is a plain single field."""
+    if (isinstance(jsonpath, Fields) and len(jsonpath.fields) == 1
+            and jsonpath.fields[0] != '*'):
+        return jsonpath.fields[0]
+    return None
+
+
+def datum_step(jsonpath):
+    """Compile `jsonpath` into a step over `DatumInContext` matches."""
+    if jsonpath.aggregating:
+        return lambda matches: jsonpath.aggregate(iter(matches))
+
+    def step(matches):
+        return [match for datum in matches for match in jsonpath.find(datum)]
+
+    name = _single_field(jsonpath)
+    if name is None:
+        return step
+
+    def field_step(matches):
+        if _jsonpath.auto_id_field is not None:
+            return step(matches)
+        found = []
+        for datum in matches:
+            value = datum.value
+            if type(value) is dict:
+                value = value.get(name, NOT_SET)
+                if value is not NOT_SET:
+                    found.append(DatumInContext(value, path=jsonpath, context=datum))
+            elif type(value) not in NO_FIELDS:
+                found.extend(jsonpath.find(datum))
+        return found
+    return field_step
+
+
+def value_step(jsonpath):
+    """Compile `jsonpath` into a step over plain values, for expressions
+    that don't read outside of them (see `uses_context()`)."""
+    if jsonpath.aggregating:
+        def step(values):
+            return [match.value for match in jsonpath.aggregate(
+                DatumInContext.wrap(value) for value in values)]
+    else:
+        def step(values):
+            return [match.value for value in values
+                    for match in jsonpath.find(DatumInContext.wrap(value))]
+
+    name = _single_field(jsonpath)
+    if name is None:
+        return step
+
+    def field_step(values):
+        if _jsonpath.auto_id_field is not None:
+            return step(values)
+        found = []
+        for value in values:
+            if type(value) is dict:
+                value = value.get(name, NOT_SET)
+                if value is not NOT_SET:
+                    found.append(value)
+            elif type(value) not in NO_FIELDS:
+                found.extend(step([value]))
+        return found
+    return field_step
@@ -0,0 +1,50 @@
+import pytest
+
+from jsonpath_ng.ext import parse
+from jsonpath_ng.ext import arithmetic
+
+
+@pytest.fixture
+def data():
+    return {
+        "items": [
+            {"price": 2, "qty": 3},
+            {"price": None, "qty": 2},
+            {"price": 1.5, "qty": 0},
+        ]
+    }
+
+
+@pytest.mark.parametrize(
+    "on_error, expected",
+    [
+        pytest.param("abort", [], id="abort"),
+        pytest.param("skip", [6, 0.0], id="skip"),
+        pytest.param("null", [6, None, 0.0], id="null"),
+    ],
+)
+def test_on_error(data, on_error, expected):
+    jsonpath = parse("$.items[*].price * $.items[*].qty")
+    jsonpath.on_error = on_error
+    results = jsonpath.find(data)
+    assert [r.value for r in results] == expected
+
+
+def test_on_error_default(data, monkeypatch):
+    monkeypatch.setattr(arithmetic, "on_error", "skip")
+    results = parse("$.items[*].qty + $.items[*].price").find(data)
+    assert [r.value for r in results] == [5, 1.5]
+
+
+def test_division_by_zero_is_an_element_error(data):
+    operation = arithmetic.Operation(
+        parse("$.items[*].price"), "/", parse("$.items[*].qty")
+    )
+    assert operation.find(data) == []
+    operation.on_error = "null"
+    assert [r.value for r in operation.find(data)] == [2 / 3, None, None]
+
+
+def test_on_error_invalid():
+    with pytest.raises(ValueError):
+        arithmetic.Operation(1, "+", 2, on_error="ignore")
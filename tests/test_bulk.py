@@ -0,0 +1,252 @@
+import pytest
+from hypothesis import assume, example, given, settings, strategies as st
+
+from jsonpath_ng import QuerySet, project
+from jsonpath_ng.ext import parse
+
+
+@pytest.fixture
+def data():
+    return {
+        "id": 1,
+        "user": {"name": "a", "email": "a@example.com", "address": {"city": "x"}},
+        "items": [
+            {"sku": "s1", "qty": 1, "tags": ["t"]},
+            {"sku": "s2", "qty": 5},
+            {"sku": "s3", "qty": 3},
+        ],
+    }
+
+
+@pytest.mark.parametrize(
+    "expressions, expected",
+    [
+        pytest.param(
+            ["$.id", "$.user.name", "$.items[*].sku"],
+            {"id": 1, "user": {"name": "a"}, "items": [{"sku": "s1"}, {"sku": "s2"}, {"sku": "s3"}]},
+            id="fields",
+        ),
+        pytest.param(
+            ["items[?qty > 2].sku", "items[-1].qty"],
+            {"items": [{"sku": "s2"}, {"sku": "s3", "qty": 3}]},
+            id="compacted_list",
+        ),
+        pytest.param(
+            ["user.address.city", "user"],
+            {"user": {"name": "a", "email": "a@example.com", "address": {"city": "x"}}},
+            id="ancestor_wins",
+        ),
+        pytest.param(
+            ["$.items[0].tags[0]", "$..city"],
+            {"user": {"address": {"city": "x"}}, "items": [{"tags": ["t"]}]},
+            id="descendants",
+        ),
+        pytest.param(
+            ["$.items[\\qty]", "$.items[*].qty.`sum`", "missing"],
+            {},
+            id="not_in_document",
+        ),
+        pytest.param(["$.user.name", "$.id"], {"id": 1, "user": {"name": "a"}}, id="document_order"),
+        pytest.param(["user[*].name", "id"], {"id": 1}, id="dict_as_list"),
+    ],
+)
+def test_project(data, expressions, expected):
+    assert project(data, [parse(e) for e in expressions]) == expected
+
+
+def test_project_shares_values(data):
+    projected = project(data, QuerySet(["user.address", "items[1]"]))
+    assert projected["user"]["address"] is data["user"]["address"]
+    assert projected["items"][0] is data["items"][1]
+    assert projected["user"] is not data["user"]
+    assert project(data, ["$"]) is data
+
+
+def _sequential(data, expressions, **kwargs):
+    for expression in expressions:
+        if kwargs.get("delete"):
+            data = expression.filter(lambda __: True, data)
+        else:
+            data = expression.update(data, kwargs.get("replacement"))
+    return data
+
+
+REDACTED = [
+    ["$.user.email", "$..city", "$.items[*].qty"],
+    ["$.user", "$.user.email"],
+    ["$.user.email", "$.user"],
+    ["$.items[0]", "$.items[0]", "$.items[-1].sku"],
+    ["$.items[*]", "$.items[*].sku"],
+    ["$.items[1].tags", "$.items[*].tags[0]", "$..sku"],
+    ["$.items[?qty > 2].sku", "$.items[*].qty", "$.items[0,1]"],
+    ["$.items[1:]", "$.id", "$.items[0].sku"],
+    ["$.items[*].sku", "$.items[*].sku", "$.user.*"],
+    ["$.users..email", "$.user..city", "$.items[5].sku"],
+    ["$..tags[0]", "$.items..sku", "$.user.*"],
+    ["$.items[*]..tags", "$..address.city", "$.items[-1:]"],
+    ["$.items[0,2]", "$.user.email", "$.items[0:1].sku"],
+    ["$.items[0:2]", "$.items[0].qty"],
+]
+
+
+@pytest.mark.parametrize("expressions", REDACTED)
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        pytest.param({"delete": True}, id="delete"),
+        pytest.param({"replacement": "***"}, id="replacement"),
+        pytest.param({"replacement": {"masked": True}}, id="replacement_dict"),
+    ],
+)
+def test_redact_matches_sequential(data, expressions, kwargs):
+    import copy
+
+    from jsonpath_ng import redact
+
+    parsed = [parse(expression) for expression in expressions]
+    expected = _sequential(copy.deepcopy(data), parsed, **copy.deepcopy(kwargs))
+    assert redact(data, parsed, **kwargs) == expected
+
+
+def test_redact_callable(data):
+    import copy
+
+    from jsonpath_ng import redact
+
+    calls = []
+
+    def mask(value, container, key):
+        calls.append(key)
+        return "<%s>" % key
+
+    expressions = [parse(e) for e in ["$..email", "$.user.name", "$.items[0]"]]
+    expected = _sequential(copy.deepcopy(data), expressions, replacement=mask)
+    assert redact(data, expressions, replacement=mask) == expected
+    assert calls == ["email", "name", 0] * 2
+
+
+def test_redact_callable_containers(data):
+    import copy
+
+    from jsonpath_ng import redact
+
+    def nest(value, container, key):
+        return {"email": value * 2} if isinstance(value, str) and len(value) < 20 else value
+
+    expressions = [parse(e) for e in ["$..email", "$.user.name", "$..email"]]
+    expected = _sequential(copy.deepcopy(data), expressions, replacement=nest)
+    assert redact(data, expressions, replacement=nest) == expected
+
+
+def test_redact_arguments(data):
+    from jsonpath_ng import redact
+
+    assert redact(data, ["$.id", "user.name"])["user"]["name"] is None
+    assert "id" not in redact(data, ["$.id", "user.name"], delete=True)
+    with pytest.raises(ValueError):
+        redact(data, ["$.id"], replacement="x", delete=True)
+
+
+def test_redact_missing_index(data):
+    from jsonpath_ng import redact
+
+    redact(data, ["$.items[5]", "$.items[0]"], delete=True)
+    assert [item["sku"] for item in data["items"]] == ["s2", "s3"]
+
+
+def _sequential_update(data, assignments, create):
+    unmatched = []
+    for path, value in assignments:
+        expression = path
+        matched = bool(expression.find(data))
+        if create:
+            data = expression.update_or_create(data, value)
+            matched = matched or bool(expression.find(data))
+        else:
+            data = expression.update(data, value)
+        if not matched:
+            unmatched.append(path)
+    return data, unmatched
+
+
+ASSIGNMENTS = [
+    [("$.id", 2), ("$.user.name", "b"), ("$.items[*].qty", 0), ("$.missing", 1)],
+    [("$.user", {"name": "c"}), ("$.user.name", "d"), ("$.user.email", "e")],
+    [("$.user.name", "d"), ("$.user", None), ("$.user.name", "e")],
+    [("$.items[0].sku", "x"), ("$.items[-1].sku", "y"), ("$.items[1:].qty", 7)],
+    [("$.items[5].sku", "x"), ("$.items[1].tags[0]", "t"), ("$.config.a.b", 1)],
+    [("$..city", "y"), ("$.user.address", {"city": "z"}), ("$..sku", "s")],
+    [("$.items[?qty > 2].sku", "big"), ("$.items[0].qty", 9), ("$.items[*].sku", "all")],
+    [("$.items[0,2].qty", [10, 30]), ("$.items[*].tags", ["u"]), ("$.new[2].x", 1)],
+    [("$.empty[1]", "b"), ("$.empty[0]", "a"), ("$.other.x", 1)],
+    [("$.a.*", 1), ("$.a.b", 2), ("$.a.c.d", 3)],
+]
+
+
+@pytest.mark.parametrize("assignments", ASSIGNMENTS)
+@pytest.mark.parametrize("create", [False, True])
+def test_bulk_update_matches_sequential(data, assignments, create):
+    import copy
+
+    from jsonpath_ng import bulk_update
+
+    data["empty"] = {}
+    assignments = [(parse(path), value) for path, value in assignments]
+    expected = _sequential_update(copy.deepcopy(data), copy.deepcopy(assignments), create)
+    assert bulk_update(data, copy.deepcopy(assignments), create=create) == expected
+
+
+def test_bulk_update_callable_and_mapping(data):
+    from jsonpath_ng import bulk_update
+
+    data, unmatched = bulk_update(data, {
+        "user.name": lambda value, container, key: value.upper(),
+        "items[*].qty": lambda value, container, key: value + 1,
+        "nothing.here": 1,
+    })
+    assert data["user"]["name"] == "A"
+    assert [item["qty"] for item in data["items"]] == [2, 6, 4]
+    assert unmatched == ["nothing.here"]
+
+
+def test_bulk_update_replaces_document():
+    from jsonpath_ng import bulk_update
+
+    assert bulk_update({}, {"$[1]": "b", "$[0].a": 1}, create=True) == ([{"a": 1}, "b"], [])
+
+
+STEPS = [".a", ".b", ".a,b", ".*", "[0]", "[1]", "[-1]", "[*]", "[0:2]", "..a"]
+DOCUMENTS = [{}, [], {"a": 1}, {"a": {}}, {"a": [1]}, [{}], {"a": {"b": [{}]}}]
+
+
+@given(
+    st.sampled_from(DOCUMENTS),
+    st.lists(
+        st.lists(st.sampled_from(STEPS), min_size=1, max_size=3).map(
+            lambda steps: "$" + "".join(steps)
+        ),
+        min_size=2,
+        max_size=4,
+    ),
+    st.booleans(),
+)
+@example({}, ["$.*.b", "$.b,a[*]"], True)
+@example([], ["$[*].a", "$.*", "$[1][-1]", "$[0].c"], True)
+@example({}, ["$.*", "$.c", "$[*].a"], True)
+@example({}, ["$.a.b", "$.*.*", "$.a.c"], True)
+@example({}, ["$[1].a", "$.a,b[0]"], True)
+@settings(max_examples=100, deadline=None)
+def test_bulk_update_random_matches_sequential(document, paths, create):
+    import copy
+
+    from jsonpath_ng import bulk_update
+    from jsonpath_ng.parser import JsonPathParser
+
+    parser = JsonPathParser()
+    assignments = [(parser.parse(path), i) for i, path in enumerate(paths)]
+    try:
+        expected = _sequential_update(copy.deepcopy(document), assignments, create)
+    except (TypeError, LookupError):
+        # update_or_create() fails on some of these
+        assume(False)
+    assert bulk_update(copy.deepcopy(document), assignments, create=create) == expected
@@ -0,0 +1,96 @@
+from array import array
+
+import pytest
+
+from jsonpath_ng import extract, parse
+from jsonpath_ng.exceptions import JSONPathError
+from jsonpath_ng.ext import parse as ext_parse
+from jsonpath_ng.trie import PathTrie, split
+
+RECORDS = [
+    {"id": 1, "user": {"name": "a", "tags": ["x", "y"]}, "score": 1.5},
+    {"id": 2, "user": {"name": "b", "tags": []}, "score": 2},
+    {"id": 3, "user": "c", "score": None},
+    [1, 2],
+    {"id": 5, "user": {"name": "e", "tags": ["z"]}, "score": 0.5},
+]
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "$",
+        "id",
+        "$.id",
+        "user.name",
+        "user.tags[*]",
+        "user.tags[0]",
+        "user.tags[-1:]",
+        "user.*",
+        "user..name",
+        "(id | score)",
+        "[*]",
+        "user.`parent`.id",
+        "user.tags.`len`",
+        "user.tags[*].`count`",
+        "user.*.(`this`[*].`count`)",
+        "user.*.(`this`[*].`count`).`sum`",
+        "$[?score > 1].id",
+        "user.tags[\\@]",
+    ],
+)
+def test_extract_matches_find(expression):
+    jsonpath = ext_parse(expression)
+    columns = extract(RECORDS, {"column": jsonpath, "id": "id"}, multiple="list")
+    assert columns["column"] == [
+        [match.value for match in jsonpath.find(record)] for record in RECORDS
+    ]
+
+
+def test_extract_missing_and_multiple():
+    columns = {"id": "id", "tag": "user.tags[*]"}
+    assert extract(RECORDS, columns) == {
+        "id": [1, 2, 3, None, 5],
+        "tag": ["x", None, None, None, "z"],
+    }
+    assert extract(RECORDS, columns, missing=0, multiple="last")["tag"] == [
+        "y", 0, 0, 0, "z",
+    ]
+    with pytest.raises(JSONPathError):
+        extract(RECORDS, columns, multiple="error")
+
+
+def test_extract_arrays():
+    records = [{"a": 1, "b": 1.5, "c": "x"}, {"a": 2, "b": 2, "c": 3}]
+    columns = extract(records, {"a": "a", "b": "b", "c": "c"}, output="array")
+    assert columns == {
+        "a": array("q", [1, 2]),
+        "b": array("d", [1.5, 2.0]),
+        "c": ["x", 3],
+    }
+    assert extract([{"a": 2 ** 70}], {"a": "a"}, output="array") == {"a": [2 ** 70]}
+    assert extract([{"a": True}], {"a": "a"}, output="array") == {"a": [True]}
+
+
+def test_extract_numpy():
+    numpy = pytest.importorskip("numpy")
+    records = [{"a": 1, "b": 1.5, "c": "x"}, {"a": 2, "b": 2, "c": None}]
+    columns = extract(records, {"a": "a", "b": "b", "c": "c"}, output="numpy")
+    assert columns["a"].dtype == numpy.int64
+    assert columns["b"].tolist() == [1.5, 2.0]
+    assert columns["c"].tolist() == ["x", None]
+
+
+def test_extract_invalid_arguments():
+    with pytest.raises(ValueError):
+        extract(RECORDS, {"id": "id"}, multiple="all")
+    with pytest.raises(ValueError):
+        extract(RECORDS, {"id": "id"}, output="tuple")
+
+
+def test_trie_shares_prefixes():
+    trie = PathTrie()
+    for key, expression in enumerate(["a.b.c", "a.b.d", "a.b", "a[0]", "e"]):
+        trie.add(split(parse(expression)), key)
+    # a, b, c, d, [0], e
+    assert len(trie) == 6
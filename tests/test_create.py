@@ -1,4 +1,6 @@
 import copy
+import sys
+import threading
 from contextlib import nullcontext as does_not_raise
 
 import pytest
@@ -17,6 +19,8 @@ from jsonpath_ng.ext import parse
         ("$.foo[1].bar", {}, {"foo": [{}, {"bar": 42}]}),
         ("$.foo[0][0]", {}, {"foo": [[42]]}),
         ("$.foo[1][1]", {}, {"foo": [{}, [{}, 42]]}),
+        ("$.foo[0][1].bar[2]", {}, {"foo": [[{}, {"bar": [{}, {}, 42]}]]}),
+        ("$.foo[1][1][1]", {}, {"foo": [{}, [{}, [{}, 42]]]}),
         ("foo[0]", {}, {"foo": [42]}),
         ("foo[1]", {}, {"foo": [{}, 42]}),
         ("foo", {}, {"foo": 42}),
@@ -40,6 +44,10 @@ from jsonpath_ng.ext import parse
             {"foo": [{"bar": "baz", "qux": 42}, {"bar": "bizzle"}]},
         ),
         ("[1].foo", [{"foo": 1}, {"bar": 2}], [{"foo": 1}, {"foo": 42, "bar": 2}]),
+        #
+        # Slices wrap a dict in a list of its own
+        ("$.b[*][1]", {"b": {}}, {"b": [{}, 42]}),
+        ("$.b[0:2][2]", {}, {"b": [{}, {}, 42]}),
     ),
 )
 def test_update_or_create(string, initial_data, expected_result):
@@ -67,3 +75,41 @@ def test_unsupported_classes(string, initial_data, expectation):
     with expectation:
         result = jsonpath.update_or_create(initial_data, 42)
         assert result != copied_initial_data
+
+
+class Untouchable(dict):
+    def __setitem__(self, key, value):
+        raise AssertionError("%r was written to" % key)
+
+
+def test_update_or_create_leaves_other_branches():
+    # Only the containers along the path are fixed up after lists are
+    # created, not the whole document
+    data = {"other": Untouchable(a=[Untouchable(b=1)]), "foo": {}}
+    result = parse("$.foo.bar[1].baz[0]").update_or_create(data, 42)
+    assert result["foo"] == {"bar": [{}, {"baz": [42]}]}
+    assert result["other"] == {"a": [{"b": 1}]}
+
+
+def test_update_or_create_concurrently():
+    # Placeholders of lists are tracked per call, not shared between threads
+    jsonpath = parse("[0].foo[1].bar")
+    expected = [{"foo": [{}, {"bar": 1}]}]
+    results = []
+
+    def create():
+        for __ in range(200):
+            results.append(jsonpath.update_or_create({}, 1))
+
+    threads = [threading.Thread(target=create) for __ in range(8)]
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert len(results) == 1600
+    assert all(result == expected for result in results)
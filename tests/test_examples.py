@@ -1,7 +1,7 @@
 import pytest
 
 from jsonpath_ng.ext import parse
-from jsonpath_ng.ext.filter import Expression, Filter
+from jsonpath_ng.ext.filter import Expression, Filter, Not, Or
 from jsonpath_ng.jsonpath import Child, Descendants, Fields, Index, Root, Slice, This
 
 
@@ -77,6 +77,20 @@ def test_goessner_examples(string, parsed):
     assert parse(string, debug=True) == parsed
 
 
+def test_filter_boolean_operators():
+    """Verify that '|' and '!' build `Or` and `Not` nodes in filters."""
+
+    assert parse("$.book[?(@.price<10 | !@.isbn)]") == Child(
+        Child(Root(), Fields("book")),
+        Filter([
+            Or(
+                [Expression(Child(This(), Fields("price")), "<", 10)],
+                [Not([Expression(Child(This(), Fields("isbn")), None, None)])],
+            ),
+        ]),
+    )
+
+
 def test_attribute_and_dict_syntax():
     """Verify that attribute and dict syntax result in identical parse trees."""
 
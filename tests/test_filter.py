@@ -0,0 +1,370 @@
+import sys
+import threading
+
+import pytest
+
+from jsonpath_ng.ext import parse
+from jsonpath_ng.ext import filter as ext_filter
+from jsonpath_ng.ext.cache import IndexCache
+from jsonpath_ng.ext.filter import AdaptiveConjunction, Expression, Filter
+from jsonpath_ng.jsonpath import Fields
+
+
+def test_adaptive_filter_matches_source_order():
+    records = [{"a": i % 2, "b": "x%dy" % i, "c": i} for i in range(5000)]
+    expected = parse('$[?a == 1 & b =~ "x.*3y" & c > 100]').find(records)
+
+    jsonpath = parse('$[?a == 1 & b =~ "x.*3y" & c > 100]')
+    jsonpath.right.adaptive = True
+    results = jsonpath.find(records)
+
+    assert [r.value for r in results] == [r.value for r in expected]
+    assert [str(r.full_path) for r in results] == [
+        str(r.full_path) for r in expected
+    ]
+
+
+def test_adaptive_filter_concurrently(monkeypatch):
+    monkeypatch.setattr(AdaptiveConjunction, "interval", 16)
+    monkeypatch.setattr(ext_filter, "adaptive_ordering", True)
+    records = [{"a": i % 2, "b": i % 4, "c": i} for i in range(4000)]
+    jsonpath = parse("$[?a == 1 & b == 1 & c >= 0]")
+    counts, errors = [], []
+
+    def find():
+        try:
+            for __ in range(5):
+                counts.append(len(jsonpath.find(records)))
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=find) for __ in range(8)]
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert errors == []
+    assert counts == [1000] * 40
+
+
+def test_adaptive_filter_runs_selective_conjunct_first():
+    expressions = [
+        Expression(Fields("common"), "==", 1),
+        Expression(Fields("rare"), "==", 1),
+    ]
+    conjunction = AdaptiveConjunction(expressions)
+    for i in range(4 * conjunction.interval):
+        conjunction({"common": 1, "rare": int(i % 100 == 0)})
+
+    assert conjunction.ordered_expressions == expressions[::-1]
+
+
+def test_adaptive_filter_starts_with_cheapest_conjunct():
+    regex = Expression(Fields("b"), "=~", "x.*y")
+    key = Expression(Fields("a"), "==", 1)
+    conjunction = AdaptiveConjunction([regex, key])
+
+    assert conjunction.ordered_expressions == [key, regex]
+
+
+def test_adaptive_ordering_module_default(monkeypatch):
+    jsonpath_filter = Filter([
+        Expression(Fields("a"), "==", 1),
+        Expression(Fields("b"), "==", 2),
+    ])
+    assert not isinstance(jsonpath_filter.predicate, AdaptiveConjunction)
+
+    monkeypatch.setattr(ext_filter, "adaptive_ordering", True)
+    assert isinstance(jsonpath_filter.predicate, AdaptiveConjunction)
+
+    jsonpath_filter.adaptive = False
+    assert not isinstance(jsonpath_filter.predicate, AdaptiveConjunction)
+
+
+def test_filter_over_dict_does_not_mutate():
+    data = {"objects": {"cow": {"x": 1}, "cat": {"x": 2}, "dog": {"x": 1}}}
+    objects = data["objects"]
+
+    results = parse("objects[?x == 1]").find(data)
+
+    assert data["objects"] is objects
+    assert data == {"objects": {"cow": {"x": 1}, "cat": {"x": 2}, "dog": {"x": 1}}}
+    assert [r.value for r in results] == [{"x": 1}, {"x": 1}]
+    assert [str(r.full_path) for r in results] == ["(objects.cow)", "(objects.dog)"]
+
+
+def test_filter_over_dict_update_through_match():
+    data = {"objects": {"cow": {"x": 1}, "cat": {"x": 2}}}
+
+    for match in parse("objects[?x == 1]").find(data):
+        match.value = "found"
+
+    assert data == {"objects": {"cow": "found", "cat": {"x": 2}}}
+
+
+def test_filter_updated_copies_the_list_only():
+    data = {"items": [{"a": 1}, {"a": 5}, {"a": 7}], "other": {"b": 1}}
+    result = parse("items[?a > 2]").updated(data, None)
+    assert result == {"items": [{"a": 1}, None, None], "other": {"b": 1}}
+    assert data["items"] == [{"a": 1}, {"a": 5}, {"a": 7}]
+    assert result["other"] is data["other"]
+    assert result["items"][0] is data["items"][0]
+
+    result = parse("items[?a > 2].a").updated(data, lambda value, container, key: -value)
+    assert [item["a"] for item in result["items"]] == [1, -5, -7]
+    assert [item["a"] for item in data["items"]] == [1, 5, 7]
+    assert parse("items[?a > 9]").updated(data, None) is data
+
+
+def test_filter_removes_elements_in_one_pass():
+    data = {"objects": [{"x": 1}, {"x": 2}, {"x": 3}, {"x": 1}]}
+    objects = data["objects"]
+
+    parse("objects[?x != 2]").filter(lambda d: d["x"] == 1, data)
+
+    assert data["objects"] is objects
+    assert objects == [{"x": 2}, {"x": 3}]
+
+
+def test_filter_over_dict_removes_keys():
+    data = {"objects": {"cow": {"x": 1}, "cat": {"x": 2}, "dog": {"x": 1}}}
+
+    parse("objects[?x == 1]").filter(lambda d: True, data)
+
+    assert data == {"objects": {"cat": {"x": 2}}}
+
+
+@pytest.fixture()
+def index_cache(monkeypatch):
+    cache = IndexCache()
+    monkeypatch.setattr(ext_filter, "index_cache", cache)
+    return cache
+
+
+@pytest.mark.parametrize(
+    "path",
+    (
+        "users[?id == 3]",
+        'users[?id == "3"]',
+        "users[?id == 3 & tag == 'b']",
+        "users[?tag == 'b' & (id == 3 | id == 4)]",
+        "users[?meta.flag == true]",
+    ),
+)
+def test_index_cache_matches_scan(index_cache, path):
+    data = {
+        "users": [
+            {"id": 3, "tag": "a", "meta": {"flag": True}},
+            {"id": "3", "tag": "b", "meta": {"flag": 1}},
+            {"id": 4, "tag": "b"},
+            {"id": [3], "tag": "b", "meta": {"flag": False}},
+            {"tag": "b"},
+            "not a record",
+            {"id": 3.9, "tag": "b"},
+        ]
+    }
+    expected = parse(path).find(data)
+    index_cache.clear()
+
+    for __ in range(2):
+        results = parse(path).find(data)
+        assert [r.value for r in results] == [r.value for r in expected]
+        assert [str(r.full_path) for r in results] == [
+            str(r.full_path) for r in expected
+        ]
+    assert len(index_cache) == 1
+
+
+def test_index_cache_reuses_index(index_cache):
+    users = [{"id": i % 10} for i in range(100)]
+    jsonpath = parse("$[?id == 3]")
+
+    jsonpath.find(users)
+    index = index_cache.hash_index(users, ("id",), None, ext_filter._to_int)
+    jsonpath.find(users)
+
+    assert index_cache.hash_index(users, ("id",), None, ext_filter._to_int) is index
+    assert index[3] == list(range(3, 100, 10))
+
+
+def test_index_cache_invalidated_by_update(index_cache):
+    data = {"users": [{"id": 1}, {"id": 2}]}
+    jsonpath = parse("users[?id == 2]")
+    assert [r.value for r in jsonpath.find(data)] == [{"id": 2}]
+
+    parse("users[0].id").update(data, 2)
+
+    assert [r.value for r in jsonpath.find(data)] == [{"id": 2}, {"id": 2}]
+
+
+def test_index_cache_invalidated_by_length(index_cache):
+    data = {"users": [{"id": 1}, {"id": 2}]}
+    jsonpath = parse("users[?id == 2]")
+    assert len(jsonpath.find(data)) == 1
+
+    data["users"].append({"id": 2})
+
+    assert len(jsonpath.find(data)) == 2
+
+
+def test_index_cache_invalidated_by_identity(index_cache):
+    jsonpath = parse("users[?id == 2]")
+    assert len(jsonpath.find({"users": [{"id": 2}]})) == 1
+    assert len(jsonpath.find({"users": [{"id": 1}]})) == 0
+
+
+def test_index_cache_maxsize():
+    cache = IndexCache(maxsize=2)
+    arrays = [[{"id": 1}] for __ in range(3)]
+    for array in arrays:
+        cache.hash_index(array, ("id",), lambda item: (item["id"],))
+    assert len(cache) == 2
+
+
+@pytest.mark.parametrize(
+    "path",
+    (
+        "items[?price < 10]",
+        "items[?price <= 10]",
+        "items[?price > 10]",
+        "items[?price >= 10]",
+        "items[?price > 3 & price <= 12]",
+        "items[?price > 3 & price < 12 & name =~ 'b']",
+        "items[?price > 12 & price < 3]",
+        "items[?price >= 9.5]",
+        "items[?price == 10 & price > 3]",
+    ),
+)
+def test_range_index_matches_scan(index_cache, path):
+    data = {
+        "items": [
+            {"price": 12, "name": "b"},
+            {"price": 3, "name": "a"},
+            {"price": 10, "name": "bb"},
+            {"price": 10.5, "name": "d"},
+            {"price": 10, "name": "c"},
+            {"name": "e"},
+            {"price": float("nan"), "name": "f"},
+            {"price": 7, "name": "ab"},
+        ]
+    }
+    expected = parse(path).find(data)
+    index_cache.clear()
+
+    results = parse(path).find(data)
+
+    assert [r.value for r in results] == [r.value for r in expected]
+    assert [str(r.full_path) for r in results] == [
+        str(r.full_path) for r in expected
+    ]
+    assert len(index_cache) == 1
+
+
+def test_range_index_strings(index_cache):
+    items = [{"name": "b"}, {"name": "a"}, {"name": "d"}, {"name": "c"}]
+    results = parse("$[?name >= 'b' & name < 'd']").find(items)
+    assert [r.value for r in results] == [{"name": "b"}, {"name": "c"}]
+
+
+def test_range_index_coerces_int_literals(index_cache):
+    items = [{"price": "12"}, {"price": 3}, {"price": None}, {"price": 9.9}]
+    results = parse("$[?price > 5]").find(items)
+    assert [r.value for r in results] == [{"price": "12"}, {"price": 9.9}]
+
+
+def test_range_index_unordered_values():
+    cache = IndexCache()
+    items = [{"price": 1.5}, {"price": None}]
+    extract = lambda item: (item["price"],)  # noqa
+    assert cache.range_index(items, ("price",), extract, None, (int, float)) is None
+
+
+COLUMNAR_RECORDS = [
+    {"a": 1, "b": "x", "c": {"d": 2.5}},
+    {"a": "7", "b": "y", "c": {"d": 3}},
+    {"a": 9.9, "b": 1, "c": {}},
+    {"a": True, "b": None, "c": 4},
+    {"a": None, "b": "x", "c": {"d": True}},
+    {"b": "xx", "c": {"d": float("nan")}},
+    {"a": [1], "b": {"x": 1}, "c": {"d": "z"}},
+    {"a": 2 ** 40, "b": "", "c": {"d": -1}},
+    {"a": -3, "b": "y", "c": {"d": 2 ** 50}},
+    5,
+    "x",
+]
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "$[?a > 5]",
+        "$[?a == 1]",
+        "$[?a != 1]",
+        "$[?a <= 9 & a >= -3]",
+        "$[?b == 'x']",
+        "$[?b != 'x']",
+        "$[?b = 1]",
+        "$[?b == true]",
+        "$[?c.d]",
+        "$[?c.d == 3.0]",
+        "$[?c.d != 2.5]",
+        "$[?c.d < 3 & b == 'y']",
+        "$[?a > 0 | b == 'xx']",
+        "$[?!(b == 'x') & a > 0]",
+        "$[?a > 0 & b =~ 'x']",
+        "$[?@ > 3]",
+        "$[?@ == 'x']",
+    ],
+)
+def test_columnar_matches_scalar(path, monkeypatch):
+    pytest.importorskip("numpy")
+    expected = parse(path).find(COLUMNAR_RECORDS)
+
+    monkeypatch.setattr(ext_filter, "columnar_threshold", 0)
+    results = parse(path).find(COLUMNAR_RECORDS)
+
+    assert [r.value for r in results] == [r.value for r in expected]
+    assert [str(r.full_path) for r in results] == [
+        str(r.full_path) for r in expected
+    ]
+
+
+def test_columnar_ordering_mistyped_values():
+    numpy = pytest.importorskip("numpy")  # noqa
+    from jsonpath_ng.ext.columnar import Columns, select
+
+    expressions = parse("$[?b < 'y' & a > 0]").right.expressions
+    columns = Columns(COLUMNAR_RECORDS)
+    # Ordering a string against ints raises in the scalar path
+    assert columns.mask(expressions[0]) is None
+    assert columns.mask(expressions[1]) is not None
+
+    # ints beyond int64 and floats
+    assert Columns([{"a": 2 ** 70}]).mask(expressions[1]) is None
+    assert Columns([{"a": 2 ** 60}]).mask(
+        parse("$[?a > 0.5]").right.expressions[0]) is None
+
+    expressions = parse("$[?a > 0 & a =~ '1']").right.expressions
+    records = [{"a": 1}, {"a": "1"}, {"a": 2}]
+    assert select(expressions, records) == [1]
+
+
+def test_narrowing_skips_errors_of_records_ruled_out(monkeypatch):
+    # The scalar path orders "x" against 5.5 before testing a
+    records = [{"a": 1, "b": 2.0}, {"a": 2, "b": "x"}]
+    path = parse("$[?b < 5.5 & a == 1]")
+    with pytest.raises(TypeError):
+        path.find(records)
+
+    monkeypatch.setattr(ext_filter, "index_cache", IndexCache())
+    assert [r.value for r in path.find(records)] == [records[0]]
+    monkeypatch.setattr(ext_filter, "index_cache", None)
+
+    pytest.importorskip("numpy")
+    monkeypatch.setattr(ext_filter, "columnar_threshold", 0)
+    assert [r.value for r in path.find(records)] == [records[0]]
@@ -1,9 +1,11 @@
 import copy
+import pickle
 
 import pytest
 from typing import Callable
 from jsonpath_ng.ext.parser import parse as ext_parse
-from jsonpath_ng.jsonpath import DatumInContext, Fields, Root, This
+from jsonpath_ng.exceptions import JSONPathError
+from jsonpath_ng.jsonpath import Child, DatumInContext, Fields, Index, Matches, Root, This, Union, intern
 from jsonpath_ng.lexer import JsonPathLexerError
 from jsonpath_ng.parser import parse as base_parse
 from jsonpath_ng import JSONPath
@@ -188,12 +190,220 @@ def test_update(parse: Callable[[str], JSONPath], expression: str, data, update_
     assert data_copy2 == expected_value
 
 
+@pytest.mark.parametrize(
+    "expression, data, update_value, expected_value",
+    update_test_cases,
+)
+@parsers
+def test_updated(parse: Callable[[str], JSONPath], expression: str, data, update_value, expected_value):
+    original = copy.deepcopy(data)
+    result = parse(expression).updated(data, copy.deepcopy(update_value))
+    assert result == expected_value
+    assert data == original
+
+
+def test_updated_shares_untouched_values():
+    data = {"a": {"b": [{"x": 1}, {"x": 2}], "c": {"d": 1}}, "e": [1, 2]}
+    result = base_parse("a.b[1].x").updated(data, 3)
+    assert result == {"a": {"b": [{"x": 1}, {"x": 3}], "c": {"d": 1}}, "e": [1, 2]}
+    assert data["a"]["b"][1] == {"x": 2}
+    assert result["e"] is data["e"]
+    assert result["a"]["c"] is data["a"]["c"]
+    assert result["a"]["b"][0] is data["a"]["b"][0]
+    assert base_parse("a.missing").updated(data, 3) is data
+
+
+def test_updated_unaddressable_matches():
+    # Sorted matches aren't part of the document: it is copied entirely
+    data = {"a": [{"x": 2}, {"x": 1}]}
+    result = ext_parse("a[/x][0].x").updated(data, 5)
+    assert result == ext_parse("a[/x][0].x").update(copy.deepcopy(data), 5)
+    assert data == {"a": [{"x": 2}, {"x": 1}]}
+
+
+matches_test_cases = (
+    ("foo[*].baz", {"foo": [{"baz": 1}, {"baz": 2}]}),
+    ("$..baz", {"foo": [{"baz": 1}, {"bar": {"baz": 2}}], "baz": 3}),
+    ("foo[0,2]", {"foo": [1, 2, 3, 4]}),
+    ("foo[-1,0,-1]", {"foo": [1, 2, 3, 4]}),
+    ("foo[1:]", {"foo": [1, 2, 3, 4]}),
+    ("foo[?bar > 1]", {"foo": [{"bar": 1}, {"bar": 2}, {"bar": 3}]}),
+    ("foo where bar", {"foo": {"bar": 1}}),
+    ("*", {"foo": 1, "bar": 2}),
+)
+
+
+@pytest.mark.parametrize("expression, data", matches_test_cases)
+def test_matches_set_all(expression, data):
+    jsonpath = ext_parse(expression)
+    expected = jsonpath.update(copy.deepcopy(data), 42)
+    matches = jsonpath.find(data)
+    assert isinstance(matches, Matches)
+    matches.set_all(42)
+    assert data == expected
+    assert [match.value for match in matches] == [42] * len(matches)
+
+
+@pytest.mark.parametrize("expression, data", matches_test_cases)
+def test_matches_delete_all(expression, data):
+    jsonpath = ext_parse(expression)
+    expected = jsonpath.filter(lambda __: True, copy.deepcopy(data))
+    jsonpath.find(data).delete_all()
+    assert data == expected
+
+
+def test_matches_set_all_callable():
+    data = {"foo": [{"baz": 1}, {"baz": 2}], "bar": {"baz": 3}}
+    ext_parse("$..baz").find(data).set_all(lambda value, container, key: value * 10)
+    assert data == {"foo": [{"baz": 10}, {"baz": 20}], "bar": {"baz": 30}}
+
+
+def test_matches_union():
+    data = {"foo": 1, "bar": [2, 3]}
+    ext_parse("foo | (bar[0])").find(data).set_all(0)
+    assert data == {"foo": 0, "bar": [0, 3]}
+    ext_parse("foo | (bar[0])").find(data).delete_all()
+    assert data == {"bar": [3]}
+
+
+def test_matches_unaddressable():
+    data = {"foo": [{"x": 2}, {"x": 1}]}
+    with pytest.raises(JSONPathError):
+        ext_parse("$").find(data).set_all(1)
+    with pytest.raises(JSONPathError):
+        ext_parse("foo[/x][0]").find(data).delete_all()
+    with pytest.raises(JSONPathError):
+        ext_parse("foo[/x][0].x").find(data).set_all(1)
+    with pytest.raises(JSONPathError):
+        ext_parse("foo.`limit(1)`[0]").find(data).set_all(1)
+    assert data == {"foo": [{"x": 2}, {"x": 1}]}
+
+
+def test_intersect_equal_values_elsewhere():
+    # Equal values at other locations, even the same object, don't match
+    shared = {"baz": 1}
+    data = {"foo": [shared, shared], "bar": [1, 1]}
+    assert [str(m.full_path) for m in ext_parse("foo[*] & (foo[1])").find(data)] == ["(foo.[1])"]
+    assert ext_parse("(bar[0]) & (bar[1])").find(data) == []
+
+
+def test_intersect_lazy_left():
+    data = {"foo": list(range(5))}
+    matches = ext_parse("foo[*] & (foo[1,3])").find_iter(data)
+    assert next(matches).value == 1
+    assert [match.value for match in matches] == [3]
+
+
+def test_union_distinct():
+    data = {"foo": [1, 2, 3], "bar": 4}
+    union = Union(ext_parse("foo[0,1]"), ext_parse("foo[1,2] | bar"), distinct=True)
+    assert [str(m.full_path) for m in union.find(data)] == ["(foo.[0])", "(foo.[1])", "(foo.[2])", "bar"]
+    assert [m.value for m in union.find_iter(data)] == [1, 2, 3, 4]
+    assert [m.value for m in Union(union.left, union.right).find(data)] == [1, 2, 2, 3, 4]
+    assert union != Union(union.left, union.right)
+
+
+def test_sorted_with_intersect_and_union_distinct():
+    # Sorted lists are new values, located nowhere in the document
+    data = {"foo": [3, 1, 2]}
+    sort = ext_parse("foo.`sorted`")
+    assert [str(m.full_path) for m in sort.find(data)] == ["`sorted`"]
+    assert ext_parse("foo.`sorted` & foo").find(data) == []
+    union = Union(sort, ext_parse("foo"), distinct=True)
+    assert [m.value for m in union.find(data)] == [[1, 2, 3], [3, 1, 2]]
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "foo[0,2]",
+        "foo..bar | baz",
+        "foo where bar",
+        "foo[?bar > 1 & baz = 'x'].qux",
+        "foo[?bar | baz]",
+        "foo[?!baz]",
+        "foo[/bar, \\baz]",
+        "foo.`sorted`",
+        "foo.`limit(2)`",
+        "foo.`len`",
+        "foo.`keys`",
+        "foo.`path`",
+        "foo.`sub(/a/, b)`",
+        "foo.`split(',', *, -1)`",
+        "foo.`str()`",
+        "foo.`sum`",
+        "foo.`groupby(bar)`",
+        "$.foo + $.bar",
+    ],
+)
+def test_structural_hash(expression):
+    jsonpath = ext_parse(expression)
+    other = ext_parse(expression)
+    assert jsonpath == other
+    assert hash(jsonpath) == hash(other)
+    assert {jsonpath: 1}[other] == 1
+    assert pickle.loads(pickle.dumps(jsonpath)) == jsonpath
+    assert intern(jsonpath) is intern(other)
+
+
+def test_index_order():
+    assert Index(0, 2) != Index(2, 0)
+    assert hash(Index(0, 2)) == hash(Index(0, 2))
+
+
+def test_intern_shares_sub_expressions():
+    first = intern(ext_parse("foo[?bar > 1].baz"))
+    second = ext_parse("foo[?bar > 1].qux")
+    interned = intern(second)
+    assert interned.left is first.left
+    assert interned.right is second.right
+    # The original is left as it was
+    assert second.left is not first.left
+    assert Fields.interned("baz") is first.right
+    assert Child.interned(Fields("foo"), ext_parse("foo[?bar > 1]").right) is first.left
+
+
+@pytest.mark.parametrize(
+    "expression, setting, value",
+    [("foo[?bar > 1 & baz]", "adaptive", True), ("$.foo + $.bar", "on_error", "null")],
+)
+def test_settings_after_hashing(expression, setting, value):
+    jsonpath = ext_parse(expression)
+    other = ext_parse(expression)
+    node = jsonpath.right if setting == "adaptive" else jsonpath
+    hash(jsonpath)
+    setattr(node, setting, value)
+    assert jsonpath == other
+    assert hash(jsonpath) == hash(other)
+    assert len({jsonpath, other}) == 1
+
+
+def test_intern_settings():
+    adaptive = ext_parse("foo[?bar > 1].baz")
+    adaptive.left.right.adaptive = True
+    first = intern(adaptive)
+    second = intern(ext_parse("foo[?bar > 1].baz"))
+    assert second.left.right.adaptive is None
+    assert first.left.right.adaptive is True
+    assert second.left.left is first.left.left
+    assert intern(ext_parse("foo[?bar > 1].baz")) is second
+    with pytest.raises(AttributeError):
+        second.left.right.adaptive = True
+
+
 filter_test_cases = (
     # Docs examples
     ("foo[*].baz", {'foo': [{'baz': 1}, {'baz': 2}]}, lambda d: True, {'foo': [{}, {}]}),
     ("foo[*].baz", {'foo': [{'baz': 1}, {'baz': 2}]}, lambda d: d == 2, {'foo': [{'baz': 1}, {}]}),
     # Wildcard issue fix
     ("*.baz", {"flag": False, "foo": {"bar": 1, "baz": 2}}, lambda d: True, {"flag": False, "foo": {"bar": 1}}),
+    # Positions refer to the list before any removal
+    ("foo[0,1]", {"foo": [1, 2, 3]}, lambda d: True, {"foo": [3]}),
+    ("foo[-1,0]", {"foo": [1, 2, 3]}, lambda d: d != 2, {"foo": [2]}),
+    ("foo[5]", {"foo": [1]}, lambda d: True, {"foo": [1]}),
+    ("foo[0:2]", {"foo": [1, 2, 3, 4]}, lambda d: True, {"foo": [3, 4]}),
+    ("foo[::2]", {"foo": [1, 2, 3, 4, 5]}, lambda d: d > 1, {"foo": [1, 2, 4]}),
+    ("foo[*]", {"foo": [1, 2, 3, 4]}, lambda d: d % 2, {"foo": [2, 4]}),
 )
 
 
@@ -324,6 +534,15 @@ find_test_cases = (
     # --------
     #
     ("1", {"1": "foo"}, ["foo"], ["'1'"]),
+    #
+    # Intersections
+    # -------------
+    #
+    ("foo[*] & (foo[2,0])", {"foo": [1, 2, 3]}, [1, 3], ["(foo.[0])", "(foo.[2])"]),
+    ("(foo..baz) & (foo[1].baz)", {"foo": [{"baz": 1}, {"baz": 1}]}, [1], ["((foo.[1]).baz)"]),
+    ("(foo[0,0,1]) & (foo[0])", {"foo": [1, 2]}, [1], ["(foo.[0])"]),
+    ("foo & bar", {"foo": 1, "bar": 1}, [], []),
+    ("$ & $", {"foo": 1}, [{"foo": 1}], ["$"]),
 )
 
 
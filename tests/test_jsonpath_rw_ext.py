@@ -9,6 +9,9 @@ import pytest
 
 from jsonpath_ng.exceptions import JsonPathParserError
 from jsonpath_ng.ext import parser
+from jsonpath_ng.ext.filter import Filter
+from jsonpath_ng.ext.string import DefintionInvalid
+from jsonpath_ng.jsonpath import Slice
 
 from .helpers import assert_value_equality
 
@@ -136,6 +139,72 @@ test_cases = (
         [{"cow": 8, "cat": 2}, {"cow": 7, "cat": 2}],
         id="filter_and",
     ),
+    pytest.param(
+        "objects[?cow=8|cat=3]",
+        {
+            "objects": [
+                {"cow": 8, "cat": 2},
+                {"cow": 7, "cat": 2},
+                {"cow": 5, "cat": 3},
+            ]
+        },
+        [{"cow": 8, "cat": 2}, {"cow": 5, "cat": 3}],
+        id="filter_or",
+    ),
+    pytest.param(
+        "objects[?cow=8&cat=3|cow=7]",
+        {
+            "objects": [
+                {"cow": 8, "cat": 2},
+                {"cow": 7, "cat": 2},
+                {"cow": 8, "cat": 3},
+            ]
+        },
+        [{"cow": 7, "cat": 2}, {"cow": 8, "cat": 3}],
+        id="filter_or_and_precedence",
+    ),
+    pytest.param(
+        "objects[?(cow=8|cow=7)&cat=2]",
+        {
+            "objects": [
+                {"cow": 8, "cat": 2},
+                {"cow": 7, "cat": 3},
+                {"cow": 5, "cat": 2},
+            ]
+        },
+        [{"cow": 8, "cat": 2}],
+        id="filter_or_parens",
+    ),
+    pytest.param(
+        "objects[?!cow=8&cat=2]",
+        {
+            "objects": [
+                {"cow": 8, "cat": 2},
+                {"cow": 7, "cat": 2},
+                {"cow": 7, "cat": 3},
+            ]
+        },
+        [{"cow": 7, "cat": 2}],
+        id="filter_not",
+    ),
+    pytest.param(
+        "objects[?!(cow=8&cat=2)]",
+        {
+            "objects": [
+                {"cow": 8, "cat": 2},
+                {"cow": 8, "cat": 3},
+                {"cat": 2},
+            ]
+        },
+        [{"cow": 8, "cat": 3}, {"cat": 2}],
+        id="filter_not_parens",
+    ),
+    pytest.param(
+        "objects[?cow>5]",
+        {"objects": [{"cow": "8"}, {"cow": 7.5}, {"cow": None}, {"cow": [6]}]},
+        [{"cow": "8"}, {"cow": 7.5}],
+        id="filter_gt_coercion",
+    ),
     pytest.param(
         "objects[?confidence>=0.5].prediction",
         {
@@ -279,6 +348,147 @@ test_cases = (
         2,
         id="sort5_indexed",
     ),
+    pytest.param(
+        "objects[/price,\\name]",
+        {
+            "objects": [
+                {"price": 2, "name": "a"},
+                {"price": 1, "name": "b"},
+                {"price": 2, "name": "c"},
+                {"price": 1, "name": "a"},
+            ]
+        },
+        [
+            [
+                {"price": 1, "name": "b"},
+                {"price": 1, "name": "a"},
+                {"price": 2, "name": "c"},
+                {"price": 2, "name": "a"},
+            ]
+        ],
+        id="sort6_mixed_directions",
+    ),
+    pytest.param(
+        "objects[/cow]",
+        {"objects": [{"cow": 2}, {"cat": 1}, {"cow": 1}, {"dog": 1}]},
+        [[{"cow": 1}, {"cow": 2}, {"cat": 1}, {"dog": 1}]],
+        id="sort7_missing_last",
+    ),
+    pytest.param(
+        "objects[\\cow]",
+        {"objects": [{"cow": 2}, {"cat": 1}, {"cow": 1}, {"cow": 3}]},
+        [[{"cow": 3}, {"cow": 2}, {"cow": 1}, {"cat": 1}]],
+        id="sort7_missing_last_reversed",
+    ),
+    pytest.param(
+        "objects[\\cow].`limit(2)`",
+        {"objects": [{"cow": 2}, {"cow": 3}, {"cow": 1}]},
+        [[{"cow": 3}, {"cow": 2}]],
+        id="limit_sorted",
+    ),
+    pytest.param(
+        "objects.`top(5)`",
+        {"objects": ["alpha", "gamma", "beta"]},
+        [["alpha", "gamma", "beta"]],
+        id="limit_short_list",
+    ),
+    pytest.param("objects.`limit(1)`", {"objects": "alpha"}, [], id="limit_not_list"),
+    pytest.param(
+        "objects[/cow].`limit(0)`",
+        {"objects": [{"cow": 2}, {"cow": 1}]},
+        [[]],
+        id="limit_zero_sorted",
+    ),
+    pytest.param(
+        "objects[/cow][0:0]",
+        {"objects": [{"cow": 2}, {"cow": 1}]},
+        [],
+        id="slice_empty_sorted",
+    ),
+    pytest.param(
+        "objects[*].cow.`sum`",
+        {"objects": [{"cow": 1}, {"cow": 2.5}, {"cat": 3}]},
+        [3.5],
+        id="aggregate_sum",
+    ),
+    pytest.param("objects[*].`sum`", {"objects": []}, [0], id="aggregate_sum_empty"),
+    pytest.param(
+        "objects[*].`sum`", {"objects": [1, "a"]}, [], id="aggregate_sum_type_error"
+    ),
+    pytest.param("objects[*].`min`", {"objects": [3, 1, 2]}, [1], id="aggregate_min"),
+    pytest.param("objects[*].`max`", {"objects": [3, 1, 2]}, [3], id="aggregate_max"),
+    pytest.param("objects[*].`max`", {"objects": []}, [], id="aggregate_max_empty"),
+    pytest.param("objects[*].`avg`", {"objects": [3, 1, 2]}, [2], id="aggregate_avg"),
+    pytest.param(
+        "objects[?cow > 1].`count`",
+        {"objects": [{"cow": 1}, {"cow": 2}, {"cow": 3}]},
+        [2],
+        id="aggregate_count_filter",
+    ),
+    pytest.param(
+        "(objects[*] | others[*]).`count`",
+        {"objects": [1, 2], "others": [3]},
+        [3],
+        id="aggregate_count_union",
+    ),
+    pytest.param(
+        "$..cow.`sum`",
+        {"objects": [{"cow": 1}, {"cat": {"cow": 2}}], "cow": 3},
+        [6],
+        id="aggregate_sum_descendants",
+    ),
+    pytest.param(
+        "$..cow.`max`", {"objects": [{"cat": 1}]}, [], id="aggregate_max_descendants_empty"
+    ),
+    pytest.param(
+        "objects..`count`",
+        {"objects": [{"cow": 1}, [2]]},
+        [5],
+        id="aggregate_count_all_descendants",
+    ),
+    pytest.param(
+        "$..cow.`countby(@)`.a",
+        {"objects": [{"cow": "a"}, {"cow": "b"}, {"cat": {"cow": "a"}}]},
+        [2],
+        id="aggregate_countby_descendants",
+    ),
+    pytest.param(
+        "objects[*].`distinct`",
+        {"objects": [1, True, 1, "1", 1.0, [1], [1], None, None]},
+        [1, True, "1", [1], None],
+        id="aggregate_distinct",
+    ),
+    pytest.param(
+        "objects[*].`groupby(cow)`",
+        {"objects": [{"cow": "a", "n": 1}, {"cow": "b"}, {"cat": "a"}, {"cow": "a"}]},
+        [{"a": [{"cow": "a", "n": 1}, {"cow": "a"}], "b": [{"cow": "b"}]}],
+        id="aggregate_groupby",
+    ),
+    pytest.param(
+        "objects[?n > 1].`countby(cow.name)`.a",
+        {
+            "objects": [
+                {"cow": {"name": "a"}, "n": 1},
+                {"cow": {"name": "a"}, "n": 2},
+                {"cow": {"name": "b"}, "n": 3},
+                {"cow": {"name": "a"}, "n": 4},
+            ]
+        },
+        [2],
+        id="aggregate_countby_filter",
+    ),
+    pytest.param(
+        "objects[*].`countby(cow)`",
+        {"objects": [{"cow": [1]}]},
+        [],
+        id="aggregate_countby_unhashable",
+    ),
+    pytest.param(
+        "objects[*].`distinct(cow)`.n",
+        {"objects": [{"cow": 1, "n": 1}, {"cow": True, "n": 2}, {"cow": 1, "n": 3}]},
+        [1, 2],
+        id="aggregate_distinct_key",
+    ),
     pytest.param("3 * 3", {}, [9], id="arithmetic_number_only"),
     pytest.param("$.foo * 10", {"foo": 4}, [40], id="arithmetic_mul1"),
     pytest.param("10 * $.foo", {"foo": 4}, [40], id="arithmetic_mul2"),
@@ -512,3 +722,80 @@ def test_invalid_hyphenation_in_key():
     # This discrepancy needs to be resolved.
     with pytest.raises(JsonPathParserError):
         parser.parse("foo.-baz")
+
+
+sort_prefix_objects = [
+    {"cow": 2, "cat": "b"},
+    {"cow": 1, "cat": "a"},
+    {"cat": "z"},
+    {"cow": 2, "cat": "a"},
+    {"cow": 3, "cat": "c"},
+    {"cow": 1, "cat": "b"},
+    {"cow": 2, "cat": "b", "dup": True},
+]
+
+
+@pytest.mark.parametrize(
+    "path, objects",
+    (
+        ("objects[/cow][0:3]", sort_prefix_objects),
+        ("objects[/cow][:3]", sort_prefix_objects),
+        ("objects[\\cow][1:4:2]", sort_prefix_objects),
+        ("objects[/cow,\\cat][0,2]", sort_prefix_objects),
+        ("objects[\\cow,/cat][5]", sort_prefix_objects),
+        ("objects[/cow][-1]", sort_prefix_objects),
+        ("objects[/cow][-3:]", sort_prefix_objects),
+        ("objects[/cow][0:30]", sort_prefix_objects),
+        ("objects.`sorted`[0:3]", [5, 3, 3, 9, 1]),
+    ),
+)
+def test_sorted_prefix_matches_full_sort(path, objects):
+    jsonpath = parser.parse(path)
+    full = jsonpath.left.right.sorted(objects)
+    expected = jsonpath.right.find(full)
+
+    results = jsonpath.find({"objects": objects})
+
+    assert [r.value for r in results] == [r.value for r in expected]
+    assert [str(r.path) for r in results] == [str(r.path) for r in expected]
+
+
+def test_sorted_top_uses_heap():
+    sorted_this = parser.parse("objects[/cow,\\cat]").right
+    values = [{"cow": i % 7, "cat": str(i % 3)} for i in range(200)]
+    assert sorted_this.top(values, 10) == sorted_this.sorted(values)[:10]
+
+
+def test_distinct_keeps_paths():
+    results = parser.parse("objects[*].cow.`distinct`").find(
+        {"objects": [{"cow": 1}, {"cow": 2}, {"cow": 1}, {"cow": 3}]}
+    )
+    assert [str(r.full_path) for r in results] == [
+        "((objects.[0]).cow)",
+        "((objects.[1]).cow)",
+        "((objects.[3]).cow)",
+    ]
+
+
+def test_keyed_aggregate_roundtrip():
+    for expr in ["`groupby(cow)`", "`countby(cow.cat)`", "`distinct(cow)`"]:
+        parsed = parser.parse("objects[*]." + expr)
+        assert str(parsed.right) == expr
+        assert parser.parse(str(parsed)) == parsed
+
+
+def test_keyed_aggregate_invalid():
+    with pytest.raises(DefintionInvalid):
+        parser.parse("objects[*].`groupby()`")
+
+
+def test_aggregate_streams_matches(monkeypatch):
+    def find(self, datum):
+        raise AssertionError("matches were materialized")
+
+    monkeypatch.setattr(Slice, "find", find)
+    monkeypatch.setattr(Filter, "find", find)
+    data = {"objects": [{"cow": i} for i in range(10)]}
+
+    assert parser.parse("objects[*].cow.`sum`").find(data)[0].value == 45
+    assert parser.parse("objects[?cow > 4].cow.`count`").find(data)[0].value == 5
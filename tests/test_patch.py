@@ -0,0 +1,112 @@
+import copy
+
+import pytest
+
+from jsonpath_ng.ext import parse
+from jsonpath_ng.patch import apply_patch, pointer
+
+
+@pytest.fixture
+def data():
+    return {
+        "a": {"b": [{"x": 1, "y": {"z": 1}}, {"x": 5, "y": {"z": 2}}], "c": {"d": 1}},
+        "e": [1, 2, 3, 2],
+        "k/~": 0,
+    }
+
+
+@pytest.mark.parametrize(
+    "path, value",
+    [
+        ("a.b[*].x", 7),
+        ("a.b[?x > 2].y", {"z": 9}),
+        ("$..z", 0),
+        ("a.b[0]", "first"),
+        ("e[1:]", 0),
+        ("$", {"new": True}),
+        ("'k/~'", 1),
+        ("a.c.d", 1),
+        ("a.missing", 1),
+    ],
+)
+def test_patch_for_update(data, path, value):
+    original = copy.deepcopy(data)
+    jsonpath = parse(path)
+    ops = jsonpath.patch_for_update(data, value)
+    assert data == original
+    expected = jsonpath.update(copy.deepcopy(data), value)
+    assert apply_patch(copy.deepcopy(data), ops) == expected
+
+
+@pytest.mark.parametrize(
+    "path, fn",
+    [
+        ("e[*]", lambda value: value == 2),
+        ("a.b[?x > 2]", lambda value: True),
+        ("$..z", lambda value: True),
+        ("a.b[*].y", lambda value: value["z"] == 1),
+        ("e[1]", lambda value: True),
+    ],
+)
+def test_patch_for_filter(data, path, fn):
+    original = copy.deepcopy(data)
+    jsonpath = parse(path)
+    ops = jsonpath.patch_for_filter(fn, data)
+    assert data == original
+    assert all(op["op"] == "remove" for op in ops)
+    expected = jsonpath.filter(fn, copy.deepcopy(data))
+    assert apply_patch(copy.deepcopy(data), ops) == expected
+
+
+@pytest.mark.parametrize("path", ["a.n.m[2].q", "a.b[3]", "a.c.d", "f[0]"])
+def test_patch_for_update_or_create(data, path):
+    original = copy.deepcopy(data)
+    jsonpath = parse(path)
+    ops = jsonpath.patch_for_update_or_create(data, 3)
+    assert data == original
+    expected = jsonpath.update_or_create(copy.deepcopy(data), 3)
+    assert apply_patch(copy.deepcopy(data), ops) == expected
+
+
+def test_patch_operations(data):
+    assert parse("e[*]").patch_for_filter(lambda value: value == 2, data) == [
+        {"op": "remove", "path": "/e/3"},
+        {"op": "remove", "path": "/e/1"},
+    ]
+    assert parse("a.b[0].x").patch_for_update(data, 2) == [
+        {"op": "replace", "path": "/a/b/0/x", "value": 2},
+    ]
+    assert parse("a.b[2]").patch_for_update_or_create(data, 2) == [
+        {"op": "add", "path": "/a/b/2", "value": 2},
+    ]
+    assert parse("a.c.d").patch_for_update(data, 1) == []
+
+
+def test_patch_in_place(data):
+    expected = parse("e[*]").filter(lambda value: value == 2, copy.deepcopy(data))
+    ops = parse("e[*]").patch_for_filter(lambda value: value == 2, data, in_place=True)
+    assert len(ops) == 2
+    assert data == expected
+
+
+def test_patch_unaddressable_matches(data):
+    jsonpath = parse("e[\\@]")
+    original = copy.deepcopy(data)
+    ops = jsonpath.patch_for_update(data, 0)
+    assert data == original
+    assert apply_patch(copy.deepcopy(data), ops) == jsonpath.update(copy.deepcopy(data), 0)
+
+
+def test_patch_dict_as_list():
+    # [*] applied to a dict matches it through a list made on the fly
+    jsonpath = parse("a[*].b")
+    data = {"a": {"b": 1}}
+    assert jsonpath.patch_for_update(data, 7) == [{"op": "replace", "path": "/a/b", "value": 7}]
+    assert jsonpath.patch_for_update_or_create(data, 7) == [{"op": "replace", "path": "/a/b", "value": 7}]
+    assert jsonpath.patch_for_filter(lambda value: True, data) == [{"op": "remove", "path": "/a/b"}]
+    assert data == {"a": {"b": 1}}
+
+
+def test_pointer():
+    assert pointer([]) == ""
+    assert pointer(["a/b", "m~n", 0]) == "/a~1b/m~0n/0"
@@ -0,0 +1,77 @@
+import pytest
+
+from jsonpath_ng import QuerySet
+from jsonpath_ng import jsonpath
+from jsonpath_ng.ext import parse
+
+DATA = {
+    "payload": {
+        "items": [
+            {"sku": "a", "qty": 2, "tags": ["x"]},
+            {"sku": "b", "qty": 0},
+            {"sku": "c", "qty": 5, "tags": ["y", "z"]},
+        ],
+        "meta": {"source": "web", "id": 7},
+    },
+    "id": 1,
+}
+
+EXPRESSIONS = [
+    "$",
+    "$.id",
+    "id",
+    "$.payload.items[*].sku",
+    "$.payload.items[*].qty",
+    "$.payload.items[*].tags[*]",
+    "$.payload.items[0]",
+    "$.payload.items[1:]",
+    "$.payload.items[?qty > 1].sku",
+    "$.payload.items[\\qty].sku",
+    "$.payload.items[*].qty.`sum`",
+    "$.payload.missing[*].qty.`count`",
+    "$.payload.meta.*",
+    "$.payload..tags",
+    "$.payload..qty.`sum`",
+    "$.payload.items[*].(tags[*].`count`)",
+    "$.payload.items[*].(tags[*].`count`).`sum`",
+    "$.payload.meta.source.`parent`.id",
+    "$.payload.items[*].`this`.sku",
+    "($.id | $.payload.meta.id)",
+]
+
+
+def test_queryset_matches_find():
+    queries = QuerySet({expression: parse(expression) for expression in EXPRESSIONS})
+    results = queries.find(DATA)
+
+    assert list(results) == EXPRESSIONS
+    for expression in EXPRESSIONS:
+        expected = parse(expression).find(DATA)
+        assert [r.value for r in results[expression]] == [e.value for e in expected]
+        assert [str(r.full_path) for r in results[expression]] == [
+            str(e.full_path) for e in expected
+        ]
+
+
+def test_queryset_auto_id(monkeypatch):
+    expressions = ["payload.meta.id", "payload.items[0].id", "payload.meta"]
+    queries = QuerySet(expressions)
+    monkeypatch.setattr(jsonpath, "auto_id_field", "id")
+    results = queries.find(DATA)
+    for key, expression in enumerate(expressions):
+        expected = parse(expression).find(DATA)
+        assert [r.value for r in results[key]] == [e.value for e in expected]
+
+
+def test_queryset_list_and_add():
+    queries = QuerySet(["id", "payload.meta.id"])
+    queries.add("source", "payload.meta.source")
+    assert len(queries) == 3
+    assert "source" in queries
+    assert {key: [r.value for r in found] for key, found in queries.find(DATA).items()} == {
+        0: [1],
+        1: [7],
+        "source": ["web"],
+    }
+    with pytest.raises(KeyError):
+        queries.add(0, "id")
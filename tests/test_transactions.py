@@ -0,0 +1,124 @@
+import copy
+import threading
+
+import pytest
+
+from jsonpath_ng import bulk_update, redact, transaction
+from jsonpath_ng.ext import parse
+from jsonpath_ng.patch import apply_patch
+
+
+@pytest.fixture
+def data():
+    return {
+        "id": 1,
+        "user": {"name": "a", "tags": ["x", "y"]},
+        "items": [{"sku": "s1", "qty": 1}, {"sku": "s2", "qty": 5}, {"sku": "s3", "qty": 3}],
+        "empty": {},
+    }
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        pytest.param(lambda d: parse("items[*].qty").update(d, 0), id="update"),
+        pytest.param(lambda d: parse("$..sku").update(d, lambda v, c, k: v.upper()), id="update_callable"),
+        pytest.param(lambda d: parse("items[0,2]").update(d, ["a", "b"]), id="update_spread"),
+        pytest.param(lambda d: parse("items[?qty > 2]").filter(lambda v: True, d), id="filter_filter"),
+        pytest.param(lambda d: parse("items[1:]").filter(lambda v: True, d), id="filter_slice"),
+        pytest.param(lambda d: parse("items[-1]").filter(lambda v: True, d), id="filter_index"),
+        pytest.param(lambda d: parse("user.*").filter(lambda v: True, d), id="filter_fields"),
+        pytest.param(lambda d: parse("empty.a[2].b").update_or_create(d, 1), id="create"),
+        pytest.param(lambda d: parse("user.tags[4]").update_or_create(d, 1), id="create_padding"),
+        pytest.param(lambda d: parse("items[*].sku").find(d).set_all(None), id="set_all"),
+        pytest.param(lambda d: parse("items[0,2] | user.name").find(d).delete_all(), id="delete_all"),
+        pytest.param(lambda d: redact(d, ["user.name", "items[*].qty"], delete=True), id="redact"),
+        pytest.param(lambda d: bulk_update(d, {"user.name": "b", "new.x[1]": 2}, create=True), id="bulk_update"),
+        pytest.param(lambda d: apply_patch(d, [
+            {"op": "add", "path": "/user/tags/1", "value": "z"},
+            {"op": "remove", "path": "/items/0"},
+            {"op": "replace", "path": "/id", "value": 2},
+            {"op": "add", "path": "/user/age", "value": 3},
+        ]), id="apply_patch"),
+    ],
+)
+def test_rollback(data, change):
+    original = copy.deepcopy(data)
+    item = data["items"][0]
+    with transaction(data) as tx:
+        change(data)
+        assert data != original
+        assert len(tx) > 0
+        assert tx.rollback() is data
+    assert data == original
+    # Restored in place
+    assert data["items"][0] is item
+
+
+def test_rollback_many_changes(data):
+    original = copy.deepcopy(data)
+    with transaction(data) as tx:
+        parse("items[*].qty").update(data, 0)
+        parse("items[0]").filter(lambda v: True, data)
+        parse("items[0].sku").update(data, "x")
+        parse("user.extra.list[1]").update_or_create(data, 5)
+        tx.rollback()
+    assert data == original
+
+
+def test_commit_keeps_changes(data):
+    with transaction(data) as tx:
+        parse("id").update(data, 2)
+    assert data["id"] == 2
+    assert len(tx) == 0
+
+
+def test_rollback_on_exception(data):
+    original = copy.deepcopy(data)
+    with pytest.raises(ValueError):
+        with transaction(data):
+            parse("items[*].qty").update(data, 0)
+            raise ValueError()
+    assert data == original
+
+
+def test_nested_transactions(data):
+    original = copy.deepcopy(data)
+    with transaction(data) as outer:
+        parse("id").update(data, 2)
+        with transaction(data) as inner:
+            parse("user.name").update(data, "b")
+            parse("items[0]").filter(lambda v: True, data)
+            inner.rollback()
+        assert data["user"]["name"] == "a" and len(data["items"]) == 3
+        with transaction(data):
+            parse("user.name").update(data, "c")
+        outer.rollback()
+    assert data == original
+
+
+def test_writes_outside_transactions_are_not_recorded(data):
+    tx = transaction(data)
+    parse("id").update(data, 2)
+    assert len(tx) == 0
+
+
+def test_writes_of_other_threads_are_not_recorded(data):
+    other = {"y": 1}
+    entered, written = threading.Event(), threading.Event()
+
+    def write():
+        entered.wait()
+        parse("y").update(other, 2)
+        written.set()
+
+    thread = threading.Thread(target=write)
+    thread.start()
+    with transaction(data) as tx:
+        parse("id").update(data, 2)
+        entered.set()
+        written.wait()
+        tx.rollback()
+    thread.join()
+    assert data["id"] == 1
+    assert other == {"y": 2}
@@ -0,0 +1,84 @@
+import pytest
+
+from jsonpath_ng import Transform, parse
+from jsonpath_ng.ext import parse as ext_parse
+
+
+def naive(spec, data):
+    """Build the document with one find() per source and one
+    update_or_create() per target value."""
+    document = {}
+    for target, source in spec.items():
+        values = [match.value for match in parse(source).find(data)]
+        if not values:
+            continue
+        if "[*]" not in target:
+            parse(target).update_or_create(document, values[0])
+            continue
+        for i, value in enumerate(values):
+            parse(target.replace("[*]", "[%d]" % i)).update_or_create(document, value)
+    return document
+
+
+@pytest.fixture
+def data():
+    return {
+        "user": {"full_name": "Ann", "id": 7, "tags": ["a", "b"]},
+        "items": [
+            {"product": {"sku": "s1", "price": 2}, "qty": 1},
+            {"product": {"sku": "s2", "price": 3}, "qty": 5},
+            {"product": {"sku": "s3"}, "qty": 3},
+        ],
+    }
+
+
+@pytest.mark.parametrize(
+    "spec",
+    [
+        pytest.param({"customer.name": "$.user.full_name"}, id="field"),
+        pytest.param({"customer.name": "user.full_name", "customer.id": "user.id"}, id="shared_prefix"),
+        pytest.param({"lines[*].sku": "$.items[*].product.sku"}, id="each"),
+        pytest.param({"lines[*].sku": "items[*].product.sku", "lines[*].qty": "items[*].qty"}, id="each_merged"),
+        pytest.param({"lines[*].price": "items[*].product.price"}, id="each_missing"),
+        pytest.param({"tags[*]": "user.tags[*]"}, id="each_list"),
+        pytest.param({"a.b[2].c": "user.id"}, id="index_padding"),
+        pytest.param({"a[1]": "user.id", "a[0].b": "user.full_name"}, id="index_into_list"),
+        pytest.param({"first": "items[0].product", "user": "user"}, id="containers"),
+        pytest.param({"x.y": "missing.path", "x.z": "user.id"}, id="unmatched"),
+        pytest.param({"names[*]": "$..sku"}, id="descendants"),
+        pytest.param({"id": "user.id", "id2": "`this`.user.id"}, id="context"),
+    ],
+)
+def test_transform_matches_naive_loop(data, spec):
+    assert Transform(spec).apply(data) == naive(spec, data)
+
+
+def test_transform_parsed_paths(data):
+    transform = Transform({parse("out[*]"): ext_parse("items[?qty > 2].product.sku")})
+    assert transform.apply(data) == {"out": ["s2", "s3"]}
+
+
+def test_transform_grouped_aggregate(data):
+    source = ext_parse("items[*].(product.*.`count`)")
+    transform = Transform({"counts[*]": source, "total": "user.id"})
+    assert transform.apply(data) == {
+        "counts": [match.value for match in source.find(data)],
+        "total": 7,
+    }
+    assert transform.apply(data)["counts"] == [2, 2, 1]
+
+
+def test_transform_reuse(data):
+    transform = Transform({"lines[*].sku": "items[*].product.sku"})
+    first = transform.apply(data)
+    first["lines"].append("changed")
+    assert transform.apply(data) == {"lines": [{"sku": "s1"}, {"sku": "s2"}, {"sku": "s3"}]}
+
+
+@pytest.mark.parametrize(
+    "target",
+    ["$", "a.*", "a[-1]", "a[1:]", "a[*].b[*]", "a..b", "a | b", "a[0,1]"],
+)
+def test_transform_invalid_target(target):
+    with pytest.raises(ValueError, match="is not a target"):
+        Transform({target: "user.id"})